@@ -2,7 +2,7 @@
 #
 from . import fields, reqparse, inputs, cors
 from .api import Api  # noqa
-from .marshalling import marshal, marshal_with, marshal_with_field  # noqa
+from .marshalling import marshal, marshal_async, marshal_with, marshal_with_field  # noqa
 from .mask import Mask
 from .model import Model, OrderedModel, SchemaModel  # noqa
 from .namespace import Namespace  # noqa
@@ -17,6 +17,7 @@ __all__ = (
     'Api',
     'Resource',
     'marshal',
+    'marshal_async',
     'marshal_with',
     'marshal_with_field',
     'Mask',
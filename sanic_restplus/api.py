@@ -12,7 +12,7 @@ import operator
 import re
 import traceback
 
-from functools import wraps, partial, lru_cache, update_wrapper
+from functools import wraps, partial, update_wrapper
 from types import MethodType
 from distutils.version import LooseVersion
 from jinja2 import PackageLoader
@@ -41,12 +41,18 @@ from jsonschema import RefResolver
 
 from .restplus import restplus
 from .mask import ParseError, MaskError
+from .binary import load_payload
+from .compression import PrecompressedJSON, compress_response
+from .etag import tag_response
+from .marshalling import MarshalledStream
 from .namespace import Namespace
 from .postman import PostmanCollectionV1
 from .resource import Resource
 from .swagger import Swagger
 from .utils import OrderedDict, cur_py_version, default_id, camel_to_dash, unpack, best_match_accept_mimetype, get_accept_mimetypes
-from .representations import output_json_fast
+from .representations import (
+    output_json_fast, output_json_stream, output_json_encoded, EncodedJSON, JSONFragment, setup_json_engine
+)
 from ._http import HTTPStatus
 
 
@@ -61,6 +67,11 @@ HEADERS_BLACKLIST = ('Content-Length',)
 
 DEFAULT_REPRESENTATIONS = [('application/json', output_json_fast)]
 
+#: Streaming counterparts of the builtin representations
+STREAM_REPRESENTATIONS = {output_json_fast: output_json_stream}
+#: Pre-encoded bodies counterparts of the builtin representations
+ENCODED_REPRESENTATIONS = {output_json_fast: output_json_encoded}
+
 log = logging.getLogger(__name__)
 
 
@@ -85,6 +96,17 @@ class Api(object):
     :param str default_mediatype: The default media type to return
     :param bool validate: Whether or not the API should perform input payload validation.
     :param bool ordered: Whether or not preserve order models and marshalling.
+    :param bool encode: Whether or not marshalled responses are directly encoded
+        into JSON bodies (see :class:`~sanic_restplus.marshal_with`)
+    :param bool native_types: Whether or not dates and numbers are left to the JSON encoder
+        when it supports them (see :class:`~sanic_restplus.marshal_with`)
+    :param bool offload: Whether or not large encoded collections are marshalled in a process pool
+        (see :mod:`~sanic_restplus.offload`)
+    :param bool compress: Whether or not responses are compressed with the negotiated ``Accept-Encoding``
+        (see :mod:`~sanic_restplus.compression`)
+    :param auto_etag: Whether or not successful ``GET`` responses are tagged with the hash of their body
+        and answered ``304 Not Modified`` when unchanged: ``True`` (or ``'strong'``) or ``'weak'``
+        (see :mod:`~sanic_restplus.etag`)
     :param str doc: The documentation path. If set to a false value, documentation is disabled.
                 (Default to '/')
     :param list decorators: Decorators to attach to every resource
@@ -104,8 +126,8 @@ class Api(object):
                  contact=None, contact_url=None, contact_email=None,
                  authorizations=None, security=None, doc='/', default_id=default_id,
                  default='default', default_label='Default namespace', validate=None,
-                 tags=None, prefix='', ordered=False,
-                 default_mediatype='application/json', decorators=None,
+                 tags=None, prefix='', ordered=False, encode=False, native_types=False, offload=False,
+                 compress=False, auto_etag=False, default_mediatype='application/json', decorators=None,
                  catch_all_404s=False, serve_challenge_on_401=False, format_checker=None,
                  additional_css=None, **kwargs):
         self.version = version
@@ -121,6 +143,11 @@ class Api(object):
         self.security = security
         self.default_id = default_id
         self.ordered = ordered
+        self.encode = encode
+        self.native_types = native_types
+        self.offload = offload
+        self.compress = compress
+        self.auto_etag = auto_etag
         self._validate = validate
         self._doc = doc
         self._doc_view = None
@@ -132,6 +159,7 @@ class Api(object):
             MaskError: mask_error_handler,
         }
         self._schema = None
+        self._schema_body = None
         self.models = {}
         self._refresolver = None
         self.format_checker = format_checker
@@ -245,6 +273,11 @@ class Api(object):
         app.config.setdefault('RESTPLUS_MASK_SWAGGER', True)
         context.MASK_HEADER = app.config['RESTPLUS_MASK_HEADER']
         context.MASK_SWAGGER = app.config['RESTPLUS_MASK_SWAGGER']
+        app.listener(self._setup_json_engine, 'before_server_start')
+
+    def _setup_json_engine(self, app, loop):
+        '''Resolve the JSON engine once the configuration is complete (see :func:`setup_json_engine`)'''
+        setup_json_engine(app)
 
     def __getattr__(self, name):
         try:
@@ -483,7 +516,13 @@ class Api(object):
                 # Can't unpack an awaitable.
                 raise RuntimeError("RestPlus output handler received a non-awaited coroutine or Task.")
             data, code, headers = unpack(resp)
-            return self.make_response(request, data, code, headers=headers)
+            if isinstance(data, MarshalledStream):
+                return await self.make_stream_response(request, data, code, headers=headers)
+            resp = self.make_response(request, data, code, headers=headers)
+            if self.compress:
+                precompressed = data if isinstance(data, PrecompressedJSON) else None
+                resp = await compress_response(request, resp, precompressed)
+            return resp
         return wrapper
 
     def make_response(self, request, data, *args, **kwargs):
@@ -495,25 +534,65 @@ class Api(object):
         Acceptable response will be sent as per RFC 2616 section 14.1
 
         :param data: Python object containing response data to be transformed
+        :param str mediatype: the already negotiated mediatype if any
         """
         default_mediatype = kwargs.pop('fallback_mediatype', None) or self.default_mediatype
-        mediatype = best_match_accept_mimetype(request,
-            self.representations,
-            default=default_mediatype,
-        )
+        mediatype = kwargs.pop('mediatype', None)
+        if mediatype is None:
+            mediatype = best_match_accept_mimetype(request,
+                self.representations,
+                default=default_mediatype,
+            )
         if mediatype is None:
             raise exceptions.SanicException("Not Acceptable", 406)
+        if isinstance(data, JSONFragment):
+            data = EncodedJSON.from_fragment(data)
+        if isinstance(data, EncodedJSON):
+            encoded = ENCODED_REPRESENTATIONS.get(self.representations.get(mediatype))
+            if encoded is not None:
+                resp = encoded(request, data, *args, **kwargs)
+                resp.headers['Content-Type'] = mediatype
+                return self.tag_response(request, resp)
+            data = data.decode()
         if mediatype in self.representations:
             resp = self.representations[mediatype](request, data, *args, **kwargs)
             resp.headers['Content-Type'] = mediatype
-            return resp
+            return self.tag_response(request, resp)
         elif mediatype == 'text/plain':
             resp = text(str(data), *args, **kwargs)
             resp.headers['Content-Type'] = 'text/plain'
-            return resp
+            return self.tag_response(request, resp)
         else:
             raise exceptions.ServerError(None)
 
+    def tag_response(self, request, response):
+        '''
+        Tag a response with the hash of its body if the ``auto_etag`` option is set
+        (see :func:`~sanic_restplus.etag.tag_response`)
+        '''
+        if not self.auto_etag:
+            return response
+        return tag_response(request, response, weak=self.auto_etag == 'weak')
+
+    async def make_stream_response(self, request, data, *args, **kwargs):
+        """
+        Writes a :class:`~sanic_restplus.marshalling.MarshalledStream` as a streaming response
+        if the requested media type representation supports it.
+        Otherwise, the whole stream is marshalled and handled by :meth:`make_response`.
+
+        :param MarshalledStream data: the lazily marshalled collection
+        """
+        mediatype = best_match_accept_mimetype(request,
+            self.representations,
+            default=self.default_mediatype,
+        )
+        streamer = STREAM_REPRESENTATIONS.get(self.representations.get(mediatype))
+        if streamer is None:
+            return self.make_response(request, await data.collect(), *args, mediatype=mediatype, **kwargs)
+        resp = streamer(request, data, *args, **kwargs)
+        resp.headers['Content-Type'] = mediatype
+        return resp
+
     def documentation(self, func):
         '''A decorator to specify a view function for the documentation'''
         self._doc_view = func
@@ -657,7 +736,6 @@ class Api(object):
         return base_url
 
     @property
-    @lru_cache()
     def __schema__(self):
         '''
         The Swagger specifications/schema for this API
@@ -675,6 +753,21 @@ class Api(object):
                 return {'error': msg}
         return self._schema
 
+    def schema_body(self, request):
+        '''
+        The Swagger specifications encoded once as a JSON body,
+        compressed once per encoding (see :class:`~sanic_restplus.compression.PrecompressedJSON`)
+
+        :returns: the encoded schema or the schema itself in debug mode (pretty printed)
+        '''
+        schema = self.__schema__
+        if request.app.debug or 'error' in schema:
+            return schema
+        cached = self._schema_body
+        if cached is None or cached[0] is not schema:
+            cached = self._schema_body = (schema, PrecompressedJSON.encode(request, schema))
+        return cached[1]
+
     @property
     def _own_and_child_error_handlers(self):
         rv = {}
@@ -947,8 +1040,8 @@ class Api(object):
         return PostmanCollectionV1(self, swagger=swagger).as_dict(urlvars=urlvars)
 
     def payload(self, request):
-        """Default behaviour for payload() is just to return the request.json"""
-        return request.json
+        """The decoded request body: JSON or a binary payload (see :func:`~sanic_restplus.binary.load_payload`)"""
+        return load_payload(request)
 
     @property
     def refresolver(self):
@@ -1103,7 +1196,9 @@ class SwaggerView(Resource):
     '''Render the Swagger specifications as JSON'''
     def get(self, request):
         schema = self.api.__schema__
-        return schema, HTTPStatus.INTERNAL_SERVER_ERROR.value if 'error' in schema else HTTPStatus.OK.value
+        if 'error' in schema:
+            return schema, HTTPStatus.INTERNAL_SERVER_ERROR.value
+        return self.api.schema_body(request), HTTPStatus.OK.value
 
     def mediatypes(self):
         return ['application/json']
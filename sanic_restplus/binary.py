@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+'''
+Binary representations of the API responses and payloads:
+``application/msgpack`` if `msgpack <https://pypi.org/project/msgpack/>`_ is installed
+and ``application/cbor`` if `cbor2 <https://pypi.org/project/cbor2/>`_ is installed.
+
+The representations are registered with :meth:`~sanic_restplus.Api.representation`
+and the payloads of these content types are decoded by :func:`load_payload`.
+'''
+import collections
+import io
+import uuid
+
+from datetime import date, datetime, time, timezone
+
+from sanic.exceptions import InvalidUsage
+from sanic.response import HTTPResponse
+
+try:
+    import msgpack
+    has_msgpack = True
+except ImportError:
+    msgpack = None
+    has_msgpack = False
+
+try:
+    import cbor2
+    has_cbor = True
+except ImportError:
+    cbor2 = None
+    has_cbor = False
+
+from .representations import JSONFragment, use_body_bytes
+
+__all__ = ('MSGPACK_MIMETYPE', 'CBOR_MIMETYPE', 'PAYLOAD_DECODERS', 'pack_default',
+           'pack_msgpack', 'unpack_msgpack', 'output_msgpack', 'pack_cbor', 'unpack_cbor', 'output_cbor',
+           'load_payload')
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+CBOR_MIMETYPE = 'application/cbor'
+
+
+def isoformat(value):
+    '''Format a date or time the way the JSON encoder does (naive datetimes are UTC)'''
+    if isinstance(value, datetime) and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    formatted = value.isoformat()
+    return formatted[:-6] + 'Z' if formatted.endswith('+00:00') else formatted
+
+
+def pack_default(obj):
+    '''
+    Convert the values the packers don't support,
+    as :func:`~sanic_restplus.representations.encode` does for JSON.
+    '''
+    if isinstance(obj, collections.OrderedDict):
+        return dict(obj)
+    elif isinstance(obj, (datetime, date, time)):
+        return isoformat(obj)
+    elif isinstance(obj, uuid.UUID):
+        return str(obj)
+    elif isinstance(obj, JSONFragment):
+        return obj.decode()
+    raise TypeError('Object of type {0} is not serializable'.format(type(obj).__name__))
+
+
+def make_response(body, code, headers, content_type):
+    if use_body_bytes:
+        return HTTPResponse(None, code, headers, content_type=content_type, body_bytes=body)
+    return HTTPResponse(body, code, headers, content_type=content_type)
+
+
+if has_msgpack:
+    # A single packer per worker (it is reset after each call)
+    msgpack_packer = msgpack.Packer(default=pack_default, use_bin_type=True)
+
+    def pack_msgpack(data):
+        '''Pack some data as MessagePack with the worker packer'''
+        return msgpack_packer.pack(data)
+
+    def unpack_msgpack(body):
+        '''Unpack a MessagePack body'''
+        return msgpack.unpackb(body, raw=False)
+else:
+    def pack_msgpack(data):
+        raise RuntimeError('msgpack is required for the {0} representation'.format(MSGPACK_MIMETYPE))
+
+    unpack_msgpack = pack_msgpack
+
+
+def output_msgpack(request, data, code, headers=None):
+    '''Makes a response with a MessagePack encoded body'''
+    return make_response(pack_msgpack(data), code, headers, MSGPACK_MIMETYPE)
+
+
+if has_cbor:
+    def cbor_default(encoder, obj):
+        encoder.encode(pack_default(obj))
+
+    # A single encoder per worker, writing to a reused buffer
+    cbor_buffer = io.BytesIO()
+    cbor_encoder = cbor2.CBOREncoder(cbor_buffer, default=cbor_default, timezone=timezone.utc)
+
+    def pack_cbor(data):
+        '''Pack some data as CBOR with the worker encoder (naive datetimes are UTC)'''
+        cbor_buffer.seek(0)
+        cbor_buffer.truncate()
+        cbor_encoder.encode(data)
+        return cbor_buffer.getvalue()
+
+    def unpack_cbor(body):
+        '''Unpack a CBOR body'''
+        return cbor2.loads(body)
+else:
+    def pack_cbor(data):
+        raise RuntimeError('cbor2 is required for the {0} representation'.format(CBOR_MIMETYPE))
+
+    unpack_cbor = pack_cbor
+
+
+def output_cbor(request, data, code, headers=None):
+    '''Makes a response with a CBOR encoded body'''
+    return make_response(pack_cbor(data), code, headers, CBOR_MIMETYPE)
+
+
+#: The payload decoders by content type (JSON payloads are decoded by Sanic)
+PAYLOAD_DECODERS = {}
+if has_msgpack:
+    PAYLOAD_DECODERS[MSGPACK_MIMETYPE] = PAYLOAD_DECODERS['application/x-msgpack'] = unpack_msgpack
+if has_cbor:
+    PAYLOAD_DECODERS[CBOR_MIMETYPE] = unpack_cbor
+
+
+def load_payload(request):
+    '''
+    Get the decoded payload of a request: binary bodies are decoded by the :data:`PAYLOAD_DECODERS`
+    (once per request), others are left to :attr:`sanic.request.Request.json`.
+
+    :raises InvalidUsage: if the body can't be decoded
+    '''
+    content_type = request.headers.get('content-type')
+    decoder = content_type and PAYLOAD_DECODERS.get(content_type.split(';', 1)[0].strip().lower())
+    if not decoder:
+        return request.json
+    try:
+        return request.ctx.restplus_payload
+    except AttributeError:
+        pass
+    body = request.body
+    if not body:
+        payload = None
+    else:
+        try:
+            payload = decoder(body)
+        except Exception:
+            raise InvalidUsage('Failed when parsing body as {0}'.format(content_type))
+    request.ctx.restplus_payload = payload
+    return payload
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+'''
+Cache the marshalled representations of frequently served objects
+(see :class:`~sanic_restplus.marshal_with` and :class:`~sanic_restplus.fields.Nested`).
+'''
+import collections
+import sys
+import time
+
+from .columnar import is_columnar
+from .compiler import is_collection
+from .utils import OrderedDict
+
+__all__ = ('ResultCache', 'CachedMarshaller', 'ResultCacheInfo', 'sizeof')
+
+ResultCacheInfo = collections.namedtuple('ResultCacheInfo',
+                                         ['hits', 'misses', 'maxsize', 'currsize', 'max_bytes', 'currbytes'])
+
+
+def sizeof(value):
+    '''
+    Approximate the memory (in bytes) used by a marshalled value
+    (dicts, lists and scalars, or encoded bodies).
+    '''
+    body = getattr(value, 'body', None)
+    if isinstance(body, bytes):
+        return sys.getsizeof(body)
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(sizeof(v) for v in value)
+    return size
+
+
+def _detached():
+    return None
+
+
+def _getter(key):
+    if key is None or callable(key):
+        return key
+    # ugly local import to avoid dependency loop
+    from .fields import make_accessor
+    return make_accessor(key).get
+
+
+class ResultCache(object):
+    '''
+    A bounded LRU cache of marshalled objects (dicts or encoded bodies)
+    keyed by marshaller (ie. model, mask and options), object key and object version.
+
+    Objects for which the ``key`` is ``None`` are never cached.
+    A new object version (ie. an update timestamp) or a model mutation
+    makes the previous entries unreachable: they are evicted as the least recently used.
+
+    Cached values are shared by all responses: they must not be mutated.
+
+    :param key: the object identity, as a callable or an attribute name (ie. ``'id'``)
+    :param version: the optional object version, as a callable or an attribute name (ie. ``'updated_at'``)
+    :param int maxsize: the maximum number of entries kept
+    :param float ttl: an optional time to live (in seconds) of the entries
+    :param int max_bytes: an optional memory budget (in bytes, see :func:`sizeof`)
+    :param callable timer: the clock used for expiration
+    '''
+    def __init__(self, key, version=None, maxsize=1024, ttl=None, max_bytes=None, timer=time.monotonic):
+        self.key = _getter(key)
+        self.version = _getter(version)
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self.currbytes = 0
+        self._entries = collections.OrderedDict()
+        # Object keys to their entries keys (see :meth:`invalidate`)
+        self._keys = {}
+
+    def identify(self, obj):
+        '''
+        Get the ``(key, version)`` of an object or ``None`` if it can't be cached.
+        '''
+        try:
+            key = self.key(obj)
+        except (AttributeError, KeyError, TypeError):
+            return None
+        if key is None:
+            return None
+        identity = key, self.version(obj) if self.version is not None else None
+        try:
+            hash(identity)
+        except TypeError:
+            return None
+        return identity
+
+    def lookup(self, token, identity):
+        '''
+        Get the value cached for an object identity (see :meth:`identify`).
+
+        :param token: the hashable source of the cached value (ie. a marshaller)
+        :raises KeyError: if there is no fresh entry
+        '''
+        ekey = (token, ) + identity
+        value, expires, _ = self._entries[ekey]
+        if expires is not None and expires <= self.timer():
+            self._remove(ekey)
+            raise KeyError(ekey)
+        self.hits += 1
+        self._entries.move_to_end(ekey)
+        return value
+
+    def store(self, token, identity, value):
+        '''Cache a value for an object identity, evicting entries over the limits'''
+        ekey = (token, ) + identity
+        size = sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        if ekey in self._entries:
+            self._remove(ekey)
+        expires = self.timer() + self.ttl if self.ttl is not None else None
+        self._entries[ekey] = (value, expires, size)
+        self._keys.setdefault(identity[0], set()).add(ekey)
+        self.currbytes += size
+        while len(self._entries) > self.maxsize or (
+                self.max_bytes is not None and self.currbytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+
+    def get(self, token, obj, factory):
+        '''
+        Get the value cached for an object, computing it with ``factory(obj)`` if missing.
+
+        :param token: the hashable source of the cached value (ie. a marshaller)
+        '''
+        identity = self.identify(obj)
+        if identity is None:
+            return factory(obj)
+        try:
+            return self.lookup(token, identity)
+        except KeyError:
+            pass
+        self.misses += 1
+        value = factory(obj)
+        self.store(token, identity, value)
+        return value
+
+    def _remove(self, ekey):
+        _, _, size = self._entries.pop(ekey)
+        self.currbytes -= size
+        keys = self._keys.get(ekey[1])
+        if keys is not None:
+            keys.discard(ekey)
+            if not keys:
+                del self._keys[ekey[1]]
+
+    def invalidate(self, *keys):
+        '''
+        Drop all the entries (any model, mask or version) of the given object keys.
+
+        It is meant to be called when objects are updated or deleted (ie. from ORM events).
+        '''
+        for key in keys:
+            for ekey in list(self._keys.get(key, ())):
+                self._remove(ekey)
+
+    def clear(self):
+        self._entries.clear()
+        self._keys.clear()
+        self.hits = self.misses = self.currbytes = 0
+
+    def wrap(self, marshaller):
+        '''Get the :class:`CachedMarshaller` using this cache for a given marshaller'''
+        return CachedMarshaller(marshaller, self)
+
+    def cache_info(self):
+        return ResultCacheInfo(self.hits, self.misses, self.maxsize, len(self._entries),
+                               self.max_bytes, self.currbytes)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __copy__(self):
+        # Fields copies (ie. masked clones) share the cache
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        # Caches are local to each process (ie. pickled fields are unpickled without cache)
+        return (_detached, ())
+
+
+class CachedMarshaller(object):
+    '''
+    A :class:`~sanic_restplus.compiler.Marshaller` serving the objects
+    found in a :class:`ResultCache` and caching the others.
+
+    Collections are served row by row: the missing rows are marshalled at once.
+
+    :param Marshaller marshaller: the wrapped marshaller
+    :param ResultCache cache: the results cache
+    '''
+    def __init__(self, marshaller, cache):
+        self.marshaller = marshaller
+        self.cache = cache
+
+    def __getattr__(self, name):
+        # Options, fields and projection of the wrapped marshaller
+        if name == 'marshaller':
+            raise AttributeError(name)
+        return getattr(self.marshaller, name)
+
+    def marshal_one(self, obj):
+        return self.cache.get(self.marshaller, obj, self.marshaller.marshal_one)
+
+    def marshal_many(self, rows):
+        marshaller = self.marshaller
+        if any(is_collection(row) for row in rows):
+            return marshaller.marshal_many(rows)
+        cache = self.cache
+        results = []
+        missing = []
+        # Rows sharing an identity are only marshalled once
+        duplicates = {}
+        for index, row in enumerate(rows):
+            identity = cache.identify(row)
+            if identity is not None:
+                try:
+                    results.append(cache.lookup(marshaller, identity))
+                    continue
+                except KeyError:
+                    pass
+                if identity in duplicates:
+                    duplicates[identity].append(index)
+                    results.append(None)
+                    continue
+                cache.misses += 1
+                duplicates[identity] = []
+            results.append(None)
+            missing.append((index, row, identity))
+        if missing:
+            marshalled = marshaller.marshal_many([row for _, row, _ in missing])
+            for (index, _, identity), value in zip(missing, marshalled):
+                results[index] = value
+                if identity is not None:
+                    cache.store(marshaller, identity, value)
+                    for duplicate in duplicates[identity]:
+                        results[duplicate] = value
+        return results
+
+    def encode(self, request, obj, native=False):
+        '''
+        Get the :class:`~sanic_restplus.representations.EncodedJSON` body of an object,
+        caching the encoded bytes rather than the marshalled dict.
+        '''
+        # ugly local import to avoid dependency loop
+        from .representations import EncodedJSON
+
+        return self.cache.get((self.marshaller, 'json'), obj,
+                              lambda o: EncodedJSON.encode(request, self.marshaller.marshal_one(o), native))
+
+    def __call__(self, data):
+        if is_collection(data):
+            out = self.marshal_many(data)
+        elif type(data) is not dict and is_columnar(data):
+            # Tables rows are not identified
+            out = self.marshaller.marshal_columnar(data)
+        else:
+            out = self.marshal_one(data)
+        envelope = self.marshaller.envelope
+        if envelope:
+            out = OrderedDict([(envelope, out)]) if self.marshaller.ordered else {envelope: out}
+        return out
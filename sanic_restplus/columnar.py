@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+'''
+Read columnar data (pandas DataFrames, NumPy record arrays and Arrow tables)
+column by column so they are marshalled without materializing rows
+(see :meth:`~sanic_restplus.compiler.Marshaller.marshal_columnar`).
+
+None of these libraries is imported: data are only recognized
+if the library has already been imported by the application.
+'''
+import sys
+
+__all__ = ('COLUMNAR_MODULES', 'is_columnar', 'columnar', 'DataFrameColumns', 'RecordArrayColumns', 'ArrowColumns')
+
+#: The top level modules of the supported columnar types
+COLUMNAR_MODULES = frozenset(('pandas', 'numpy', 'pyarrow'))
+
+
+class Columns(object):
+    '''
+    Base adapter giving access to the columns of some columnar data.
+
+    :param data: the wrapped data
+    '''
+    def __init__(self, data):
+        self.data = data
+
+    @property
+    def names(self):
+        '''The columns names'''
+        raise NotImplementedError
+
+    def column(self, name):
+        '''
+        Get the values of a column as a list of Python objects.
+
+        :param str name: the column name (it must exist)
+        '''
+        raise NotImplementedError
+
+    def records(self, names=None):
+        '''
+        Materialize the rows as dicts, only with the given columns (defaults to all).
+        '''
+        names = list(self.names if names is None else (n for n in names if n in self))
+        if not names:
+            return [{} for _ in range(len(self))]
+        return [dict(zip(names, row)) for row in zip(*(self.column(name) for name in names))]
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class DataFrameColumns(Columns):
+    '''A :class:`pandas.DataFrame` columns. Missing values (ie. ``NaN``, ``NaT``) are read as ``None``.'''
+    @property
+    def names(self):
+        return self.data.columns
+
+    def column(self, name):
+        series = self.data[name]
+        values = series.tolist()
+        if series.hasnans:
+            values = [None if missing else value for value, missing in zip(values, series.isna().tolist())]
+        return values
+
+    def __len__(self):
+        return len(self.data)
+
+
+class RecordArrayColumns(Columns):
+    '''A NumPy record (or structured) array columns'''
+    @property
+    def names(self):
+        return self.data.dtype.names
+
+    def column(self, name):
+        values = self.data[name]
+        dtype = values.dtype.str
+        if values.dtype.kind in 'mM' and dtype[-4:-1] in ('[ns', '[ps', '[fs', '[as'):
+            # Units below the microsecond can't be converted to datetime and timedelta objects
+            values = values.astype(dtype[:-4] + '[us]')
+        return values.tolist()
+
+    def __len__(self):
+        return len(self.data)
+
+
+class ArrowColumns(Columns):
+    '''A :class:`pyarrow.Table` (or :class:`pyarrow.RecordBatch`) columns. Nulls are read as ``None``.'''
+    @property
+    def names(self):
+        return self.data.schema.names
+
+    def column(self, name):
+        return self.data.column(name).to_pylist()
+
+    def __len__(self):
+        return self.data.num_rows
+
+
+def is_columnar(data):
+    '''Wether some data is a supported columnar type (see :func:`columnar`)'''
+    return type(data).__module__.partition('.')[0] in COLUMNAR_MODULES and columnar(data) is not None
+
+
+def columnar(data):
+    '''
+    Get the :class:`Columns` adapter of a DataFrame, a NumPy record array or an Arrow table.
+
+    :returns: the adapter or ``None`` for other data
+    '''
+    pandas = sys.modules.get('pandas')
+    if pandas is not None and isinstance(data, pandas.DataFrame):
+        return DataFrameColumns(data)
+    numpy = sys.modules.get('numpy')
+    if numpy is not None and isinstance(data, numpy.ndarray) and data.dtype.names and data.ndim == 1:
+        return RecordArrayColumns(data)
+    pyarrow = sys.modules.get('pyarrow')
+    if pyarrow is not None and isinstance(data, (pyarrow.Table, pyarrow.RecordBatch)):
+        return ArrowColumns(data)
+    return None
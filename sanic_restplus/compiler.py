@@ -0,0 +1,593 @@
+# -*- coding: utf-8 -*-
+#
+import collections
+
+from collections import Counter
+from operator import attrgetter
+
+from .columnar import is_columnar
+from .mask import Mask, parse as parse_mask
+from .utils import CacheInfo, OrderedDict
+
+__all__ = ('Marshaller', 'MarshallerCache', 'get_marshaller', 'compose', 'share_prefixes', 'projection')
+
+#: Maximum number of compiled marshallers kept per model
+CACHE_SIZE = 128
+
+
+def make(cls):
+    if isinstance(cls, type):
+        return cls()
+    return cls
+
+
+def mask_key(mask):
+    '''
+    Compute a hashable cache key for a mask.
+
+    :param str|Mask mask: the mask (parsed or not)
+    :raises TypeError: if the mask can't be used as a cache key
+    '''
+    if not mask:
+        return None
+    elif isinstance(mask, str):
+        return mask
+    elif isinstance(mask, Mask):
+        return (str(mask), mask.skip)
+    raise TypeError('Unhashable mask')
+
+
+def is_collection(data):
+    '''Wether some data is a collection of objects to marshal (namedtuples are single objects)'''
+    return isinstance(data, (list, tuple)) and not hasattr(data, '_fields')
+
+
+def compose(accessor, format):
+    '''
+    Compose a compiled field ``(accessor, format)`` pair
+    into a single function taking the whole object.
+    '''
+    if accessor is None:
+        return format
+    get = accessor.get
+    if format is None:
+        return get
+    return lambda obj: format(get(obj))
+
+
+def share_prefixes(entries):
+    '''
+    Find the dotted paths prefixes shared by several accessors
+    so they are resolved only once per object.
+
+    ie. ``owner.address.city`` and ``owner.address.zip`` share ``owner.address``.
+
+    :param entries: the compiled ``(key, accessor, format)`` entries
+    :returns: a ``(prefixes, entries)`` pair where ``prefixes`` is a list of
+        ``(accessor, source)`` and ``entries`` a list of ``(key, accessor, format, source)``.
+        ``source`` is the index of the object the accessor applies on:
+        ``0`` for the marshalled object, ``n`` for the ``n``th prefix value.
+    '''
+    # ugly local import to avoid dependency loop
+    from .fields import make_accessor
+
+    def shared_path(accessor):
+        # Only the dotted keys paths can share a prefix
+        path = accessor.path if accessor is not None else None
+        if path and len(path) > 1 and all(isinstance(k, str) for k in path):
+            return path
+        return None
+
+    paths = [shared_path(accessor) for _, accessor, _ in entries]
+    counts = Counter(path[:i] for path in paths if path for i in range(1, len(path)))
+    # Only keep the longest prefix shared by a given set of paths
+    shared = sorted((
+        prefix for prefix, count in counts.items()
+        if count > 1 and not any(
+            counts[other] == count for other in counts
+            if len(other) == len(prefix) + 1 and other[:-1] == prefix
+        )
+    ), key=len)
+
+    def source_of(path):
+        for index in range(len(shared) - 1, -1, -1):
+            prefix = shared[index]
+            if len(prefix) < len(path) and path[:len(prefix)] == prefix:
+                return index + 1, make_accessor('.'.join(path[len(prefix):]))
+        return 0, None
+
+    prefixes = []
+    for prefix in shared:
+        source, accessor = source_of(prefix)
+        prefixes.append((accessor or make_accessor('.'.join(prefix)), source))
+
+    compiled = []
+    for (key, accessor, format), path in zip(entries, paths):
+        source = 0
+        if path and shared:
+            source, sub_accessor = source_of(path)
+            accessor = sub_accessor or accessor
+        compiled.append((key, accessor, format, source))
+    return prefixes, compiled
+
+
+def projection(fields, prefix='', seen=()):
+    '''
+    Compute the dotted paths of the keys a set of fields will output,
+    following nested models, dicts and lists of nested models.
+
+    :param dict fields: the (masked) fields
+    :param str prefix: the parent path prefix
+    :param tuple seen: the models being walked (for recursive models)
+    :rtype: frozenset
+    '''
+    # ugly local import to avoid dependency loop
+    from .fields import List, Nested
+
+    paths = set()
+    for key, value in fields.items():
+        path = prefix + key
+        paths.add(path)
+        if isinstance(value, dict):
+            nested, model = value, value
+        else:
+            field = make(value)
+            if isinstance(field, List):
+                field = field.container
+            if not isinstance(field, Nested):
+                continue
+            nested, model = field.nested, field.model
+        # Models are copied on resolution so they are identified by name
+        identity = getattr(model, 'name', None) or id(model)
+        if identity not in seen:
+            paths.update(projection(nested, path + '.', seen + (identity, )))
+    return frozenset(paths)
+
+
+class Marshaller(object):
+    '''
+    A marshalling function specialized for a set of fields.
+
+    The fields resolution, the mask application and the per-field
+    dispatch are performed once at construction.
+    Calling the marshaller is equivalent to calling :func:`marshal`
+    with the same arguments.
+
+    :param fields: a dict of whose keys will make up the final serialized
+                   response output
+    :param envelope: optional key that will be used to envelop the serialized
+                     response
+    :param bool skip_none: optional key will be used to eliminate fields
+                           which value is None or the field's key not
+                           exist in data
+    :param str|Mask mask: an optional mask to apply on fields
+    :param bool ordered: Wether or not to preserve order
+    :param bool native: Wether or not native types (ie. dates) are left to the JSON encoder
+                        (see :meth:`~sanic_restplus.fields.Raw.format_native`)
+    '''
+    def __init__(self, fields, envelope=None, skip_none=False, mask=None, ordered=False, native=False):
+        # ugly local import to avoid dependency loop
+        from .fields import Wildcard
+
+        mask = mask or getattr(fields, '__mask__', None)
+        #: The marshalled model name (if any)
+        self.name = getattr(fields, 'name', None)
+        fields = getattr(fields, 'resolved', fields)
+        if mask:
+            mask = parse_mask(mask, skip=True) if isinstance(mask, str) else Mask(mask, skip=True)
+            fields = mask.apply(fields)
+
+        self.fields = fields
+        self.envelope = envelope
+        self.skip_none = skip_none
+        self.ordered = ordered
+        self.native = native
+        self._projection = None
+        self._has_loaders = None
+        self._identity = None
+
+        entries = []
+        columns = {}
+        has_wildcards = False
+        for key, value in fields.items():
+            if isinstance(value, dict):
+                marshaller = get_marshaller(value, skip_none=skip_none, ordered=ordered, native=native)
+                entries.append((key, None, marshaller))
+                continue
+            field = make(value)
+            if isinstance(field, Wildcard):
+                has_wildcards = True
+                entries.append((key, None, field))
+            else:
+                accessor, format = field.compile(key, ordered=ordered, native=native)
+                entries.append((key, accessor, format))
+                many = field.many_formatter() if accessor is not None else None
+                if many is not None:
+                    columns[key] = many
+        #: The compiled ``(key, accessor, format)`` entries
+        self.entries = tuple(entries)
+        #: The columns formatters by key (see :meth:`~sanic_restplus.fields.Raw.format_many`)
+        self.columns = columns
+
+        self.plans = None
+        if has_wildcards:
+            self.marshal_one = self._compile_wildcards()
+        else:
+            self.marshal_one = self._compile()
+
+    def _compile(self):
+        #: The shared prefixes and the entries (see :func:`share_prefixes`)
+        self._shared = share_prefixes(self.entries)
+        #: The ``(prefixes, entries)`` plans for dict, plain object and indexable rows
+        self.plans = tuple(self._plan(attrgetter(getter)) for getter in ('from_dict', 'from_object', 'get'))
+        self._class_plans = {}
+        prefixes = self._shared[0]
+        dict_plan = self.plans[0]
+        class_plans = self._class_plans
+        plan_for_class = self.plan_for_class
+        skip_none = self.skip_none
+        factory = OrderedDict if self.ordered else dict
+
+        def dispatch(obj):
+            cls = type(obj)
+            if cls is dict:
+                return obj, dict_plan
+            try:
+                plan = class_plans[cls]
+            except KeyError:
+                plan = plan_for_class(cls)
+            if plan is None:
+                return dispatch(obj.__marshallable__())
+            return obj, plan
+
+        if not prefixes and not skip_none and factory is dict:
+            # Fast path
+            def marshal_one(obj):
+                obj, (_, plan) = dispatch(obj)
+                return {
+                    key: get(obj) if format is None else format(get(obj))
+                    for key, get, format, _ in plan
+                }
+            return marshal_one
+
+        def values(obj):
+            obj, (prefix_plan, plan) = dispatch(obj)
+            scope = [obj]
+            for get, source in prefix_plan:
+                scope.append(get(scope[source]))
+            for key, get, format, source in plan:
+                value = get(scope[source])
+                yield key, value if format is None else format(value)
+
+        if skip_none:
+            def marshal_one(obj):
+                return factory((k, v) for k, v in values(obj) if v is not None and v != {})
+        else:
+            def marshal_one(obj):
+                return factory(values(obj))
+        return marshal_one
+
+    def _plan(self, root):
+        '''
+        Build a ``(prefixes, entries)`` plan where values are pulled off the marshalled objects
+        by the ``root(accessor)`` getters.
+        '''
+        prefixes, entries = self._shared
+        return (
+            tuple((root(accessor) if source == 0 else accessor.get, source) for accessor, source in prefixes),
+            tuple((key, format, None, source) if accessor is None else
+                  (key, root(accessor) if source == 0 else accessor.get, format, source)
+                  for key, accessor, format, source in entries),
+        )
+
+    def plan_for_class(self, cls):
+        '''
+        Get the plan for the objects of a given class (cached by class).
+
+        Record classes (see :func:`~sanic_restplus.fields.record_fields`) get their own plan.
+
+        :returns: the plan or ``None`` if the objects need to be converted by ``__marshallable__``
+        '''
+        # ugly local import to avoid dependency loop
+        from .fields import record_fields
+
+        try:
+            return self._class_plans[cls]
+        except KeyError:
+            pass
+        dict_plan, object_plan, generic_plan = self.plans
+        if hasattr(cls, '__marshallable__'):
+            plan = None
+        elif cls is dict:
+            plan = dict_plan
+        elif record_fields(cls) is not None:
+            plan = self._plan(lambda accessor: accessor.for_record(cls))
+        elif hasattr(cls, 'strip') or not hasattr(cls, '__iter__'):
+            plan = object_plan
+        else:
+            plan = generic_plan
+        self._class_plans[cls] = plan
+        return plan
+
+    def _compile_wildcards(self):
+        '''
+        Wildcards consume the object keys not already handled by
+        the fields declared before them, so fields are processed in order.
+        '''
+        # ugly local import to avoid dependency loop
+        from .fields import Wildcard
+
+        plan = tuple(
+            (key, None, format.compile(key, self.ordered)) if isinstance(format, Wildcard)
+            else (key, compose(accessor, format), None)
+            for key, accessor, format in self.entries
+        )
+        skip_none = self.skip_none
+        factory = OrderedDict if self.ordered else dict
+
+        def marshal_one(obj):
+            if hasattr(obj, '__marshallable__'):
+                obj = obj.__marshallable__()
+            items = []
+            keys = set()
+            for key, emit, expand in plan:
+                if expand is None:
+                    keys.add(key)
+                    items.append((key, emit(obj)))
+                else:
+                    # exclude already parsed keys from the wildcard
+                    items.extend(expand(obj, keys))
+                    keys = set()
+            if skip_none:
+                return factory((k, v) for k, v in items if v is not None and v != {})
+            return factory(items)
+        return marshal_one
+
+    @property
+    def projection(self):
+        '''
+        The dotted paths of the keys the marshalled objects will contain
+
+        :rtype: frozenset
+        '''
+        if self._projection is None:
+            self._projection = projection(self.fields)
+        return self._projection
+
+    @property
+    def identity(self):
+        '''
+        The model name, output paths and options of the marshaller:
+        marshallers of a same identity give the same output
+        (ie. the marshallers of the copies of a recursive model).
+        Marshallers of anonymous fields are their own identity.
+        '''
+        if self._identity is None:
+            if self.name is None:
+                self._identity = self
+            else:
+                self._identity = (self.name, self.projection, self.envelope, self.skip_none, self.ordered,
+                                  self.native)
+        return self._identity
+
+    @property
+    def has_loaders(self):
+        '''
+        Wether some fields (or nested fields) values are loaded by batch loaders
+        (see :mod:`~sanic_restplus.loaders`)
+        '''
+        if self._has_loaders is None:
+            # ugly local import to avoid dependency loop
+            from .loaders import has_loaders
+            self._has_loaders = has_loaders(self.fields)
+        return self._has_loaders
+
+    def marshal_many(self, data):
+        '''
+        Marshal a list of objects.
+
+        Homogeneous collections are processed column by column:
+        the plan is resolved once and each field loops over all rows.
+        '''
+        plan = self.plan_for(data)
+        if plan is None:
+            marshal_one = self.marshal_one
+            return [self.marshal_many(d) if is_collection(d) else marshal_one(d) for d in data]
+        return self._marshal_columns(data, plan)
+
+    def plan_for(self, rows):
+        '''
+        Find the plan matching all rows or ``None`` if they can't be marshalled by columns
+        (wildcards, nested lists or objects converted by ``__marshallable__``)
+        '''
+        if self.plans is None:
+            return None
+        classes = set(map(type, rows))
+        if any(issubclass(cls, (list, tuple)) and not hasattr(cls, '_fields') for cls in classes):
+            return None
+        plans = dict((id(plan), plan) for plan in map(self.plan_for_class, classes))
+        if len(plans) == 1:
+            return plans.popitem()[1]
+        elif set(plans) <= set(map(id, self.plans)):
+            # Mixed dicts, plain and indexable objects
+            return self.plans[2]
+        return None
+
+    def _marshal_columns(self, rows, plan):
+        prefix_plan, entries = plan
+        if not entries:
+            return self._rows([], [], len(rows))
+        scopes = [rows]
+        for get, source in prefix_plan:
+            scopes.append(list(map(get, scopes[source])))
+        keys = []
+        columns = []
+        for key, get, format, source in entries:
+            keys.append(key)
+            columns.append(self._format_column(key, format, map(get, scopes[source])))
+        return self._rows(keys, columns, len(rows))
+
+    def _format_column(self, key, format, column):
+        '''Format the raw values of a column, at once if the field supports it'''
+        if format is None:
+            return list(column)
+        many = self.columns.get(key)
+        if many is not None:
+            column = list(column)
+            formatted = many(column)
+            if formatted is not None:
+                return formatted
+        return list(map(format, column))
+
+    def _rows(self, keys, columns, count):
+        '''Build the marshalled rows from the formatted columns'''
+        factory = OrderedDict if self.ordered else dict
+        if not keys:
+            return [factory() for _ in range(count)]
+        if self.skip_none:
+            return [
+                factory((k, v) for k, v in zip(keys, values) if v is not None and v != {})
+                for values in zip(*columns)
+            ]
+        return [factory(zip(keys, values)) for values in zip(*columns)]
+
+    @property
+    def columnar_plan(self):
+        '''
+        The ``(key, column, getter, default, format)`` entries pulling values off columnar tables
+        or ``None`` if the fields need whole rows (wildcards, nested dicts, callables or custom outputs).
+        '''
+        try:
+            return self._columnar_plan
+        except AttributeError:
+            pass
+        plan = []
+        for key, accessor, format in self.entries:
+            target = accessor.for_columns() if accessor is not None else None
+            if target is None:
+                plan = None
+                break
+            plan.append((key, target[0], target[1], accessor.default, format))
+        self._columnar_plan = None if plan is None else tuple(plan)
+        return self._columnar_plan
+
+    def marshal_columnar(self, data):
+        '''
+        Marshal a pandas DataFrame, a NumPy record array or an Arrow table (see :mod:`~sanic_restplus.columnar`).
+
+        Only the columns of the (masked) fields are read, column by column,
+        and formatted at once if the fields support it.
+        Rows are only materialized (as dicts) for fields needing them
+        (see :attr:`columnar_plan`).
+        '''
+        # ugly local import to avoid dependency loop
+        from .columnar import columnar
+
+        table = columnar(data)
+        plan = self.columnar_plan
+        count = len(table)
+        if plan is None:
+            return self.marshal_many(table.records())
+        keys = []
+        columns = []
+        for key, name, get, default, format in plan:
+            keys.append(key)
+            column = table.column(name) if name in table else [default] * count
+            if get is not None:
+                column = map(get, column)
+            columns.append(self._format_column(key, format, column))
+        return self._rows(keys, columns, count)
+
+    def __call__(self, data):
+        if is_collection(data):
+            out = self.marshal_many(data)
+        elif type(data) is not dict and is_columnar(data):
+            out = self.marshal_columnar(data)
+        else:
+            out = self.marshal_one(data)
+
+        if self.envelope:
+            out = OrderedDict([(self.envelope, out)]) if self.ordered else {self.envelope: out}
+        return out
+
+    def __copy__(self):
+        # Compiled marshallers are immutable
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+class MarshallerCache(object):
+    '''
+    A bounded LRU cache of compiled marshallers with hits and misses counters.
+
+    :param int maxsize: the maximum number of marshallers kept
+    '''
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._marshallers = collections.OrderedDict()
+
+    def get(self, key, factory):
+        '''
+        Get the marshaller for a given key, creating it with ``factory`` if missing.
+        '''
+        marshallers = self._marshallers
+        try:
+            marshaller = marshallers[key]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            marshallers.move_to_end(key)
+            return marshaller
+        self.misses += 1
+        marshaller = factory()
+        marshallers[key] = marshaller
+        if len(marshallers) > self.maxsize:
+            # Drop the least recently used
+            marshallers.popitem(last=False)
+        return marshaller
+
+    def clear(self):
+        self._marshallers.clear()
+        self.hits = self.misses = 0
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._marshallers))
+
+    def __len__(self):
+        return len(self._marshallers)
+
+    def __contains__(self, key):
+        return key in self._marshallers
+
+    def __copy__(self):
+        # Caches are never shared by copies
+        return self.__class__(self.maxsize)
+
+    def __deepcopy__(self, memo):
+        return self.__class__(self.maxsize)
+
+
+def get_marshaller(fields, envelope=None, skip_none=False, mask=None, ordered=False, cache=None,
+                   native=False):
+    '''
+    Get the compiled :class:`Marshaller` for some fields and options.
+
+    Marshallers are cached on models (or in the provided ``cache``)
+    by options and mask so the compilation only happens once.
+
+    :param MarshallerCache cache: an optional cache to use if ``fields`` is not a model
+    '''
+    mask = mask or getattr(fields, '__mask__', None)
+    cache = getattr(fields, '__marshallers__', cache)
+    if cache is None:
+        return Marshaller(fields, envelope, skip_none, mask, ordered, native)
+    try:
+        key = (envelope, skip_none, ordered, mask_key(mask), getattr(fields, 'revision', None), native)
+    except TypeError:
+        return Marshaller(fields, envelope, skip_none, mask, ordered, native)
+    return cache.get(key, lambda: Marshaller(fields, envelope, skip_none, mask, ordered, native))
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+'''
+Compress the API responses with the encoding negotiated from the ``Accept-Encoding`` header:
+``gzip``, and ``br`` or ``zstd`` if `brotli <https://pypi.org/project/Brotli/>`_
+or `zstandard <https://pypi.org/project/zstandard/>`_ are installed
+(see the ``compress`` option of :class:`~sanic_restplus.Api`).
+'''
+import asyncio
+import gzip
+
+from functools import lru_cache
+
+try:
+    import brotli
+    has_brotli = True
+except ImportError:
+    brotli = None
+    has_brotli = False
+
+try:
+    import zstandard
+    has_zstd = True
+except ImportError:
+    zstandard = None
+    has_zstd = False
+
+from .representations import EncodedJSON
+from .utils import NEGOTIATION_CACHE_SIZE, parse_accept_header
+
+__all__ = ('COMPRESS_MIN_SIZE', 'COMPRESS_THREAD_THRESHOLD', 'COMPRESS_LEVELS', 'PRECOMPRESS_LEVELS',
+           'COMPRESS_MIMETYPES', 'COMPRESSORS', 'PrecompressedJSON', 'negotiate_encoding', 'compressible',
+           'add_vary', 'compress_response')
+
+#: Default minimum size (in bytes) of the compressed bodies
+COMPRESS_MIN_SIZE = 1024
+#: Default size (in bytes) above which bodies are compressed in a thread
+COMPRESS_THREAD_THRESHOLD = 256 * 1024
+#: Default compression levels by encoding
+COMPRESS_LEVELS = {'gzip': 6, 'br': 4, 'zstd': 3}
+#: Compression levels of the bodies compressed once (see :class:`PrecompressedJSON`)
+PRECOMPRESS_LEVELS = {'gzip': 9, 'br': 9, 'zstd': 15}
+#: Default compressed mediatypes (and any ``+json`` or ``+xml`` suffixed mediatype)
+COMPRESS_MIMETYPES = frozenset((
+    'application/json', 'application/xml', 'application/javascript',
+    'text/plain', 'text/html', 'text/xml', 'text/csv', 'text/css', 'text/javascript',
+))
+
+
+def compress_gzip(body, level):
+    # A fixed mtime makes the output deterministic
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def compress_brotli(body, level):
+    return brotli.compress(body, quality=level)
+
+
+def compress_zstd(body, level):
+    return zstandard.ZstdCompressor(level=level).compress(body)
+
+
+#: The compressors by encoding, in order of preference for equally accepted encodings
+COMPRESSORS = dict(
+    [('zstd', compress_zstd)] * has_zstd + [('br', compress_brotli)] * has_brotli + [('gzip', compress_gzip)]
+)
+
+
+@lru_cache(maxsize=NEGOTIATION_CACHE_SIZE)
+def negotiate_encoding(accept_encoding, encodings):
+    '''
+    Find the best content coding for an ``Accept-Encoding`` header value (cached).
+
+    :param str accept_encoding: the ``Accept-Encoding`` header value
+    :param tuple encodings: the available encodings, in order of preference
+    :returns: the best encoding or ``None`` to send the body as is
+    '''
+    accepted = {}
+    for coding, quality in parse_accept_header(accept_encoding):
+        accepted.setdefault(coding.lower(), quality)
+    wildcard = accepted.get('*')
+    best, best_quality = None, 0
+    for encoding in encodings:
+        quality = accepted.get(encoding, wildcard)
+        if quality is not None and quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compressible(response, mimetypes=COMPRESS_MIMETYPES, min_size=COMPRESS_MIN_SIZE):
+    '''
+    Wether a response body should be compressed:
+    a large enough, not already encoded body of a compressible mediatype.
+    '''
+    body = getattr(response, 'body', None)
+    if not isinstance(body, bytes) or len(body) < min_size:
+        return False
+    elif response.status < 200 or response.status in (204, 206, 304):
+        return False
+    headers = response.headers
+    if 'content-encoding' in headers:
+        return False
+    mimetype = (headers.get('content-type') or response.content_type or '').split(';', 1)[0].strip().lower()
+    return mimetype in mimetypes or mimetype.endswith(('+json', '+xml'))
+
+
+def add_vary(headers, name='Accept-Encoding'):
+    '''Add a header name to the ``Vary`` header (if not already there)'''
+    vary = headers.get('vary')
+    if not vary:
+        headers['vary'] = name
+    elif vary.strip() != '*' and name.lower() not in (v.strip().lower() for v in vary.split(',')):
+        headers['vary'] = '{0}, {1}'.format(vary, name)
+
+
+class PrecompressedJSON(EncodedJSON):
+    '''
+    A static :class:`~sanic_restplus.representations.EncodedJSON` body (ie. the Swagger specifications)
+    compressed only once per encoding, at the :data:`PRECOMPRESS_LEVELS`.
+
+    :param bytes body: the JSON body
+    '''
+    __slots__ = ('compressed', )
+
+    def __init__(self, body):
+        super(PrecompressedJSON, self).__init__(body)
+        #: The compressed bodies by encoding
+        self.compressed = {}
+
+    def compress(self, encoding):
+        '''Get the body compressed with an encoding (cached)'''
+        try:
+            return self.compressed[encoding]
+        except KeyError:
+            pass
+        compressed = COMPRESSORS[encoding](self.body, PRECOMPRESS_LEVELS[encoding])
+        self.compressed[encoding] = compressed
+        return compressed
+
+    def __repr__(self):
+        return 'PrecompressedJSON({0!r})'.format(self.body)
+
+
+async def compress_response(request, response, precompressed=None):
+    '''
+    Compress a response body with the encoding negotiated for a request.
+
+    Bodies are compressed if they are larger than ``RESTPLUS_COMPRESS_MIN_SIZE`` bytes
+    and of one of the ``RESTPLUS_COMPRESS_MIMETYPES``, with the ``RESTPLUS_COMPRESS_LEVELS`` levels.
+    ``RESTPLUS_COMPRESS_ENCODINGS`` restricts (and orders) the available encodings.
+    Bodies larger than ``RESTPLUS_COMPRESS_THREAD_THRESHOLD`` bytes are compressed in the loop executor
+    so they don't block the event loop.
+    Compressible responses are marked with ``Vary: Accept-Encoding``, even if sent as is.
+    The strong entity tags of the compressed responses are weakened.
+
+    :param request: the current request
+    :param response: the response to compress (modified in place)
+    :param PrecompressedJSON precompressed: the static body of the response if any
+    :returns: the response
+    '''
+    config = request.app.config
+    if not compressible(response, config.get('RESTPLUS_COMPRESS_MIMETYPES', COMPRESS_MIMETYPES),
+                        config.get('RESTPLUS_COMPRESS_MIN_SIZE', COMPRESS_MIN_SIZE)):
+        return response
+    add_vary(response.headers)
+    accept_encoding = request.headers.get('accept-encoding')
+    if not accept_encoding:
+        return response
+    encodings = config.get('RESTPLUS_COMPRESS_ENCODINGS')
+    encodings = tuple(COMPRESSORS) if encodings is None else tuple(e for e in encodings if e in COMPRESSORS)
+    encoding = negotiate_encoding(accept_encoding, encodings)
+    if encoding is None:
+        return response
+    body = response.body
+    threaded = len(body) >= config.get('RESTPLUS_COMPRESS_THREAD_THRESHOLD', COMPRESS_THREAD_THRESHOLD)
+    if precompressed is not None and precompressed.body is body:
+        if encoding in precompressed.compressed or not threaded:
+            compressed = precompressed.compress(encoding)
+        else:
+            compressed = await asyncio.get_running_loop().run_in_executor(None, precompressed.compress, encoding)
+    else:
+        level = config.get('RESTPLUS_COMPRESS_LEVELS', {}).get(encoding, COMPRESS_LEVELS[encoding])
+        if threaded:
+            compressed = await asyncio.get_running_loop().run_in_executor(
+                None, COMPRESSORS[encoding], body, level)
+        else:
+            compressed = COMPRESSORS[encoding](body, level)
+    response.body = compressed
+    response.headers['content-encoding'] = encoding
+    etag = response.headers.get('etag')
+    if etag and not etag.startswith('W/'):
+        # The compressed body is not the tagged one byte for byte
+        response.headers['etag'] = 'W/' + etag
+    response.headers.pop('content-length', None)
+    return response
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+'''
+Entity tags of the API responses and ``304 Not Modified`` answers to the matching ``If-None-Match`` requests,
+from the encoded bodies (see the ``auto_etag`` option of :class:`~sanic_restplus.Api`)
+or from the handlers version keys (see :class:`etag`).
+'''
+import inspect
+import zlib
+
+from functools import wraps
+
+try:
+    import xxhash
+    has_xxhash = True
+except ImportError:
+    xxhash = None
+    has_xxhash = False
+
+from sanic.response import BaseHTTPResponse, HTTPResponse
+
+from .utils import unpack
+
+__all__ = ('ETAG_METHODS', 'hash_body', 'make_etag', 'etag_matches', 'not_modified', 'tag_response', 'etag')
+
+#: The methods whose responses are tagged
+ETAG_METHODS = frozenset(('GET', 'HEAD'))
+
+#: The headers kept in the ``304 Not Modified`` responses
+NOT_MODIFIED_HEADERS = frozenset(('cache-control', 'content-location', 'date', 'etag', 'expires', 'vary'))
+
+
+def hash_body(body):
+    '''
+    A fast non-cryptographic hash of a body:
+    XXH3 if `xxhash <https://pypi.org/project/xxhash/>`_ is installed, its CRC-32 and length otherwise.
+    '''
+    if has_xxhash:
+        return xxhash.xxh3_64_hexdigest(body)
+    return '{0:x}-{1:08x}'.format(len(body), zlib.crc32(body))
+
+
+def make_etag(body, weak=False):
+    '''Make the strong (or weak) entity tag of a body'''
+    tag = '"{0}"'.format(hash_body(body))
+    return 'W/' + tag if weak else tag
+
+
+def etag_matches(if_none_match, etag):
+    '''Wether an ``If-None-Match`` header value matches an entity tag (with the weak comparison)'''
+    if not if_none_match:
+        return False
+    elif if_none_match.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith('W/') else tag) == opaque:
+            return True
+    return False
+
+
+def not_modified(etag, headers=None):
+    '''Make a ``304 Not Modified`` response keeping the caching headers'''
+    headers = {
+        name: value for name, value in (headers or {}).items() if name.lower() in NOT_MODIFIED_HEADERS
+    }
+    headers['ETag'] = etag
+    return HTTPResponse(status=304, headers=headers)
+
+
+def tag_response(request, response, weak=False):
+    '''
+    Tag a successful ``GET`` or ``HEAD`` response with the hash of its body
+    (unless already tagged) and answer ``304 Not Modified`` if it matches the request ``If-None-Match``.
+
+    :param bool weak: Wether the computed tags are weak
+    :returns: the tagged response or the ``304 Not Modified`` response
+    '''
+    if request.method not in ETAG_METHODS or response.status != 200:
+        return response
+    body = getattr(response, 'body', None)
+    if not isinstance(body, bytes):
+        # Streaming responses
+        return response
+    etag = response.headers.get('etag')
+    if etag is None:
+        etag = response.headers['ETag'] = make_etag(body, weak)
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return not_modified(etag, response.headers)
+    return response
+
+
+class etag(object):
+    '''
+    A decorator tagging the responses of a handler with a version key of the resource,
+    ie. a revision number or a modification date.
+
+    The version is given before calling the handler, so the requests whose ``If-None-Match`` header
+    matches are answered ``304 Not Modified`` without calling the handler, marshalling or encoding.
+    The tag also depends on the ``Accept`` and mask headers which change the representation.
+
+    >>> def todo_version(self, request, todo_id):
+    ...     return TODOS.revision(todo_id)
+    ...
+    >>> class Todo(Resource):
+    ...     @etag(todo_version)
+    ...     @marshal_with(todo)
+    ...     def get(self, request, todo_id):
+    ...         return TODOS.get(todo_id)
+
+    :param version: a function (or coroutine function) taking the handler arguments
+                    and returning the version key (``None`` to skip tagging)
+    :param bool weak: Wether the tags are weak
+    '''
+    def __init__(self, version, weak=False):
+        self.version = version
+        self.weak = weak
+
+    def make_etag(self, request, version):
+        '''Make the tag of a resource version for a request'''
+        mask_header = request.app.config.get('RESTPLUS_MASK_HEADER', 'X-Fields')
+        headers = request.headers
+        key = '\0'.join((str(version), headers.get('accept') or '', headers.get(mask_header) or ''))
+        return make_etag(key.encode('utf-8'), self.weak)
+
+    def __call__(self, f):
+        @wraps(f)
+        async def wrapper(*args, **kwargs):
+            for a in args:
+                # Find the 'request' in *args
+                if hasattr(a, 'headers'):
+                    request = a
+                    break
+            else:
+                raise RuntimeError('@etag should be used on an endpoint with request in its args')
+            tag = None
+            if request.method in ETAG_METHODS:
+                version = self.version(*args, **kwargs)
+                if inspect.isawaitable(version):
+                    version = await version
+                if version is not None:
+                    tag = self.make_etag(request, version)
+                    if etag_matches(request.headers.get('if-none-match'), tag):
+                        return not_modified(tag)
+            resp = f(*args, **kwargs)
+            while inspect.isawaitable(resp):
+                resp = await resp
+            if tag is None:
+                return resp
+            elif isinstance(resp, BaseHTTPResponse):
+                if resp.status == 200 and 'etag' not in resp.headers:
+                    resp.headers['ETag'] = tag
+                return resp
+            data, code, headers = unpack(resp)
+            if code != 200:
+                return resp
+            headers = dict(headers or {})
+            headers.setdefault('ETag', tag)
+            return data, code, headers
+        return wrapper
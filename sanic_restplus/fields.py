@@ -1,30 +1,50 @@
 # -*- coding: utf-8 -*-
 #
 import re
+import copy
 import fnmatch
 import inspect
+import dataclasses
 
 from calendar import timegm
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from decimal import Decimal, ROUND_HALF_EVEN
 from email.utils import formatdate
-from functools import lru_cache
+from functools import lru_cache, partial
+from operator import attrgetter, itemgetter
 
 from urllib.parse import urlparse, urlunparse
 
+try:
+    import numpy
+    has_numpy = True
+except ImportError:
+    numpy = None
+    has_numpy = False
 
 from .inputs import date_from_iso8601, datetime_from_iso8601, datetime_from_rfc822, boolean
 from .errors import RestError
+from .compiler import MarshallerCache, get_marshaller
+from .loaders import BatchLoader, loaded
+from .memo import MEMO
 from .marshalling import marshal
-from .utils import camel_to_dash, not_none
+from .representations import JSONFragment
+from .utils import camel_to_dash, not_none, WeakLRUCache
 
 
 __all__ = ('Raw', 'String', 'FormattedString', 'Url', 'DateTime', 'Date',
            'Boolean', 'Integer', 'Float', 'Arbitrary', 'Fixed',
-           'Nested', 'List', 'ClassName', 'Polymorph', 'Wildcard',
+           'Nested', 'List', 'ClassName', 'RawJSON', 'Polymorph', 'Wildcard',
            'StringMixin', 'MinMaxMixin', 'NumberMixin', 'MarshallingError')
 
 
+#: Fields schemas cache (see :attr:`Raw.__schema__`)
+SCHEMA_CACHE = WeakLRUCache(maxsize=1024)
+
+#: Minimum number of values for a column to be formatted at once (see :meth:`Raw.format_many`)
+VECTORIZE_MIN_ROWS = 64
+
+
 class MarshallingError(RestError):
     """
     This is an encapsulating Exception in case of marshalling error.
@@ -39,31 +59,188 @@ def is_indexable_but_not_string(obj):
     return not hasattr(obj, "strip") and hasattr(obj, "__iter__")
 
 
+def _make_getter(key, default=None):
+    '''Build a getter for a single key on any type of object'''
+    index = int(key) if isinstance(key, str) and key.isdigit() else None
+
+    def getter(obj):
+        if is_indexable_but_not_string(obj):
+            try:
+                return obj[key]
+            except (IndexError, TypeError, KeyError):
+                if index is not None:
+                    try:
+                        return obj[index]
+                    except (IndexError, TypeError, KeyError):
+                        pass
+        return getattr(obj, key, default)
+    return getter
+
+
+def _chain(first, getters):
+    '''Chain getters for a dotted path'''
+    if not getters:
+        return first
+
+    def getter(obj):
+        obj = first(obj)
+        for get in getters:
+            obj = get(obj)
+        return obj
+    return getter
+
+
+class Accessor(object):
+    '''
+    A precompiled accessor pulling a keyed value off various types of objects.
+
+    The key is parsed once, so getting a value does not split or probe it anymore.
+
+    :param key: A key, a dotted path (digits are used as indexes on sequences),
+        an integer index or a callable taking the object
+    :param default: The value returned when the key is not found
+
+    The accessor exposes three getters taking the object:
+
+    - ``get`` works on any kind of object
+    - ``from_dict`` is specialized for exact :class:`dict` objects
+    - ``from_object`` is specialized for non indexable objects (or strings)
+    '''
+    def __init__(self, key, default=None):
+        self.key = key
+        self.default = default
+        if isinstance(key, int):
+            self.path = (key,)
+        elif callable(key):
+            self.path = None
+            self.get = self.from_dict = self.from_object = key
+            return
+        else:
+            self.path = tuple(key.split('.'))
+
+        first, rest = self.path[0], [_make_getter(k, default) for k in self.path[1:]]
+        self._rest = rest
+        get = _make_getter(first, default)
+        self.get = _chain(get, rest)
+
+        if isinstance(first, str) and not first.isdigit():
+            def from_dict(obj):
+                try:
+                    return obj[first]
+                except KeyError:
+                    return getattr(obj, first, default)
+            self.from_dict = _chain(from_dict, rest)
+        else:
+            self.from_dict = self.get
+
+        def from_object(obj):
+            return getattr(obj, first, default)
+        self.from_object = _chain(from_object, rest)
+
+    def for_record(self, cls):
+        '''
+        Get a getter specialized for the instances of a record class (see :func:`record_fields`)
+
+        :param type cls: the record class
+        '''
+        if self.path is None:
+            return self.get
+        getter = record_getters(cls).get(self.path[0])
+        if getter is None:
+            return self.get if issubclass(cls, tuple) else self.from_object
+        return _chain(getter, self._rest)
+
+    def for_columns(self):
+        '''
+        Get how to pull values off a columnar table (see :mod:`~sanic_restplus.columnar`).
+
+        :returns: a ``(column, getter)`` pair where ``getter`` pulls the value off the column values
+            (``None`` for the values themselves) or ``None`` if the whole rows are needed
+            (callables and indexes)
+        '''
+        if self.path is None:
+            return None
+        first = self.path[0]
+        if not isinstance(first, str) or first.isdigit():
+            return None
+        return first, _chain(self._rest[0], self._rest[1:]) if self._rest else None
+
+    def __repr__(self):
+        return 'Accessor({0!r})'.format(self.key)
+
+
+@lru_cache(maxsize=1024)
+def make_accessor(key, default=None):
+    '''Get a cached :class:`Accessor` for a given key'''
+    return Accessor(key, default)
+
+
 def get_value(key, obj, default=None):
     '''Helper for pulling a keyed value off various types of objects'''
-    if isinstance(key, int):
-        return _get_value_for_key(key, obj, default)
-    elif callable(key):
-        return key(obj)
-    else:
-        return _get_value_for_keys(key.split('.'), obj, default)
+    try:
+        accessor = make_accessor(key, default)
+    except TypeError:
+        # Unhashable callable or default
+        accessor = Accessor(key, default)
+    return accessor.get(obj)
 
 
-def _get_value_for_keys(keys, obj, default):
-    if len(keys) == 1:
-        return _get_value_for_key(keys[0], obj, default)
-    else:
-        return _get_value_for_keys(
-            keys[1:], _get_value_for_key(keys[0], obj, default), default)
+def is_namedtuple(cls):
+    return issubclass(cls, tuple) and hasattr(cls, '_fields')
 
 
-def _get_value_for_key(key, obj, default):
-    if is_indexable_but_not_string(obj):
-        try:
-            return obj[key]
-        except (IndexError, TypeError, KeyError):
-            pass
-    return getattr(obj, key, default)
+def _slots(cls):
+    '''Iterate over the slots names declared by a class and its parents'''
+    for klass in reversed(cls.__mro__):
+        slots = klass.__dict__.get('__slots__', ())
+        for name in (slots, ) if isinstance(slots, str) else slots:
+            if name in ('__dict__', '__weakref__'):
+                continue
+            elif name.startswith('__') and not name.endswith('__'):
+                # Private names are mangled
+                name = '_{0}{1}'.format(klass.__name__.lstrip('_'), name)
+            yield name
+
+
+@lru_cache(maxsize=256)
+def record_fields(cls):
+    '''
+    Get the fields declared by a record class: a dataclass, an attrs class,
+    a namedtuple or a class with ``__slots__`` (and no instance ``__dict__``).
+
+    :param type cls: the class to inspect
+    :returns: the fields names or ``None`` if it is not a record class
+    :rtype: tuple
+    '''
+    if dataclasses.is_dataclass(cls):
+        return tuple(field.name for field in dataclasses.fields(cls))
+    attributes = getattr(cls, '__attrs_attrs__', None)
+    if attributes is not None:
+        return tuple(attribute.name for attribute in attributes)
+    elif is_namedtuple(cls):
+        return tuple(cls._fields)
+    elif cls.__dictoffset__ == 0 and hasattr(cls, '__slots__'):
+        return tuple(_slots(cls))
+    return None
+
+
+@lru_cache(maxsize=256)
+def record_getters(cls):
+    '''
+    Get C level getters for the fields always set on a record class instances:
+    indexes for namedtuples, attributes initialized by the constructor for dataclasses and attrs classes.
+
+    :param type cls: the record class
+    :rtype: dict
+    '''
+    if is_namedtuple(cls):
+        return dict((name, itemgetter(index)) for index, name in enumerate(cls._fields))
+    elif dataclasses.is_dataclass(cls):
+        return dict((field.name, attrgetter(field.name)) for field in dataclasses.fields(cls) if field.init)
+    attributes = getattr(cls, '__attrs_attrs__', None)
+    if attributes is not None:
+        return dict((attribute.name, attrgetter(attribute.name)) for attribute in attributes if attribute.init)
+    return {}
 
 
 def to_marshallable_type(obj):
@@ -77,6 +254,11 @@ def to_marshallable_type(obj):
     if hasattr(obj, '__marshallable__'):
         return obj.__marshallable__()
 
+    names = record_fields(type(obj))
+    if names is not None:
+        # Unset slots are skipped
+        return dict((name, getattr(obj, name)) for name in names if hasattr(obj, name))
+
     if hasattr(obj, '__getitem__'):
         return obj  # it is indexable it is ok
 
@@ -101,6 +283,8 @@ class Raw(object):
     :param bool readonly: Is the field read only ? (for documentation purpose)
     :param example: An optional data example (for documentation purpose)
     :param callable mask: An optional mask function to be applied to output
+    :param callable loader: An optional batch loader: the raw value is used as a key
+        and the loaded value is output instead (see :ref:`loaders`)
     '''
     #: The JSON/Swagger schema type
     __schema_type__ = 'object'
@@ -110,7 +294,7 @@ class Raw(object):
     __schema_example__ = None
 
     def __init__(self, default=None, attribute=None, title=None, description=None,
-                 required=None, readonly=None, example=None, mask=None, **kwargs):
+                 required=None, readonly=None, example=None, mask=None, loader=None, **kwargs):
         self.attribute = attribute
         self.default = default
         self.title = title
@@ -119,6 +303,7 @@ class Raw(object):
         self.readonly = readonly
         self.example = example or self.__schema_example__
         self.mask = mask
+        self.loader = BatchLoader.of(loader)
 
     def format(self, value):
         '''
@@ -148,7 +333,9 @@ class Raw(object):
         :raises MarshallingError: In case of formatting problem
         '''
 
-        value = get_value(key if self.attribute is None else self.attribute, obj)
+        value = self.accessor(key).get(obj)
+        if self.loader is not None:
+            value = loaded(self.loader, value)
 
         if value is None:
             default = self._v('default')
@@ -161,14 +348,116 @@ class Raw(object):
             raise MarshallingError(msg)
         return self.mask.apply(data) if self.mask else data
 
+    def accessor(self, key):
+        '''
+        Get the cached :class:`Accessor` pulling this field value off objects.
+
+        :param str key: The field key in the marshalled model
+        '''
+        attribute = key if self.attribute is None else self.attribute
+        try:
+            return make_accessor(attribute)
+        except TypeError:
+            # Unhashable callable
+            return Accessor(attribute)
+
+    def compile(self, key, ordered=False, native=False):
+        '''
+        Compile this field output for the given key.
+        It is used by compiled marshallers to avoid per-call dispatch.
+
+        Returns an ``(accessor, format)`` pair where ``accessor`` is the :class:`Accessor`
+        pulling the raw value off the object and ``format`` is a function turning
+        this value into the same result as :meth:`output`
+        (or ``None`` if the raw value is output as is).
+
+        Fields overriding :meth:`output` without overriding this method
+        return ``(None, output)`` where ``output`` takes the whole object.
+
+        :param str key: The field key in the marshalled model
+        :param bool ordered: Wether or not to preserve order
+        :param bool native: Wether or not the output is encoded by a JSON encoder
+                            handling native types (see :meth:`format_native`)
+        '''
+        if type(self).output is not Raw.output:
+            return None, partial(self.output, key, ordered=ordered)
+
+        format = self.native_formatter() if native else self.format
+        mask = self.mask
+        loader = self.loader
+        _v = self._v
+
+        if type(self).format is Raw.format and not mask and self.default is None and loader is None:
+            return self.accessor(key), None
+
+        def output(value):
+            if loader is not None:
+                value = loaded(loader, value)
+            if value is None:
+                default = _v('default')
+                return format(default) if default else default
+            try:
+                data = format(value)
+            except MarshallingError as e:
+                msg = 'Unable to marshal field "{0}" value "{1}": {2}'.format(key, value, str(e))
+                raise MarshallingError(msg)
+            return mask.apply(data) if mask else data
+        return self.accessor(key), output
+
+    def format_many(self, values):
+        '''
+        Format a whole column of values at once.
+        It is used by compiled marshallers to format collections column by column.
+
+        Returns ``None`` if the values can't be formatted at once
+        (ie. ``None`` values or mixed types) so they are formatted one by one
+        with :meth:`format`. It must return the same values :meth:`format` would.
+
+        :param list values: the raw values of the column
+        '''
+        return None
+
+    def native_formatter(self):
+        '''
+        Get the function formatting values for an encoder handling native types:
+        :meth:`format_native` unless :meth:`format` is overridden by a subclass.
+        '''
+        for cls in type(self).__mro__:
+            if 'format_native' in vars(cls):
+                return self.format_native
+            elif 'format' in vars(cls):
+                return self.format
+        return self.format
+
+    def many_formatter(self):
+        '''
+        Get the function formatting whole columns: :meth:`format_many`
+        unless :meth:`format` or :meth:`output` are overridden by a subclass,
+        the output is masked or the values are loaded.
+        '''
+        if self.mask or self.loader is not None or type(self).output is not Raw.output:
+            return None
+        for cls in type(self).__mro__:
+            if 'format_many' in vars(cls):
+                return None if cls is Raw else self.format_many
+            elif 'format' in vars(cls):
+                return None
+        return None
+
+    def __getstate__(self):
+        # Compiled marshallers caches are not pickled
+        return dict((k, v) for k, v in self.__dict__.items() if k not in ('_marshallers', '_dispatch'))
+
     def _v(self, key):
         '''Helper for getting a value from attribute allowing callable'''
         value = getattr(self, key)
         return value() if callable(value) else value
 
     @property
-    @lru_cache()
     def __schema__(self):
+        return SCHEMA_CACHE.get(self, Raw._build_schema)
+
+    def _build_schema(self):
         return not_none(self.schema())
 
     def schema(self):
@@ -194,33 +483,79 @@ class Nested(Raw):
     :param bool skip_none: Optional key will be used to eliminate inner fields
                            which value is None or the inner field's key not
                            exist in data
+    :param ResultCache cache: An optional cache of the marshalled nested objects
+        (see :class:`~sanic_restplus.cache.ResultCache`)
     :param kwargs: If ``default`` keyword argument is present, a nested
         dictionary will be marshaled as its value if nested dictionary is
         all-null keys (e.g. lets you return an empty JSON object instead of
         null)
     '''
     __schema_type__ = None
+    #: The attributes shared by the deep copies
+    _shared = ('model', )
 
-    def __init__(self, model, allow_null=False, skip_none=False, as_list=False, **kwargs):
+    def __init__(self, model, allow_null=False, skip_none=False, as_list=False, cache=None, **kwargs):
         self.model = model
         self.as_list = as_list
         self.allow_null = allow_null
         self.skip_none = skip_none
+        self.cache = cache
         super(Nested, self).__init__(**kwargs)
 
     @property
     def nested(self):
         return getattr(self.model, 'resolved', self.model)
 
+    def marshaller(self, ordered=False, native=False):
+        '''Get the compiled marshaller for the nested model'''
+        cache = self.__dict__.setdefault('_marshallers', MarshallerCache())
+        marshaller = get_marshaller(self.model, skip_none=self.skip_none, ordered=ordered, cache=cache,
+                                    native=native)
+        if self.cache is not None:
+            return self.cache.wrap(marshaller)
+        return marshaller
+
     def output(self, key, obj, ordered=False, **kwargs):
-        value = get_value(key if self.attribute is None else self.attribute, obj)
+        value = self.accessor(key).get(obj)
+        if self.loader is not None:
+            value = loaded(self.loader, value)
         if value is None:
             if self.allow_null:
                 return None
             elif self.default is not None:
                 return self.default
 
-        return marshal(value, self.nested, skip_none=self.skip_none, ordered=ordered)
+        marshaller = self.marshaller(ordered)
+        memo = MEMO.get()
+        return marshaller(value) if memo is None else memo.marshal(marshaller, value)
+
+    def compile(self, key, ordered=False, native=False):
+        if type(self).output is not Nested.output:
+            return super(Nested, self).compile(key, ordered=ordered, native=native)
+
+        allow_null = self.allow_null
+        default = self.default
+        loader = self.loader
+        model = self.model
+        marshaller = revision = None
+
+        def output(value):
+            nonlocal marshaller, revision
+            if loader is not None:
+                value = loaded(loader, value)
+            if value is None:
+                if allow_null:
+                    return None
+                elif default is not None:
+                    return default
+            # Resolved lazily to support recursive models, and again when the nested model is mutated
+            current = getattr(model, 'revision', None)
+            if marshaller is None or current != revision:
+                marshaller = self.marshaller(ordered, native)
+                revision = current
+            memo = MEMO.get()
+            return marshaller(value) if memo is None else memo.marshal(marshaller, value)
+        return self.accessor(key), output
 
     def schema(self):
         schema = super(Nested, self).schema()
@@ -238,8 +573,16 @@ class Nested(Raw):
             schema['$ref'] = ref
         return schema
 
+    def __deepcopy__(self, memo):
+        # The nested models are shared (ie. by resolved models) so their mutations are seen by the marshallers
+        copied = memo[id(self)] = self.__class__.__new__(self.__class__)
+        for name, value in self.__dict__.items():
+            copied.__dict__[name] = value if name in self._shared else copy.deepcopy(value, memo)
+        return copied
+
     def clone(self, mask=None):
         kwargs = self.__dict__.copy()
+        kwargs.pop('_marshallers', None)
         model = kwargs.pop('model')
         if mask:
             model = mask.apply(model.resolved if hasattr(model, 'resolved') else model)
@@ -274,6 +617,22 @@ class List(Raw):
         if isinstance(value, set):
             value = list(value)
 
+        container = self.container
+        if type(container) is Nested and container.attribute is None and container.loader is None:
+            # Marshal the whole collection at once
+            rows = list(value)
+            if all(row is not None for row in rows):
+                marshaller = container.marshaller()
+                memo = MEMO.get()
+                return marshaller.marshal_many(rows) if memo is None else memo.marshal_many(marshaller, rows)
+
+        if self.is_primitive:
+            if type(container) is Raw and container.default is None:
+                return list(value)
+            items = self.format_items(value)
+            if items is not None:
+                return items
+
         is_nested = isinstance(self.container, Nested) or type(self.container) is Raw
 
         def is_attr(val):
@@ -285,8 +644,47 @@ class List(Raw):
             for idx, val in enumerate(value)
         ]
 
+    @property
+    def is_primitive(self):
+        '''
+        Wether the elements are formatted by the container :meth:`~Raw.format` alone
+        (ie. ``String``, ``Integer``, ``Float``, ``Boolean`` or plain ``Raw`` containers)
+        '''
+        container = self.container
+        if type(container).output is not Raw.output or container.mask:
+            return False
+        return container.attribute is None and container.loader is None
+
+    def format_items(self, value):
+        '''
+        Format the elements of a primitive list (see :attr:`is_primitive`)
+        with the container :meth:`~Raw.format_many` or :meth:`~Raw.format` directly.
+        ``None`` and dict elements are output as :meth:`format` would do.
+
+        Returns ``None`` on formatting errors so they are reported per element.
+        '''
+        container = self.container
+        items = value if isinstance(value, list) else list(value)
+        many = container.many_formatter()
+        if many is not None:
+            formatted = many(items)
+            if formatted is not None:
+                return formatted
+        format = container.format
+        output = container.output
+        try:
+            return [
+                format(item) if item is not None and not isinstance(item, dict)
+                else output(idx, item if item is not None else items)
+                for idx, item in enumerate(items)
+            ]
+        except MarshallingError:
+            return None
+
     def output(self, key, data, ordered=False, **kwargs):
-        value = get_value(key if self.attribute is None else self.attribute, data)
+        value = self.accessor(key).get(data)
+        if self.loader is not None:
+            value = loaded(self.loader, value)
         # we cannot really test for external dict behavior
         if is_indexable_but_not_string(value) and not isinstance(value, dict):
             return self.format(value)
@@ -347,6 +745,27 @@ class MinMaxMixin(object):
         return schema
 
 
+def numeric_column(values):
+    '''
+    Get the type of a column of numbers and its NumPy array
+    if it can be formatted at once (see :meth:`Raw.format_many`).
+
+    :returns: an ``(int or float, numpy.ndarray)`` pair (without array for integers overflowing 64 bits)
+        or ``None`` if NumPy is missing, the column is too small or has mixed types
+    '''
+    if numpy is None or len(values) < VECTORIZE_MIN_ROWS:
+        return None
+    kinds = set(map(type, values))
+    if kinds == {float}:
+        return float, numpy.array(values, dtype=numpy.float64)
+    elif kinds == {int}:
+        try:
+            return int, numpy.array(values, dtype=numpy.int64)
+        except OverflowError:
+            return int, None
+    return None
+
+
 class NumberMixin(MinMaxMixin):
     __schema_type__ = 'number'
 
@@ -402,6 +821,19 @@ class Integer(NumberMixin, Raw):
         except ValueError as ve:
             raise MarshallingError(ve)
 
+    def format_many(self, values):
+        column = numeric_column(values)
+        if column is None:
+            return None
+        kind, array = column
+        if kind is int:
+            return list(values)
+        # Non finite floats raise and big floats overflow 64 bits integers
+        if not (numpy.abs(array) < 2.0 ** 63).all():
+            return None
+        # Truncated toward zero as int() does
+        return array.astype(numpy.int64).tolist()
+
 
 class Float(NumberMixin, Raw):
     '''
@@ -416,6 +848,22 @@ class Float(NumberMixin, Raw):
         except ValueError as ve:
             raise MarshallingError(ve)
 
+    def format_native(self, value):
+        if type(value) is float:
+            return value
+        return self.format(value)
+
+    def format_many(self, values):
+        column = numeric_column(values)
+        if column is None:
+            return None
+        kind, array = column
+        if kind is float:
+            return list(values)
+        elif array is None:
+            return None
+        return array.astype(numpy.float64).tolist()
+
 
 class Arbitrary(NumberMixin, Raw):
     '''
@@ -427,9 +875,20 @@ class Arbitrary(NumberMixin, Raw):
     def format(self, value):
         return str(Decimal(value))
 
+    def format_many(self, values):
+        column = numeric_column(values)
+        if column is None or column[0] is not int:
+            # Floats are output with their exact binary value
+            return None
+        return list(map(str, values))
+
 
 ZERO = Decimal()
 
+#: Fixed numbers below this magnitude are exactly formatted without :class:`~decimal.Decimal`
+FIXED_FAST_LIMIT = 10 ** 21
+FIXED_FAST_DECIMALS = 6
+
 
 class Fixed(NumberMixin, Raw):
     '''
@@ -437,6 +896,7 @@ class Fixed(NumberMixin, Raw):
     '''
     def __init__(self, decimals=5, **kwargs):
         super(Fixed, self).__init__(**kwargs)
+        self.decimals = decimals
         self.precision = Decimal('0.' + '0' * (decimals - 1) + '1')
 
     def format(self, value):
@@ -445,6 +905,37 @@ class Fixed(NumberMixin, Raw):
             raise MarshallingError('Invalid Fixed precision number.')
         return str(dvalue.quantize(self.precision, rounding=ROUND_HALF_EVEN))
 
+    def format_native(self, value):
+        # Printf style formatting rounds half to even the exact binary value as Decimal does
+        decimals = self.decimals
+        if 0 < decimals <= FIXED_FAST_DECIMALS:
+            kind = type(value)
+            # Non finite floats fail the range check and raise the usual error
+            if kind is int and -FIXED_FAST_LIMIT < value < FIXED_FAST_LIMIT:
+                return '%d.%s' % (value, '0' * decimals)
+            elif kind is float and -FIXED_FAST_LIMIT < value < FIXED_FAST_LIMIT:
+                return '%.*f' % (decimals, value)
+        return self.format(value)
+
+    def format_many(self, values):
+        decimals = self.decimals
+        column = numeric_column(values) if 0 < decimals <= FIXED_FAST_DECIMALS else None
+        if column is None:
+            return None
+        kind, array = column
+        if array is None:
+            return None
+        elif kind is int:
+            # 64 bits integers are below the limit
+            suffix = '.' + '0' * decimals
+            return [str(value) + suffix for value in values]
+        # Non finite floats fail the range check
+        if not (numpy.abs(array) < FIXED_FAST_LIMIT).all():
+            return None
+        # Printf style formatting rounds half to even the exact binary value as Decimal does
+        template = '%.{0}f'.format(decimals)
+        return [template % value for value in values]
+
 
 class Boolean(Raw):
     '''
@@ -458,6 +949,9 @@ class Boolean(Raw):
         return boolean(value)
 
 
+MINUTE = timedelta(minutes=1)
+
+
 class DateTime(MinMaxMixin, Raw):
     '''
     Return a formatted datetime string in UTC. Supported formats are RFC 822 and ISO 8601.
@@ -520,6 +1014,23 @@ class DateTime(MinMaxMixin, Raw):
         '''
         return dt.isoformat()
 
+    @property
+    def _default_iso8601(self):
+        '''Wether the ISO 8601 formatting is not overridden'''
+        cls = type(self)
+        return cls.format is DateTime.format and cls.format_iso8601 is DateTime.format_iso8601
+
+    def format_native(self, value):
+        if type(value) is not datetime or self.dt_format != 'iso8601' or not self._default_iso8601:
+            return self.format(value)
+        # The encoder outputs the whole minutes UTC offsets as isoformat() does,
+        # but naive and UTC datetimes with a ``Z`` suffix (as for the other fields)
+        offset = value.utcoffset()
+        if offset and not offset % MINUTE:
+            return value
+        # Same output as format() without parsing
+        return value.isoformat()
+
     def _for_schema(self, name):
         value = self.parse(self._v(name))
         return self.format(value) if value else None
@@ -556,6 +1067,11 @@ class Date(DateTime):
         else:
             raise ValueError('Unsupported Date format')
 
+    def format_native(self, value):
+        if type(value) is date:
+            return value
+        return self.format(value)
+
 
 class Url(StringMixin, Raw):
     '''
@@ -634,6 +1150,20 @@ class ClassName(String):
         return camel_to_dash(classname) if self.dash else classname
 
 
+class RawJSON(Raw):
+    '''
+    A pre-encoded JSON value (ie. a stored document) output as is without being decoded.
+
+    ``bytes``, ``bytearray``, ``memoryview`` and ``str`` values are wrapped into
+    :class:`~sanic_restplus.representations.JSONFragment` spliced by the JSON encoders.
+    Other values are considered as already decoded and left untouched.
+    '''
+    def format(self, value):
+        if isinstance(value, (bytes, bytearray, memoryview, str)):
+            return JSONFragment(value)
+        return value
+
+
 class Polymorph(Nested):
     '''
     A Nested field handling inheritance.
@@ -651,16 +1181,85 @@ class Polymorph(Nested):
             owner: fields.Polymorph(mapping)
         })
 
-    :param dict mapping: Maps classes to their model/fields representation
+    The model is resolved once per concrete class (from its MRO)
+    and the mapped models marshallers are compiled once.
+
+    Plain dictionaries can be dispatched on one of their keys
+    given a ``discriminator_key``: its value is matched against
+    the string keys of the mapping, then against the models names.
+
+    .. code-block:: python
+
+        fields.Polymorph({'child1': child1_fields, Child2: child2_fields}, discriminator_key='type')
+
+    :param dict mapping: Maps classes (or discriminator values) to their model/fields representation
+    :param str discriminator_key: An optional key to dispatch dictionaries on
     '''
-    def __init__(self, mapping, required=False, **kwargs):
+    _shared = ('model', 'mapping', '_dispatch')
+
+    def __init__(self, mapping, required=False, discriminator_key=None, **kwargs):
         self.mapping = mapping
+        self.discriminator_key = discriminator_key
         parent = self.resolve_ancestor(list(mapping.values()))
         super(Polymorph, self).__init__(parent, allow_null=not required, **kwargs)
 
+    def resolve_class(self, cls):
+        '''
+        Resolve the mapped model for a given class.
+
+        :raises ValueError: if none or many mapped classes are found in the class MRO
+        '''
+        candidates = [fields for klass, fields in self.mapping.items()
+                      if isinstance(klass, type) and issubclass(cls, klass)]
+
+        if len(candidates) <= 0:
+            raise ValueError('Unknown class: ' + cls.__name__)
+        elif len(candidates) > 1:
+            raise ValueError('Unable to determine a candidate for: ' + cls.__name__)
+        return candidates[0]
+
+    def resolve_discriminator(self, value):
+        '''
+        Resolve the mapped model for a given discriminator value.
+
+        :raises ValueError: if no mapped model matches the value
+        '''
+        for models in (
+            [fields for key, fields in self.mapping.items() if key == value and isinstance(key, str)],
+            [fields for fields in self.mapping.values() if getattr(fields, 'name', None) == value],
+        ):
+            if models:
+                return models[0]
+        raise ValueError('Unknown discriminator value: {0!r}'.format(value))
+
+    def _marshaller_for(self, value, ordered):
+        '''Get the compiled marshaller for a value (cached by class or discriminator value)'''
+        key = self.discriminator_key
+        if key is not None and isinstance(value, dict):
+            token, resolve = value.get(key), self.resolve_discriminator
+        else:
+            token, resolve = value.__class__, self.resolve_class
+        dispatch = self.__dict__.setdefault('_dispatch', {})
+        try:
+            model, revision, marshaller = dispatch[token, ordered]
+        except KeyError:
+            model = resolve(token)
+        except TypeError:
+            # Unhashable discriminator value
+            raise ValueError('Unknown discriminator value: {0!r}'.format(token))
+        else:
+            if getattr(model, 'revision', None) == revision:
+                return marshaller
+        # Compiled again when the mapped model is mutated
+        marshaller = get_marshaller(model, mask=self.mask, ordered=ordered)
+        dispatch[token, ordered] = model, getattr(model, 'revision', None), marshaller
+        return marshaller
+
     def output(self, key, obj, ordered=False, **kwargs):
         # Copied from upstream NestedField
-        value = get_value(key if self.attribute is None else self.attribute, obj)
+        value = self.accessor(key).get(obj)
+        if self.loader is not None:
+            value = loaded(self.loader, value)
         if value is None:
             if self.allow_null:
                 return None
@@ -671,14 +1270,9 @@ class Polymorph(Nested):
         if not hasattr(value, '__class__'):
             raise ValueError('Polymorph field only accept class instances')
 
-        candidates = [fields for cls, fields in self.mapping.items() if isinstance(value, cls)]
-
-        if len(candidates) <= 0:
-            raise ValueError('Unknown class: ' + value.__class__.__name__)
-        elif len(candidates) > 1:
-            raise ValueError('Unable to determine a candidate for: ' + value.__class__.__name__)
-        else:
-            return marshal(value, candidates[0].resolved, mask=self.mask, ordered=ordered)
+        marshaller = self._marshaller_for(value, ordered)
+        memo = MEMO.get()
+        return marshaller(value) if memo is None else memo.marshal(marshaller, value)
 
     def resolve_ancestor(self, models):
         '''
@@ -697,6 +1291,8 @@ class Polymorph(Nested):
 
     def clone(self, mask=None):
         data = self.__dict__.copy()
+        data.pop('_marshallers', None)
+        data.pop('_dispatch', None)
         mapping = data.pop('mapping')
         for field in ('allow_null', 'model'):
             data.pop(field, None)
@@ -705,19 +1301,52 @@ class Polymorph(Nested):
         return Polymorph(mapping, **data)
 
 
+@lru_cache(maxsize=256)
+def _glob(pattern):
+    '''Compile a glob pattern into a case insensitive match function'''
+    return re.compile(fnmatch.translate(pattern), re.IGNORECASE).match
+
+
+def _is_public(name):
+    return not (name.startswith('__') and name.endswith('__'))
+
+
+@lru_cache(maxsize=256)
+def _class_attributes(cls):
+    '''The candidate attributes names of a class (ie. no dunder and no method)'''
+    return frozenset(
+        name for name in dir(cls)
+        if _is_public(name) and not inspect.isroutine(inspect.getattr_static(cls, name, None))
+    )
+
+
+def _attributes(obj):
+    '''Iterate over the ``(name, value)`` data attributes of an object, sorted by name'''
+    try:
+        names = _class_attributes(type(obj))
+    except TypeError:
+        # Unhashable class
+        names = _class_attributes.__wrapped__(type(obj))
+    instance = getattr(obj, '__dict__', None)
+    if instance:
+        names = names.union(name for name in instance if _is_public(name))
+    for name in sorted(names):
+        try:
+            value = getattr(obj, name)
+        except AttributeError:
+            continue
+        if not inspect.isroutine(value):
+            yield name, value
+
+
 class Wildcard(Raw):
     '''
     Field for marshalling list of "unkown" fields.
 
+    The field holds no marshalling state so it can be shared by concurrent calls.
+
     :param cls_or_instance: The field type the list will contain.
     '''
-    exclude = set()
-    # cache the flat object
-    _flat = None
-    _obj = None
-    _cache = set()
-    _last = None
-
     def __init__(self, cls_or_instance, **kwargs):
         super(Wildcard, self).__init__(**kwargs)
         error_msg = 'The type of the wildcard elements must be a subclass of fields.Raw'
@@ -732,66 +1361,43 @@ class Wildcard(Raw):
 
     def _flatten(self, obj):
         if obj is None:
-            return None
-        if obj == self._obj and self._flat is not None:
-            return self._flat
+            return ()
         if isinstance(obj, dict):
-            self._flat = [(k,v) for k,v in obj.items()]
-        else:
-
-            def __match_attributes(attribute):
-                attr_name, attr_obj = attribute
-                if inspect.isroutine(attr_obj) or \
-                        (attr_name.startswith('__') and attr_name.endswith('__')):
-                    return False
-                return True
-
-            attributes = inspect.getmembers(obj)
-            self._flat = [x for x in attributes if __match_attributes(x)]
-
-        self._cache = set()
-        self._obj = obj
-        return self._flat
-
-    @property
-    def key(self):
-        return self._last
-
-    def reset(self):
-        self.exclude = set()
-        self._flat = None
-        self._obj = None
-        self._cache = set()
-        self._last = None
-
-    def output(self, key, obj, ordered=False):
-        value = None
-        reg = fnmatch.translate(key)
-
-        if self._flatten(obj):
-            while True:
-                try:
-                    # we are using pop() so that we don't
-                    # loop over the whole object every time dropping the
-                    # complexity to O(n)
-                    (objkey, val) = self._flat.pop()
-                    if objkey not in self._cache and \
-                            objkey not in self.exclude and \
-                            re.match(reg, objkey, re.IGNORECASE):
-                        value = val
-                        self._cache.add(objkey)
-                        self._last = objkey
-                        break
-                except IndexError:
-                    break
+            return obj.items()
+        return _attributes(obj)
 
+    def _format(self, value):
         if value is None:
             if self.default is not None:
                 return self.container.format(self.default)
             return None
-
         return self.container.format(value)
 
+    def compile(self, key, ordered=False):
+        '''
+        Compile the field for a given key pattern.
+
+        :returns: an ``expand(obj, exclude=())`` function iterating over the ``(key, value)``
+            pairs of the object keys matching the pattern (and not excluded).
+            If there is no matching key, the default value is given for the pattern key.
+        '''
+        match = _glob(key)
+
+        def expand(obj, exclude=()):
+            found = False
+            for name, value in self._flatten(obj):
+                if name not in exclude and match(name):
+                    found = True
+                    yield name, self._format(value)
+            if not found:
+                yield key, self._format(None)
+        return expand
+
+    def output(self, key, obj, ordered=False, **kwargs):
+        '''Get the first value matching the key pattern'''
+        for _, value in self.compile(key, ordered)(obj):
+            return value
+
     def schema(self):
         schema = super(Wildcard, self).schema()
         schema['type'] = 'object'
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+'''
+Batched asynchronous loading of the fields values (DataLoader style).
+
+A field declaring a ``loader`` outputs the value loaded for its raw value (used as a key).
+Before marshalling, the keys of all the marshalled objects are collected field by field
+and loaded with a single loader call per field and nesting level.
+Loaders of a same level run concurrently and the loaded values are memoized for the request.
+'''
+import asyncio
+import inspect
+
+from collections.abc import Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .columnar import columnar, is_columnar
+from .compiler import is_collection, make
+
+__all__ = ('BatchLoader', 'LoaderContext', 'LOADED', 'has_loaders', 'loaded', 'loader_context', 'loading')
+
+#: The loader context of the marshalling in progress (see :func:`loaded`)
+LOADED = ContextVar('restplus_loaded', default=None)
+
+
+class BatchLoader(object):
+    '''
+    Wrap a batch loading function given as a field ``loader``.
+
+    The function takes the list of keys to load and returns (or resolves to)
+    either the list of values in the same order or a mapping of keys to values
+    (missing keys are loaded as ``None``). Keys must be hashable.
+
+    Fields copies share the same loader and loaded values are memoized
+    by function (so fields using the same function share them).
+
+    :param callable fn: the batch loading function (a coroutine function or not)
+    '''
+    def __init__(self, fn):
+        self.fn = fn
+
+    @classmethod
+    def of(cls, loader):
+        '''Wrap a loader function (if not already wrapped)'''
+        if loader is None or isinstance(loader, BatchLoader):
+            return loader
+        return cls(loader)
+
+    async def __call__(self, keys):
+        values = self.fn(keys)
+        if inspect.isawaitable(values):
+            values = await values
+        if isinstance(values, Mapping):
+            return [values.get(key) for key in keys]
+        values = list(values)
+        if len(values) != len(keys):
+            raise ValueError('Loader {0!r} returned {1} values for {2} keys'.format(
+                self.fn, len(values), len(keys)))
+        return values
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return 'BatchLoader({0!r})'.format(self.fn)
+
+
+class LoaderContext(object):
+    '''
+    The values loaded for a request (see :func:`loader_context`).
+
+    Keys being loaded are not requested twice by concurrent loads.
+    '''
+    def __init__(self):
+        self.values = {}
+        self._pending = {}
+
+    async def load_many(self, loader, keys):
+        '''
+        Load the values of some keys (``None`` keys are loaded as ``None``).
+
+        :param BatchLoader loader: the field loader
+        :param list keys: the keys to load (duplicates are loaded once)
+        :returns: the loaded values in the keys order
+        '''
+        values = self.values.setdefault(loader.fn, {})
+        pending = self._pending.setdefault(loader.fn, {})
+        future = asyncio.get_running_loop().create_future()
+        missing = []
+        waiting = set()
+        for key in keys:
+            if key is None or key in values:
+                continue
+            elif key not in pending:
+                pending[key] = future
+                missing.append(key)
+            elif pending[key] is not future:
+                waiting.add(pending[key])
+        if missing:
+            try:
+                values.update(zip(missing, await loader(missing)))
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                # Only concurrent loads waiting for these keys need to retrieve it
+                future.exception()
+                raise
+            else:
+                future.set_result(None)
+            finally:
+                for key in missing:
+                    pending.pop(key, None)
+        if waiting:
+            await asyncio.gather(*waiting)
+        return [None if key is None else values.get(key) for key in keys]
+
+    async def prefetch(self, fields, data):
+        '''
+        Load the values of all the loader fields for some data (an object or a collection),
+        one level of nested fields after the other.
+
+        :param dict fields: the (resolved and masked) fields
+        '''
+        if is_collection(data):
+            rows = data
+        elif type(data) is not dict and is_columnar(data):
+            rows = columnar(data).records()
+        else:
+            rows = [data]
+        await self._prefetch_rows(fields, [row for row in rows if row is not None])
+
+    async def _prefetch_rows(self, fields, rows):
+        if not rows:
+            return
+        jobs = []
+        for key, value in fields.items():
+            if isinstance(value, dict):
+                # Nested dicts read the same objects
+                jobs.append(self._prefetch_rows(value, rows))
+                continue
+            field = make(value)
+            if field_has_loaders(field):
+                get = field.accessor(key).get
+                jobs.append(self._prefetch_values(field, [get(row) for row in rows]))
+        if jobs:
+            await asyncio.gather(*jobs)
+
+    async def _prefetch_values(self, field, values):
+        # ugly local import to avoid dependency loop
+        from .fields import List, Nested, is_indexable_but_not_string
+
+        if field.loader is not None:
+            values = await self.load_many(field.loader, values)
+        if isinstance(field, List):
+            items = [
+                item for value in values
+                if is_indexable_but_not_string(value) and not isinstance(value, dict)
+                for item in value
+            ]
+            if items and field_has_loaders(field.container):
+                await self._prefetch_values(field.container, items)
+        elif isinstance(field, Nested):
+            rows = []
+            for value in values:
+                if is_collection(value):
+                    rows.extend(v for v in value if v is not None)
+                elif value is not None:
+                    rows.append(value)
+            await self._prefetch_rows(field.nested, rows)
+
+
+def field_has_loaders(field, seen=()):
+    '''Wether a field or its nested fields have loaders'''
+    # ugly local import to avoid dependency loop
+    from .fields import List, Nested
+
+    if getattr(field, 'loader', None) is not None:
+        return True
+    elif isinstance(field, List):
+        return field_has_loaders(field.container, seen)
+    elif isinstance(field, Nested):
+        # Models are copied on resolution so they are identified by name
+        identity = getattr(field.model, 'name', None) or id(field.model)
+        return identity not in seen and has_loaders(field.nested, seen + (identity, ))
+    return False
+
+
+def has_loaders(fields, seen=()):
+    '''Wether some fields (or their nested fields) have loaders'''
+    for value in fields.values():
+        if isinstance(value, dict):
+            if id(value) not in seen and has_loaders(value, seen + (id(value), )):
+                return True
+        elif field_has_loaders(make(value), seen):
+            return True
+    return False
+
+
+def loader_context(request):
+    '''Get the :class:`LoaderContext` of a request (created on first use)'''
+    context = getattr(request.ctx, 'restplus_loaders', None)
+    if context is None:
+        context = request.ctx.restplus_loaders = LoaderContext()
+    return context
+
+
+@contextmanager
+def loading(context):
+    '''Expose the values loaded in a :class:`LoaderContext` to the marshalling done in the block'''
+    token = LOADED.set(context)
+    try:
+        yield context
+    finally:
+        LOADED.reset(token)
+
+
+def loaded(loader, key):
+    '''
+    Get the value loaded for a key in the current marshalling.
+
+    :raises MarshallingError: if the value has not been loaded
+        (ie. the data has been marshalled without prefetching)
+    '''
+    if key is None:
+        return None
+    context = LOADED.get()
+    try:
+        return context.values[loader.fn][key]
+    except (AttributeError, KeyError, TypeError):
+        # ugly local import to avoid dependency loop
+        from .fields import MarshallingError
+        raise MarshallingError('Value of {0!r} not loaded by {1!r}, marshal asynchronously'.format(key, loader))
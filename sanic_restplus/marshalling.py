@@ -2,20 +2,23 @@
 
 import asyncio
 import inspect
+from collections.abc import Iterator
 from functools import wraps
 
-from .mask import Mask, apply as apply_mask
-from .utils import unpack, OrderedDict
+from .columnar import is_columnar
+from .compiler import MarshallerCache, get_marshaller, is_collection
+from .loaders import LoaderContext, loader_context, loading
+from .mask import Mask
+from .memo import make_memo, memoizing
+from .offload import marshal_offloaded, should_offload
+from .representations import EncodedJSON, can_encode_native
+from .utils import OrderedDict, unpack
 
+#: Default number of items marshalled and written at once when streaming
+FLUSH_SIZE = 100
 
 
-def make(cls):
-    if isinstance(cls, type):
-        return cls()
-    return cls
-
-
-def marshal(data, fields, envelope=None, skip_none=False, mask=None, ordered=False):
+def marshal(data, fields, envelope=None, skip_none=False, mask=None, ordered=False, memoize=False):
     """Takes raw data (in the form of a dict, list, object) and a dict of
     fields to output and filters the data based on those fields.
 
@@ -28,6 +31,11 @@ def marshal(data, fields, envelope=None, skip_none=False, mask=None, ordered=Fal
                            which value is None or the field's key not
                            exist in data
     :param bool ordered: Wether or not to preserve order
+    :param memoize: Wether or not the nested objects referenced many times are marshalled once
+                    (``'copy'`` to copy the reused results rather than sharing them),
+                    see :class:`~sanic_restplus.memo.MarshalMemo`.
+                    Self-referencing objects are only detected when memoizing
+                    (they recurse until :exc:`RecursionError` otherwise).
 
 
     >>> from sanic_restplus import fields, marshal
@@ -53,141 +61,125 @@ def marshal(data, fields, envelope=None, skip_none=False, mask=None, ordered=Fal
     OrderedDict([('a', 100)])
 
     """
-    out, has_wildcards = _marshal(data, fields, envelope, skip_none, mask, ordered)
-
-    if has_wildcards:
-        # ugly local import to avoid dependency loop
-        from .fields import Wildcard
-
+    return _marshal(get_marshaller(fields, envelope, skip_none, mask, ordered), data, memoize)
+
+
+def _marshal(marshaller, data, memoize=False):
+    memo = make_memo(memoize)
+    if memo is None:
+        return marshaller(data)
+    with memoizing(memo):
+        return marshaller(data)
+
+
+async def marshal_async(data, fields, envelope=None, skip_none=False, mask=None, ordered=False, loaders=None,
+                        memoize=False):
+    '''
+    Same as :func:`marshal` but the values of the fields having a ``loader``
+    are loaded first, with one loader call per field and nesting level
+    (see :mod:`~sanic_restplus.loaders`).
+
+    :param LoaderContext loaders: the loaded values to reuse and complete
+                                  (ie. :func:`~sanic_restplus.loaders.loader_context` of the request)
+    :param memoize: see :func:`marshal`
+    '''
+    marshaller = get_marshaller(fields, envelope, skip_none, mask, ordered)
+    if not marshaller.has_loaders:
+        return _marshal(marshaller, data, memoize)
+    loaders = LoaderContext() if loaders is None else loaders
+    await loaders.prefetch(marshaller.fields, data)
+    with loading(loaders):
+        return _marshal(marshaller, data, memoize)
+
+
+def is_stream(data):
+    '''Wether some data should be streamed (iterators, generators and async iterables)'''
+    return hasattr(data, '__aiter__') or isinstance(data, Iterator)
+
+
+def requested_fields(request):
+    '''
+    Get the dotted paths of the fields the response will contain,
+    given the :class:`marshal_with` fields and the request mask.
+
+    This allows to only load the required data (ie. select only some columns).
+
+    :param request: the current request
+    :returns: the fields paths or ``None`` if the handler output is not marshalled
+    :rtype: frozenset
+    '''
+    marshaller = getattr(request.ctx, 'restplus_marshaller', None)
+    if marshaller is None:
+        return None
+    return marshaller.projection
+
+
+class MarshalledStream(object):
+    '''
+    A lazily marshalled collection.
+
+    It is returned by :class:`marshal_with` when the decorated method returns
+    a generator, an iterator, an async generator or an async iterable
+    and is written as a streaming JSON array by :meth:`Api.output`.
+
+    :param data: the (async) iterable of objects to marshal
+    :param Marshaller marshaller: the compiled marshaller (without envelope)
+    :param envelope: optional key that will be used to envelop the serialized array
+    :param int flush_size: optional number of items marshalled and written at once
+    :param Marshaller native: an optional marshaller leaving native types to the encoder
+    :param LoaderContext loaders: the loaded values of the fields having a ``loader``
+                                  (loaded batch by batch, see :mod:`~sanic_restplus.loaders`)
+    '''
+    def __init__(self, data, marshaller, envelope=None, flush_size=None, native=None, loaders=None):
+        self.data = data
+        self.marshaller = marshaller
+        self.envelope = envelope
+        self.flush_size = flush_size
+        self.native = native
+        self.loaders = loaders
+
+    async def batches(self, flush_size=FLUSH_SIZE, native=False):
+        '''
+        Iterate over the marshalled items by batches
+
+        :param int flush_size: the batch size if not specified on the stream
+        :param bool native: Wether to use the native types marshaller (if any)
+        '''
+        size = self.flush_size or flush_size
+        marshaller = self.native if native and self.native is not None else self.marshaller
+        loaders = self.loaders if marshaller.has_loaders else None
+
+        async def marshal_many(batch):
+            if loaders is None:
+                return marshaller.marshal_many(batch)
+            await loaders.prefetch(marshaller.fields, batch)
+            with loading(loaders):
+                return marshaller.marshal_many(batch)
+
+        batch = []
+        if hasattr(self.data, '__aiter__'):
+            async for item in self.data:
+                batch.append(item)
+                if len(batch) >= size:
+                    yield await marshal_many(batch)
+                    batch = []
+        else:
+            for item in self.data:
+                batch.append(item)
+                if len(batch) >= size:
+                    yield await marshal_many(batch)
+                    batch = []
+        if batch:
+            yield await marshal_many(batch)
+
+    async def collect(self):
+        '''Marshal the whole stream as :func:`marshal` would do'''
         items = []
-        keys = []
-        for dkey, val in fields.items():
-            key = dkey
-            if isinstance(val, dict):
-                value = marshal(data, val, skip_none=skip_none, ordered=ordered)
-            else:
-                field = make(val)
-                is_wildcard = isinstance(field, Wildcard)
-                # exclude already parsed keys from the wildcard
-                if is_wildcard:
-                    field.reset()
-                    if keys:
-                        field.exclude |= set(keys)
-                        keys = []
-                value = field.output(dkey, data)
-                if is_wildcard:
-
-                    def _append(k, v):
-                        if skip_none and (v is None or v == OrderedDict() or v == {}):
-                            return
-                        items.append((k, v))
-
-                    key = field.key or dkey
-                    _append(key, value)
-                    while True:
-                        value = field.output(dkey, data, ordered=ordered)
-                        if value is None or \
-                                value == field.container.format(field.default):
-                            break
-                        key = field.key
-                        _append(key, value)
-                    continue
-
-            keys.append(key)
-            if skip_none and (value is None or value == OrderedDict() or value == {}):
-                continue
-            items.append((key, value))
-
-        items = tuple(items)
-
-        out = OrderedDict(items) if ordered else dict(items)
-
-        if envelope:
-            out = OrderedDict([(envelope, out)]) if ordered else {envelope: out}
-
-        return out
-
-    return out
-
-
-def _marshal(data, fields, envelope=None, skip_none=False, mask=None, ordered=False):
-    """Takes raw data (in the form of a dict, list, object) and a dict of
-    fields to output and filters the data based on those fields.
-
-    :param data: the actual object(s) from which the fields are taken from
-    :param fields: a dict of whose keys will make up the final serialized
-                   response output
-    :param envelope: optional key that will be used to envelop the serialized
-                     response
-    :param bool skip_none: optional key will be used to eliminate fields
-                           which value is None or the field's key not
-                           exist in data
-    :param bool ordered: Wether or not to preserve order
-
-
-    >>> from flask_restplus import fields, marshal
-    >>> data = { 'a': 100, 'b': 'foo', 'c': None }
-    >>> mfields = { 'a': fields.Raw, 'c': fields.Raw, 'd': fields.Raw }
-
-    >>> marshal(data, mfields)
-    {'a': 100, 'c': None, 'd': None}
-
-    >>> marshal(data, mfields, envelope='data')
-    {'data': {'a': 100, 'c': None, 'd': None}}
-
-    >>> marshal(data, mfields, skip_none=True)
-    {'a': 100}
-
-    >>> marshal(data, mfields, ordered=True)
-    OrderedDict([('a', 100), ('c', None), ('d', None)])
-
-    >>> marshal(data, mfields, envelope='data', ordered=True)
-    OrderedDict([('data', OrderedDict([('a', 100), ('c', None), ('d', None)]))])
-
-    >>> marshal(data, mfields, skip_none=True, ordered=True)
-    OrderedDict([('a', 100)])
-
-    """
-    # ugly local import to avoid dependency loop
-    from .fields import Wildcard
-
-    mask = mask or getattr(fields, '__mask__', None)
-    fields = getattr(fields, 'resolved', fields)
-    if mask:
-        fields = apply_mask(fields, mask, skip=True)
-
-    if isinstance(data, (list, tuple)):
-        out = [marshal(d, fields, skip_none=skip_none, ordered=ordered) for d in data]
-        if envelope:
-            out = OrderedDict([(envelope, out)]) if ordered else {envelope: out}
-        return out, False
-
-    has_wildcards = {'present': False}
-
-    def __format_field(key, val):
-        field = make(val)
-        if isinstance(field, Wildcard):
-            has_wildcards['present'] = True
-        value = field.output(key, data, ordered=ordered)
-        return (key, value)
-
-    items = (
-        (k, marshal(data, v, skip_none=skip_none, ordered=ordered))
-        if isinstance(v, dict)
-        else __format_field(k, v)
-        for k, v in fields.items()
-    )
-
-    if skip_none:
-        items = ((k, v) for k, v in items
-                 if v is not None and v != OrderedDict() and v != {})
-
-    out = OrderedDict(items) if ordered else dict(items)
-
-    if envelope:
-        out = OrderedDict([(envelope, out)]) if ordered else {envelope: out}
-
-    return out, has_wildcards['present']
+        async for batch in self.batches():
+            items.extend(batch)
+        if self.envelope:
+            return OrderedDict([(self.envelope, items)]) if self.marshaller.ordered else {self.envelope: items}
+        return items
 
 
 class marshal_with(object):
@@ -222,18 +214,117 @@ class marshal_with(object):
 
     see :meth:`flask_restplus.marshal`
     """
-    def __init__(self, fields, envelope=None, skip_none=False, mask=None, ordered=False):
+    def __init__(self, fields, envelope=None, skip_none=False, mask=None, ordered=False, flush_size=None,
+                 encode=None, native_types=None, offload=None, cache=None, memoize=False):
         """
         :param fields: a dict of whose keys will make up the final
                        serialized response output
         :param envelope: optional key that will be used to envelop the serialized
                          response
+        :param int flush_size: optional number of items written at once
+                               when streaming (see :class:`MarshalledStream`)
+        :param bool encode: Whether or not to directly encode the marshalled data
+                            into a JSON body (defaults to the resource API ``encode`` option)
+        :param bool native_types: Whether or not dates and numbers are left to the JSON encoder
+                                  when it supports them (defaults to the resource API ``native_types`` option)
+        :param bool offload: Whether or not large collections are marshalled and encoded in a process pool
+                             (defaults to the resource API ``offload`` option, see :mod:`~sanic_restplus.offload`)
+        :param ResultCache cache: an optional cache of the marshalled (or encoded) objects
+                                  (see :class:`~sanic_restplus.cache.ResultCache`)
+        :param memoize: Whether or not the nested objects referenced many times are marshalled once per response
+                        (``'copy'`` to copy the reused results, see :class:`~sanic_restplus.memo.MarshalMemo`)
         """
         self.fields = fields
         self.envelope = envelope
         self.skip_none = skip_none
         self.ordered = ordered
         self.mask = Mask(mask, skip=True)
+        self.flush_size = flush_size
+        self.encode = encode
+        self.native_types = native_types
+        self.offload = offload
+        self.cache = cache
+        self.memoize = memoize
+        # Compiled marshallers cache if fields is not a model
+        self._marshallers = MarshallerCache()
+
+    def marshaller(self, mask, envelope=None, native=False):
+        return get_marshaller(self.fields, envelope, self.skip_none, mask, self.ordered,
+                              cache=self._marshallers, native=native)
+
+    def marshal(self, data, mask, request=None, native=False, loaders=None):
+        '''
+        Marshal some data with the given mask.
+
+        If ``request`` is given, the marshalled data is directly encoded
+        into an :class:`~sanic_restplus.representations.EncodedJSON` body.
+
+        If ``native`` is true, native types are left to the encoder
+        of the encoded body or stream.
+
+        Streams load the values of the fields having a ``loader``
+        batch by batch into ``loaders``, other data must have been prefetched
+        (see :meth:`marshal_loaded`).
+        '''
+        if is_stream(data):
+            return MarshalledStream(data, self.marshaller(mask), self.envelope, self.flush_size,
+                                    self.marshaller(mask, native=True) if native else None, loaders)
+        native = native and request is not None
+        marshaller = self.marshaller(mask, self.envelope, native)
+        if self.cache is not None:
+            marshaller = self.cache.wrap(marshaller)
+            if request is not None and not self.envelope and not is_collection(data) and not is_columnar(data):
+                # Cache the encoded body
+                return marshaller.encode(request, data, native)
+        marshalled = marshaller(data)
+        if request is not None:
+            return EncodedJSON.encode(request, marshalled, native)
+        return marshalled
+
+    async def marshal_loaded(self, data, mask, request, encode_for=None, native=False):
+        '''
+        Load the values of the fields having a ``loader`` (memoized for the request)
+        then marshal some data (see :mod:`~sanic_restplus.loaders`).
+        '''
+        loaders = loader_context(request)
+        if is_stream(data):
+            return self.marshal(data, mask, encode_for, native, loaders)
+        await loaders.prefetch(self.marshaller(mask).fields, data)
+        with loading(loaders):
+            return self.marshal(data, mask, encode_for, native)
+
+    def should_encode(self, request, resource):
+        if request.app.debug:
+            # Keep the pretty printed output
+            return False
+        elif self.encode is None:
+            return getattr(getattr(resource, 'api', None), 'encode', False)
+        return self.encode
+
+    async def marshal_offloaded(self, data, mask, request, native=False):
+        '''
+        Marshal and encode some data in the process pool
+        (or in the event loop if the fields or the data can't be pickled).
+        '''
+        encoded = await marshal_offloaded(request, self.marshaller(mask, native=native), data, native,
+                                          self.envelope)
+        if encoded is None:
+            return self.marshal(data, mask, request, native)
+        return encoded
+
+    def should_offload(self, request, resource, data):
+        if self.offload is None:
+            offload = getattr(getattr(resource, 'api', None), 'offload', False)
+        else:
+            offload = self.offload
+        return offload and should_offload(request, data)
+
+    def should_use_native_types(self, request, resource):
+        if not can_encode_native(request):
+            return False
+        elif self.native_types is None:
+            return getattr(getattr(resource, 'api', None), 'native_types', False)
+        return self.native_types
 
     def __call__(self, f):
         @wraps(f)
@@ -248,7 +339,6 @@ class marshal_with(object):
                     continue
             else:
                 raise RuntimeError("@marshall_with should be used on an endpoint with request in its args")
-            resp = f(*args, **kwargs)
             mask = self.mask
 
             #if self.mask_header:
@@ -256,17 +346,26 @@ class marshal_with(object):
             #mask_header = current_app.config['RESTPLUS_MASK_HEADER']
             mask_header = 'X-Fields'
             mask = request.headers.get(mask_header) or mask
+            # Expose the effective fields to the handler (see :func:`requested_fields`)
+            request.ctx.restplus_marshaller = marshaller = self.marshaller(mask)
+            resp = f(*args, **kwargs)
             while inspect.isawaitable(resp):
                 resp = await resp
+            encode_for = request if self.should_encode(request, args[0]) else None
+            native = self.should_use_native_types(request, args[0])
+            data = unpack(resp)[0] if isinstance(resp, tuple) else resp
+            with memoizing(make_memo(self.memoize)):
+                if marshaller.has_loaders:
+                    # Loaded values are not sent to the offloading pool
+                    marshalled = await self.marshal_loaded(data, mask, request, encode_for, native)
+                elif encode_for is not None and not self.memoize and self.should_offload(request, args[0], data):
+                    marshalled = await self.marshal_offloaded(data, mask, request, native)
+                else:
+                    marshalled = self.marshal(data, mask, encode_for, native)
             if isinstance(resp, tuple):
-                data, code, headers = unpack(resp)
-                return (
-                    marshal(data, self.fields, self.envelope, self.skip_none, mask, self.ordered),
-                    code,
-                    headers
-                )
-            else:
-                return marshal(resp, self.fields, self.envelope, self.skip_none, mask, self.ordered)
+                _, code, headers = unpack(resp)
+                return marshalled, code, headers
+            return marshalled
         return wrapper
 
 
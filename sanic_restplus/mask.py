@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 #
+import copy
 import logging
 import re
 from collections import OrderedDict
+from functools import lru_cache
 from inspect import isclass
 
 from .errors import RestError
@@ -11,6 +13,9 @@ log = logging.getLogger(__name__)
 
 LEXER = re.compile(r'\{|\}|\,|[\w_:\-\*]+')
 
+#: Maximum number of parsed masks kept in cache
+CACHE_SIZE = 256
+
 
 class MaskError(RestError):
     '''Raised when an error occurs on mask'''
@@ -29,6 +34,8 @@ class Mask(OrderedDict):
     :param str|dict|Mask mask: A mask, parsed or not
     :param bool skip: If ``True``, missing fields won't appear in result
     '''
+    _frozen = False
+
     def __init__(self, mask=None, skip=False, **kwargs):
         self.skip = skip
         if isinstance(mask, str):
@@ -40,6 +47,77 @@ class Mask(OrderedDict):
             self.skip = skip
             super(Mask, self).__init__(**kwargs)
 
+    def freeze(self):
+        '''
+        Make the mask (and its nested masks) immutable so it can be shared safely.
+
+        :returns: the mask itself
+        '''
+        for value in self.values():
+            if isinstance(value, Mask):
+                value.freeze()
+        self._frozen = True
+        return self
+
+    @property
+    def frozen(self):
+        return self._frozen
+
+    def _check_mutable(self):
+        if self._frozen:
+            raise MaskError('Frozen masks are immutable')
+
+    def __setattr__(self, name, value):
+        self._check_mutable()
+        super(Mask, self).__setattr__(name, value)
+
+    def __setitem__(self, key, value):
+        self._check_mutable()
+        super(Mask, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._check_mutable()
+        super(Mask, self).__delitem__(key)
+
+    def clear(self):
+        self._check_mutable()
+        super(Mask, self).clear()
+
+    def pop(self, *args):
+        self._check_mutable()
+        return super(Mask, self).pop(*args)
+
+    def popitem(self, *args, **kwargs):
+        self._check_mutable()
+        return super(Mask, self).popitem(*args, **kwargs)
+
+    def setdefault(self, *args):
+        self._check_mutable()
+        return super(Mask, self).setdefault(*args)
+
+    def update(self, *args, **kwargs):
+        self._check_mutable()
+        super(Mask, self).update(*args, **kwargs)
+
+    def move_to_end(self, *args, **kwargs):
+        self._check_mutable()
+        super(Mask, self).move_to_end(*args, **kwargs)
+
+    def __copy__(self):
+        return self if self._frozen else Mask(self, self.skip)
+
+    def __deepcopy__(self, memo):
+        # Frozen masks (and their nested masks) are immutable so they can be shared
+        if self._frozen:
+            return self
+        copied = memo[id(self)] = Mask(skip=self.skip)
+        for key, value in self.items():
+            copied[key] = copy.deepcopy(value, memo)
+        return copied
+
+    def __reduce__(self):
+        return self.__class__, (OrderedDict(self), self.skip)
+
     def parse(self, mask):
         '''
         Parse a fields mask.
@@ -163,6 +241,20 @@ class Mask(OrderedDict):
         ]))
 
 
+@lru_cache(maxsize=CACHE_SIZE)
+def parse(mask, skip=False):
+    '''
+    Parse a mask string into a cached immutable :class:`Mask`.
+
+    Use ``parse.cache_info()`` to get the cache hits and misses.
+
+    :param str mask: the mask string to parse
+    :param bool skip: If ``True``, missing fields won't appear in result
+    :raises ParseError: when a mask is unparseable/invalid
+    '''
+    return Mask(mask, skip).freeze()
+
+
 def apply(data, mask, skip=False):
     '''
     Apply a fields mask to the data.
@@ -173,4 +265,6 @@ def apply(data, mask, skip=False):
     :raises MaskError: when unable to apply the mask
 
     '''
+    if isinstance(mask, str):
+        return parse(mask, skip).apply(data)
     return Mask(mask, skip).apply(data)
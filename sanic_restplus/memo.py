@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+'''
+Marshal the objects referenced many times in a response only once
+(see the ``memoize`` option of :func:`~sanic_restplus.marshal`).
+'''
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+__all__ = ('MarshalMemo', 'MEMO', 'make_memo', 'memoizing', 'copy_marshalled')
+
+#: The memo of the marshalling in progress (see :func:`memoizing`)
+MEMO = ContextVar('restplus_memo', default=None)
+
+#: Marker of the objects being marshalled (see :meth:`MarshalMemo.marshal`)
+IN_PROGRESS = object()
+
+
+def copy_marshalled(value):
+    '''Copy a marshalled value (nested dicts and lists)'''
+    if isinstance(value, dict):
+        return value.__class__((k, copy_marshalled(v)) for k, v in value.items())
+    elif isinstance(value, list):
+        return [copy_marshalled(v) for v in value]
+    return value
+
+
+def _token(marshaller):
+    # The nested model copies (ie. recursive models) have distinct marshallers of the same identity
+    return marshaller.identity
+
+
+class MarshalMemo(object):
+    '''
+    The results of the nested objects marshalled during a single marshalling,
+    keyed by object identity and marshaller identity (ie. nested model, mask and options,
+    see :attr:`~sanic_restplus.compiler.Marshaller.identity`).
+
+    Objects met again while being marshalled (ie. self-referencing objects)
+    raise a :class:`~sanic_restplus.fields.MarshallingError` instead of recursing without bound.
+    Only the memo tracks the objects being marshalled: without ``memoize``,
+    cycles are not detected and end with a :exc:`RecursionError`.
+
+    :param bool share: Wether reused results are shared by reference (the encoder sees the same dict)
+                       or copied (so they can be mutated independently)
+    '''
+    def __init__(self, share=True):
+        self.share = share
+        self.hits = 0
+        # The objects are kept so their ids are not reused
+        self._results = {}
+
+    def reuse(self, value):
+        self.hits += 1
+        return value if self.share else copy_marshalled(value)
+
+    def _cycle(self, obj):
+        # ugly local import to avoid dependency loop
+        from .fields import MarshallingError
+        return MarshallingError('Cycle detected: {0!r} is nested in itself'.format(obj))
+
+    def marshal(self, marshaller, obj):
+        '''Marshal an object with a marshaller, once per memo'''
+        key = (id(obj), _token(marshaller))
+        entry = self._results.get(key)
+        if entry is not None:
+            if entry[1] is IN_PROGRESS:
+                raise self._cycle(obj)
+            return self.reuse(entry[1])
+        self._results[key] = (obj, IN_PROGRESS)
+        try:
+            value = marshaller(obj)
+        except BaseException:
+            del self._results[key]
+            raise
+        self._results[key] = (obj, value)
+        return value
+
+    def marshal_many(self, marshaller, rows):
+        '''Marshal some objects with a marshaller: the objects not marshalled yet are marshalled at once'''
+        token = _token(marshaller)
+        results = self._results
+        out = []
+        missing = []
+        positions = {}
+        for index, row in enumerate(rows):
+            key = (id(row), token)
+            entry = results.get(key)
+            if entry is None:
+                positions[key] = [index]
+                missing.append((key, row))
+                results[key] = (row, IN_PROGRESS)
+                out.append(None)
+            elif entry[1] is not IN_PROGRESS:
+                out.append(self.reuse(entry[1]))
+            elif key in positions:
+                # Duplicated in this batch
+                positions[key].append(index)
+                out.append(None)
+            else:
+                for key, _ in missing:
+                    del results[key]
+                raise self._cycle(row)
+        if missing:
+            try:
+                marshalled = marshaller.marshal_many([row for _, row in missing])
+            except BaseException:
+                for key, _ in missing:
+                    del results[key]
+                raise
+            for (key, row), value in zip(missing, marshalled):
+                results[key] = (row, value)
+                first, *duplicates = positions[key]
+                out[first] = value
+                for index in duplicates:
+                    out[index] = self.reuse(value)
+        return out
+
+    def __len__(self):
+        return sum(1 for _, value in self._results.values() if value is not IN_PROGRESS)
+
+
+def make_memo(memoize):
+    '''
+    Get the memo for a ``memoize`` option: ``None`` if false,
+    a :class:`MarshalMemo` copying the reused results for ``'copy'``
+    and sharing them for other true values.
+    '''
+    if not memoize:
+        return None
+    return MarshalMemo(share=memoize != 'copy')
+
+
+@contextmanager
+def memoizing(memo):
+    '''Use a :class:`MarshalMemo` for the nested objects marshalled in the block'''
+    token = MEMO.set(memo)
+    try:
+        yield memo
+    finally:
+        MEMO.reset(token)
@@ -8,18 +8,22 @@ import warnings
 from collections import MutableMapping
 from functools import lru_cache
 
+from .compiler import MarshallerCache
 from .mask import Mask
 from .errors import abort
 
 from jsonschema import Draft4Validator
 from jsonschema.exceptions import ValidationError
 
-from .utils import not_none, cur_py_version, ordered_dict_version
+from .utils import not_none, cur_py_version, ordered_dict_version, WeakLRUCache
 from ._http import HTTPStatus
 
 
 RE_REQUIRED = re.compile(r'u?\'(?P<name>.*)\' is a required property', re.I | re.U)
 
+#: Resolved models cache (see :attr:`RawModel.resolved`)
+RESOLVED_CACHE = WeakLRUCache(maxsize=1024)
+
 
 def instance(cls):
     if isinstance(cls, type):
@@ -109,6 +113,12 @@ class ModelBase(object):
         key = '.'.join(str(p) for p in path)
         return key, error.message
 
+    def __reduce__(self):
+        # Instance methods and caches are rebuilt by the constructor
+        state = dict((k, v) for k, v in self.__dict__.items() if k not in ('inherit', 'clone', '__marshallers__'))
+        items = iter(self.items()) if isinstance(self, dict) else None
+        return (self.__class__, (self.name, ), state, None, items)
+
     def __unicode__(self):
         return 'Model({name},{{{fields}}})'.format(name=self.name, fields=','.join(self.keys()))
 
@@ -125,12 +135,15 @@ class RawModel(ModelBase):
     '''
 
     wrapper = dict
+    _revision = 0
 
     def __init__(self, name, *args, **kwargs):
         self.__mask__ = kwargs.pop('mask', None)
         if self.__mask__ and not isinstance(self.__mask__, Mask):
             self.__mask__ = Mask(self.__mask__)
         super(RawModel, self).__init__(name, *args, **kwargs)
+        # Compiled marshallers cache (see :func:`~sanic_restplus.compiler.get_marshaller`)
+        self.__marshallers__ = MarshallerCache()
 
         def instance_clone(name, *parents):
             return self.__class__.clone(name, self, *parents)
@@ -158,13 +171,52 @@ class RawModel(ModelBase):
         })
 
 
-    def _resolved(self):
+    @property
+    def revision(self):
+        '''A stamp changing each time the model or one of its parents is mutated'''
+        return (self._revision, tuple(getattr(p, 'revision', None) for p in self.__parents__))
+
+    def _mutated(self):
+        self._revision += 1
+        self.__marshallers__.clear()
+        RESOLVED_CACHE.invalidate(self)
+
+    def __setitem__(self, key, value):
+        super(RawModel, self).__setitem__(key, value)
+        self._mutated()
+
+    def __delitem__(self, key):
+        super(RawModel, self).__delitem__(key)
+        self._mutated()
+
+    def clear(self):
+        super(RawModel, self).clear()
+        self._mutated()
+
+    def pop(self, *args):
+        value = super(RawModel, self).pop(*args)
+        self._mutated()
+        return value
+
+    def popitem(self, *args, **kwargs):
+        item = super(RawModel, self).popitem(*args, **kwargs)
+        self._mutated()
+        return item
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        self[key] = default
+        return default
+
+    def update(self, *args, **kwargs):
+        super(RawModel, self).update(*args, **kwargs)
+        self._mutated()
+
+    def _resolve(self):
         '''
         Resolve real fields before submitting them to marshal
         '''
-        already_resolved = self._resolved.already_resolved.get(id(self), False)
-        if already_resolved:
-            return already_resolved
         # Duplicate fields
         res = copy.deepcopy(self)
 
@@ -180,10 +232,17 @@ class RawModel(ModelBase):
         # Ensure discriminator always output the model name
         elif len(candidates) == 1:
             candidates[0].default = self.name
-        self._resolved.already_resolved[id(self)] = res
         return res
-    _resolved.already_resolved = {}
-    resolved = property(_resolved)
+
+    @property
+    def resolved(self):
+        '''
+        The real fields to submit to marshal.
+
+        Resolved models are kept in a bounded cache, weakly referencing
+        the models and invalidated when they (or their parents) are mutated.
+        '''
+        return RESOLVED_CACHE.get(self, RawModel._resolve, self.revision)
 
     def extend(self, name, fields):
         '''
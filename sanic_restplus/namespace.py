@@ -4,8 +4,10 @@ import inspect
 import warnings
 from collections import namedtuple
 from sanic.constants import HTTP_METHODS
+from .binary import load_payload
 from .errors import abort
-from .marshalling import marshal, marshal_with
+from .etag import etag
+from .marshalling import marshal, marshal_with, requested_fields
 from .model import Model, OrderedModel, SchemaModel
 from .reqparse import RequestParser
 from .utils import merge
@@ -246,6 +248,22 @@ class Namespace(object):
             return real_marshal_with(func)
         return wrapper
 
+    def etag(self, version, weak=False):
+        '''
+        A decorator tagging the responses with a version key of the resource
+        (see :class:`~sanic_restplus.etag.etag`).
+
+        :param version: a function taking the handler arguments and returning the version key
+        :param bool weak: Wether the tags are weak
+        '''
+        doc = {'responses': {str(HTTPStatus.NOT_MODIFIED.value): ('Not Modified', None)}}
+        real_etag = etag(version, weak)
+
+        def wrapper(func):
+            func.__apidoc__ = merge(getattr(func, '__apidoc__', {}), doc)
+            return real_etag(func)
+        return wrapper
+
     def marshal_list_with(self, fields, **kwargs):
         '''A shortcut decorator for :meth:`~Api.marshal_with` with ``as_list=True``'''
         return self.marshal_with(fields, True, **kwargs)
@@ -254,6 +272,10 @@ class Namespace(object):
         '''A shortcut to the :func:`marshal` helper'''
         return marshal(*args, **kwargs)
 
+    def requested_fields(self, request):
+        '''A shortcut to the :func:`requested_fields` helper'''
+        return requested_fields(request)
+
     def errorhandler(self, exception):
         '''A decorator to register an error handler for a given exception'''
         if inspect.isclass(exception) and issubclass(exception, Exception):
@@ -326,7 +348,7 @@ class Namespace(object):
 
     def payload(self, request):
         '''Store the input payload in the current request context'''
-        return request.json
+        return load_payload(request)
 
 
 def unshortcut_params_description(data):
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+'''
+Offload the marshalling and encoding of large collections to a process pool
+so they don't block the event loop (see :class:`~sanic_restplus.marshal_with`).
+'''
+import asyncio
+import os
+import pickle
+import weakref
+
+from json import dumps
+
+from concurrent.futures import ProcessPoolExecutor
+
+from .compiler import Marshaller, MarshallerCache, is_collection
+from .representations import EncodedJSON, get_json_engine
+
+__all__ = ('OFFLOAD_THRESHOLD', 'OFFLOAD_CHUNK_SIZE', 'OFFLOAD_QUEUE_SIZE', 'describe', 'get_pool', 'shutdown',
+           'should_offload', 'marshal_offloaded')
+
+#: Default number of rows above which a collection is offloaded
+OFFLOAD_THRESHOLD = 10000
+#: Default number of rows marshalled by a single job
+OFFLOAD_CHUNK_SIZE = 5000
+#: Default maximum number of jobs submitted to the pool at once by a worker
+OFFLOAD_QUEUE_SIZE = 4
+#: Number of rows pickled at once (the pickler holds the GIL)
+PICKLE_BATCH_SIZE = 500
+
+#: Pickled marshallers descriptions (see :func:`describe`)
+DESCRIPTIONS = weakref.WeakKeyDictionary()
+#: Marshallers compiled from descriptions in the pool processes
+WORKER_MARSHALLERS = MarshallerCache()
+
+_pool = None
+_pool_pid = None
+_queues = weakref.WeakKeyDictionary()
+
+
+def describe(marshaller):
+    '''
+    Get the picklable description of a compiled marshaller (cached),
+    or ``None`` if its fields can't be pickled (ie. callable attributes).
+
+    :param Marshaller marshaller: the marshaller to describe
+    :rtype: bytes
+    '''
+    try:
+        return DESCRIPTIONS[marshaller]
+    except KeyError:
+        pass
+    args = (marshaller.fields, marshaller.envelope, marshaller.skip_none, None, marshaller.ordered,
+            marshaller.native)
+    try:
+        description = pickle.dumps(args, pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        description = None
+    DESCRIPTIONS[marshaller] = description
+    return description
+
+
+def get_pool(max_workers=None):
+    '''
+    Get the process pool shared by the current process (ie. a Sanic worker).
+
+    :param int max_workers: the pool size if it needs to be created (defaults to the CPU count)
+    :rtype: ProcessPoolExecutor
+    '''
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        # Pools are not inherited by forked workers
+        _pool = ProcessPoolExecutor(max_workers)
+        _pool_pid = os.getpid()
+    return _pool
+
+
+def shutdown(wait=True):
+    '''Shutdown the current process pool (if any)'''
+    global _pool, _pool_pid
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.shutdown(wait=wait)
+    _pool = _pool_pid = None
+
+
+def _queue(size):
+    '''The semaphore bounding the jobs submitted from the running loop'''
+    loop = asyncio.get_running_loop()
+    queue = _queues.get(loop)
+    if queue is None:
+        queue = _queues[loop] = asyncio.Semaphore(size)
+    return queue
+
+
+def should_offload(request, data):
+    '''
+    Wether some data is large enough to be offloaded
+    (more rows than the ``RESTPLUS_OFFLOAD_THRESHOLD`` configuration)
+    '''
+    threshold = request.app.config.get('RESTPLUS_OFFLOAD_THRESHOLD', OFFLOAD_THRESHOLD)
+    return is_collection(data) and len(data) > threshold
+
+
+class Unpicklable(Exception):
+    '''Raised when some data can't be sent to the pool'''
+    pass
+
+
+def _pickle_rows(rows):
+    '''
+    Pickle some rows for the pool by batches of :data:`PICKLE_BATCH_SIZE` rows
+    (in a thread, releasing the GIL between batches so large chunks don't block the event loop)
+    '''
+    try:
+        return tuple(
+            pickle.dumps(rows[i:i + PICKLE_BATCH_SIZE], pickle.HIGHEST_PROTOCOL)
+            for i in range(0, len(rows), PICKLE_BATCH_SIZE)
+        )
+    except Exception as e:
+        raise Unpicklable(e)
+
+
+def _marshal_encode(description, payload, engine, native):
+    '''
+    Marshal and encode some pickled batches of rows in a pool process
+    into the items of a JSON array (without its brackets)
+    '''
+    marshaller = WORKER_MARSHALLERS.get(description, lambda: Marshaller(*pickle.loads(description)))
+    rows = [row for batch in payload for row in pickle.loads(batch)]
+    dumped = engine(marshaller(rows), native)
+    if isinstance(dumped, str):
+        dumped = dumped.encode('utf-8')
+    return dumped.strip()[1:-1].strip()
+
+
+async def marshal_offloaded(request, marshaller, data, native=False, envelope=None):
+    '''
+    Marshal and encode a collection in the process pool.
+
+    The collection is split into jobs of ``RESTPLUS_OFFLOAD_CHUNK_SIZE`` rows
+    whose JSON arrays are spliced together.
+    At most ``RESTPLUS_OFFLOAD_QUEUE_SIZE`` jobs are submitted at once by a given worker,
+    the next ones wait for their turn without blocking the event loop.
+    The chunks are pickled by batches in the loop default executor before being sent to the pool.
+    The pool size is given by the ``RESTPLUS_OFFLOAD_WORKERS`` configuration.
+
+    :param request: the current request
+    :param Marshaller marshaller: the compiled marshaller (without envelope)
+    :param data: the list or tuple of objects to marshal
+    :param bool native: Wether the marshaller leaves native types to the encoder
+    :param str envelope: optional key that will be used to envelop the serialized array
+    :returns: the :class:`~sanic_restplus.representations.EncodedJSON` body
+        or ``None`` if the fields, the data or the JSON engine can't be pickled
+    '''
+    description = describe(marshaller)
+    if description is None:
+        return None
+    config = request.app.config
+    engine = get_json_engine(request.app)
+    try:
+        # Custom engines may not be picklable
+        pickle.dumps(engine)
+    except Exception:
+        return None
+    size = config.get('RESTPLUS_OFFLOAD_CHUNK_SIZE', OFFLOAD_CHUNK_SIZE)
+    queue = _queue(config.get('RESTPLUS_OFFLOAD_QUEUE_SIZE', OFFLOAD_QUEUE_SIZE))
+    loop = asyncio.get_running_loop()
+
+    async def job(rows):
+        async with queue:
+            payload = await loop.run_in_executor(None, _pickle_rows, rows)
+            pool = get_pool(config.get('RESTPLUS_OFFLOAD_WORKERS'))
+            return await loop.run_in_executor(pool, _marshal_encode, description, payload, engine, native)
+
+    arrays = await asyncio.gather(
+        *(job(data[i:i + size]) for i in range(0, len(data), size)),
+        return_exceptions=True
+    )
+    for array in arrays:
+        if isinstance(array, Unpicklable):
+            return None
+        elif isinstance(array, BaseException):
+            raise array
+    # Copy the (large) items only once into the body
+    parts = [b'{' + dumps(envelope).encode('utf-8') + b':[' if envelope else b'[']
+    for items in arrays:
+        if items:
+            parts.extend((items, b','))
+    if parts[-1] == b',':
+        parts.pop()
+    parts.append(b']}\n' if envelope else b']\n')
+    return EncodedJSON(b''.join(parts))
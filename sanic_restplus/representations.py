@@ -1,25 +1,41 @@
 # -*- coding: utf-8 -*-
 import collections
+import logging
+import re
+import time
+import uuid
+
+from functools import partial
 
 from sanic_restplus._http import HTTPStatus
 
 try:
-    from orjson import dumps as fast_dumps, OPT_NON_STR_KEYS, OPT_NAIVE_UTC, OPT_UTC_Z
+    import orjson
+    from orjson import OPT_NON_STR_KEYS, OPT_NAIVE_UTC, OPT_UTC_Z, OPT_INDENT_2, OPT_SORT_KEYS
 
     has_orjson = True
-    has_ujson = False
+    try:
+        from orjson import Fragment
+    except ImportError:  # orjson < 3.9
+        Fragment = None
 except ImportError:
+    orjson = None
     has_orjson = False
-    try:
-        from ujson import dumps as fast_dumps
-        has_ujson = True
-    except ImportError:
-        has_ujson = False
+    Fragment = None
+
+try:
+    import ujson
+    has_ujson = True
+except ImportError:
+    ujson = None
+    has_ujson = False
 
-from json import dumps
+from json import dumps, loads
 
 
-from sanic.response import text, HTTPResponse
+from sanic.response import text, stream, HTTPResponse
+
+log = logging.getLogger(__name__)
 
 try:
     # Test to see if this works...
@@ -32,6 +48,86 @@ except TypeError:
     except TypeError:
         raise RuntimeError("Cannot determine how to correctly return a HTTPResponse with bytes content.")
 
+class JSONFragment(object):
+    '''
+    A pre-encoded JSON value (ie. a stored document) spliced as is into the encoded output
+    without being decoded (see :class:`~sanic_restplus.fields.RawJSON`).
+
+    It can also be returned by handlers to be sent as the whole body.
+
+    :param body: the JSON value as ``bytes``, ``bytearray``, ``memoryview`` or ``str``
+    '''
+    __slots__ = ('body', )
+
+    def __init__(self, body):
+        self.body = body
+
+    def text(self):
+        '''The JSON value as a string'''
+        body = self.body
+        return body if isinstance(body, str) else str(body, 'utf-8')
+
+    def as_bytes(self):
+        '''The JSON value as bytes (copied from ``bytearray`` and ``memoryview`` bodies)'''
+        body = self.body
+        if isinstance(body, bytes):
+            return body
+        return body.encode('utf-8') if isinstance(body, str) else bytes(body)
+
+    def decode(self):
+        '''Get the decoded value back (for non-JSON representations)'''
+        return loads(self.text())
+
+    def __json__(self):
+        # ujson outputs the result as is
+        return self.text()
+
+    def __eq__(self, other):
+        return isinstance(other, JSONFragment) and self.as_bytes() == other.as_bytes()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'JSONFragment({0!r})'.format(self.body)
+
+
+#: The placeholders of the fragments spliced by :func:`dumps_fragments` (unique per process)
+FRAGMENT_PLACEHOLDER = 'json-fragment-{0}-'.format(uuid.uuid4().hex)
+RE_FRAGMENT_PLACEHOLDER = re.compile('"{0}(\\d+)"'.format(FRAGMENT_PLACEHOLDER))
+RE_FRAGMENT_PLACEHOLDER_BYTES = re.compile(RE_FRAGMENT_PLACEHOLDER.pattern.encode('utf-8'))
+
+
+def dumps_fragments(data, **settings):
+    '''
+    Encode some data containing :class:`JSONFragment` values with the standard :mod:`json` module.
+
+    The fragments are encoded as placeholders replaced by their bodies
+    (they are not reindented when ``indent`` is given).
+    '''
+    fragments = []
+    fallback = settings.pop('default', None)
+
+    def default(obj):
+        if isinstance(obj, JSONFragment):
+            fragments.append(obj.text())
+            return FRAGMENT_PLACEHOLDER + str(len(fragments) - 1)
+        elif fallback is not None:
+            return fallback(obj)
+        raise TypeError('Object of type {0} is not JSON serializable'.format(type(obj).__name__))
+
+    dumped = dumps(data, default=default, **settings)
+    if not fragments:
+        return dumped
+    return RE_FRAGMENT_PLACEHOLDER.sub(lambda m: fragments[int(m.group(1))], dumped)
+
+
+def json_response(body, code, headers=None):
+    '''Makes a response from an encoded JSON body'''
+    if use_body_bytes:
+        return HTTPResponse(None, code, headers, content_type='application/json', body_bytes=body)
+    return HTTPResponse(body, code, headers, content_type='application/json')
+
+
 def output_json_pretty(request, data, code, headers=None):
     '''Makes a Flask response with a JSON encoded body'''
     current_app = request.app
@@ -45,41 +141,402 @@ def output_json_pretty(request, data, code, headers=None):
 
     # always end the json dumps with a new line
     # see https://github.com/mitsuhiko/flask/pull/1262
-    dumped = dumps(data, **settings) + "\n"
+    dumped = dumps_fragments(data, **settings) + "\n"
 
     resp = text(dumped, code, headers, content_type='application/json')
     return resp
 
 
-if has_ujson:
-    def output_json_fast_ujson(request, data, code, headers=None):
-        current_app = request.app
-        if current_app.debug:
-            return output_json_pretty(request, data, code, headers=headers)
-        settings = current_app.config.get('RESTPLUS_JSON', {})
-        dumped = fast_dumps(data, **settings) + "\n"
-        resp = text(dumped, code, headers, content_type='application/json')
-        return resp
-    output_json_fast = output_json_fast_ujson
-elif has_orjson:
-    #orjson_opts = OPT_NON_STR_KEYS | OPT_NAIVE_UTC | OPT_UTC_Z
-    orjson_opts = OPT_NAIVE_UTC | OPT_UTC_Z
-
-    def orjson_default(obj):
-        if isinstance(obj, collections.OrderedDict):
-            return dict(obj)
-        raise TypeError
-    def output_json_fast_orjson(request, data, code, headers=None):
-        current_app = request.app
-        if current_app.debug:
-            return output_json_pretty(request, data, code, headers=headers)
-        settings = current_app.config.get('RESTPLUS_JSON', {})
-        dumped = fast_dumps(data, option=orjson_opts, default=orjson_default, **settings) + b"\n"
-        if use_body_bytes:
-            resp = HTTPResponse(None, code, headers, content_type='application/json', body_bytes=dumped)
+#orjson_opts = OPT_NON_STR_KEYS | OPT_NAIVE_UTC | OPT_UTC_Z
+orjson_opts = OPT_NAIVE_UTC | OPT_UTC_Z if has_orjson else 0
+
+
+def orjson_default(obj):
+    if isinstance(obj, collections.OrderedDict):
+        return dict(obj)
+    elif isinstance(obj, JSONFragment) and Fragment is not None:
+        body = obj.body
+        return Fragment(body if isinstance(body, (bytes, str)) else bytes(body))
+    raise TypeError
+
+
+def orjson_options(settings):
+    '''
+    Map the ``RESTPLUS_JSON`` settings (the :func:`json.dumps` keyword arguments) to orjson options.
+
+    :raises ValueError: if orjson can't honor some of the settings
+    '''
+    option = orjson_opts
+    unsupported = []
+    for key, value in settings.items():
+        if key == 'sort_keys':
+            option |= OPT_SORT_KEYS if value else 0
+        elif key == 'indent' and value in (None, 2):
+            option |= OPT_INDENT_2 if value else 0
+        elif key == 'ensure_ascii' and not value:
+            # orjson always outputs UTF-8
+            continue
+        else:
+            unsupported.append('{0}={1!r}'.format(key, value))
+    if unsupported:
+        raise ValueError('The orjson engine does not support the JSON settings: {0}'.format(', '.join(unsupported)))
+    return option
+
+
+def dumps_orjson_fragments(data, option=orjson_opts):
+    '''
+    Encode some data with orjson < 3.9 (without :class:`orjson.Fragment`),
+    splicing the :class:`JSONFragment` values as :func:`dumps_fragments` does.
+    '''
+    fragments = []
+
+    def default(obj):
+        if isinstance(obj, JSONFragment):
+            fragments.append(obj.as_bytes())
+            return FRAGMENT_PLACEHOLDER + str(len(fragments) - 1)
+        return orjson_default(obj)
+
+    dumped = orjson.dumps(data, default=default, option=option)
+    if not fragments:
+        return dumped
+    return RE_FRAGMENT_PLACEHOLDER_BYTES.sub(lambda m: fragments[int(m.group(1))], dumped)
+
+
+class JSONEngine(object):
+    '''
+    A JSON encoder with its ``RESTPLUS_JSON`` settings bound once (see :func:`resolve_json_engine`).
+
+    Calling the engine encodes some data as ``bytes`` or ``str`` depending on the encoder.
+
+    :param dict settings: the encoder keyword arguments
+    '''
+    #: The engine name in :data:`JSON_ENGINES`
+    name = 'json'
+    #: Wether dates and times can be left to the encoder (see :func:`can_encode_native`)
+    supports_native = False
+
+    def __init__(self, settings=None):
+        self.settings = dict(settings or {})
+        self.dumps = self.bind(self.settings)
+
+    @classmethod
+    def supports(cls, settings):
+        '''Wether the engine can honor some settings'''
+        return True
+
+    def bind(self, settings):
+        '''
+        Get the encoding function given the settings
+
+        :raises ValueError: if the engine does not support the settings
+        '''
+        return partial(dumps_fragments, **settings)
+
+    def __call__(self, data, native=False):
+        return self.dumps(data)
+
+    def __reduce__(self):
+        return (self.__class__, (self.settings, ))
+
+    def __repr__(self):
+        return '<{0} {1!r}>'.format(self.__class__.__name__, self.name)
+
+
+class OrjsonEngine(JSONEngine):
+    '''The `orjson <https://pypi.org/project/orjson/>`_ engine, encoding native types and fragments'''
+    name = 'orjson'
+    supports_native = True
+
+    @classmethod
+    def supports(cls, settings):
+        try:
+            orjson_options(settings)
+        except ValueError:
+            return False
+        return True
+
+    def bind(self, settings):
+        # Native types are encoded with the same options, so the output does not depend on the mode
+        option = orjson_options(settings)
+        if Fragment is None:
+            return partial(dumps_orjson_fragments, option=option)
+        return partial(orjson.dumps, option=option, default=orjson_default)
+
+
+#: The ``RESTPLUS_JSON`` settings supported by ujson
+UJSON_SETTINGS = frozenset((
+    'ensure_ascii', 'encode_html_chars', 'escape_forward_slashes', 'sort_keys', 'indent', 'allow_nan',
+    'reject_bytes', 'default', 'separators',
+))
+
+
+class UjsonEngine(JSONEngine):
+    '''The `ujson <https://pypi.org/project/ujson/>`_ engine'''
+    name = 'ujson'
+
+    @classmethod
+    def supports(cls, settings):
+        return UJSON_SETTINGS.issuperset(settings)
+
+    def bind(self, settings):
+        if not self.supports(settings):
+            raise ValueError('The ujson engine does not support the JSON settings: {0}'.format(
+                ', '.join(sorted(set(settings) - UJSON_SETTINGS))))
+        return partial(ujson.dumps, **settings)
+
+
+class CallableEngine(JSONEngine):
+    '''
+    An engine wrapping a custom ``dumps(data)`` callable returning ``bytes`` or ``str``
+    (it must be a module level function to be used by the offloading pool).
+    '''
+    name = 'callable'
+
+    def __init__(self, dumps):
+        self.settings = {}
+        self.dumps = dumps
+
+    def __reduce__(self):
+        return (self.__class__, (self.dumps, ))
+
+    def __repr__(self):
+        return '<CallableEngine {0!r}>'.format(self.dumps)
+
+
+#: The available JSON engines by name, from the fastest
+JSON_ENGINES = collections.OrderedDict(
+    [('orjson', OrjsonEngine)] * has_orjson + [('ujson', UjsonEngine)] * has_ujson + [('json', JSONEngine)]
+)
+
+
+def resolve_json_engine(engine=None, settings=None):
+    '''
+    Get a ready :class:`JSONEngine`.
+
+    :param engine: A :data:`JSON_ENGINES` name, a :class:`JSONEngine` (class or instance),
+                   a ``dumps(data)`` callable or ``None`` for the fastest available engine
+                   supporting the settings
+    :param dict settings: the encoder keyword arguments (the ``RESTPLUS_JSON`` configuration)
+    :raises ValueError: if the engine is unknown, not installed or does not support the settings
+    '''
+    if engine is None:
+        engine = next(factory for factory in JSON_ENGINES.values() if factory.supports(settings or {}))
+    if isinstance(engine, str):
+        try:
+            engine = JSON_ENGINES[engine]
+        except KeyError:
+            raise ValueError('Unknown or unavailable JSON engine {0!r} (available: {1})'.format(
+                engine, ', '.join(JSON_ENGINES)))
+    if isinstance(engine, JSONEngine):
+        return engine
+    elif isinstance(engine, type) and issubclass(engine, JSONEngine):
+        return engine(settings)
+    elif callable(engine):
+        return CallableEngine(engine)
+    raise ValueError('Invalid JSON engine: {0!r}'.format(engine))
+
+
+def get_json_engine(app):
+    '''
+    Get the JSON engine of an application given the ``RESTPLUS_JSON_ENGINE``
+    and ``RESTPLUS_JSON`` configurations, resolved once and kept in the application context.
+    '''
+    ctx = getattr(app, 'ctx', None)
+    engine = getattr(ctx, 'restplus_json_engine', None)
+    if engine is None:
+        config = app.config
+        engine = resolve_json_engine(config.get('RESTPLUS_JSON_ENGINE'), config.get('RESTPLUS_JSON', {}))
+        if ctx is not None:
+            ctx.restplus_json_engine = engine
+    return engine
+
+
+#: The default sample payload of :func:`benchmark_json_engines`
+BENCHMARK_SAMPLE = [
+    {
+        'id': i,
+        'name': 'item {0}'.format(i),
+        'description': 'A longer text with some unicode: \u00e9\u00e0\u00fc {0}'.format(i),
+        'price': i * 1.25,
+        'available': i % 2 == 0,
+        'parent': None,
+        'tags': ['tag{0}'.format(j) for j in range(5)],
+        'attributes': {'weight': i, 'size': 'XL', 'color': 'red'},
+    }
+    for i in range(200)
+]
+
+
+def benchmark_json_engines(sample=None, settings=None, rounds=20):
+    '''
+    Time each of the available :data:`JSON_ENGINES` encoding a sample payload.
+
+    :param sample: the payload to encode (default to :data:`BENCHMARK_SAMPLE`)
+    :param dict settings: the encoder keyword arguments
+    :param int rounds: the number of encodings timed per engine
+    :returns list: the ``(name, seconds per encoding)`` pairs, from the fastest
+    '''
+    sample = BENCHMARK_SAMPLE if sample is None else sample
+    timings = []
+    for name, factory in JSON_ENGINES.items():
+        if not factory.supports(settings or {}):
+            continue
+        engine = factory(settings)
+        engine(sample)  # Warm up
+        start = time.perf_counter()
+        for _ in range(rounds):
+            engine(sample)
+        timings.append((name, (time.perf_counter() - start) / rounds))
+    return sorted(timings, key=lambda timing: timing[1])
+
+
+def setup_json_engine(app):
+    '''
+    Resolve the JSON engine of an application (see :func:`get_json_engine`) at startup.
+
+    If ``RESTPLUS_JSON_BENCHMARK`` is set (to ``True`` or to a sample payload),
+    the available engines are benchmarked and the fastest one is logged.
+    '''
+    ctx = getattr(app, 'ctx', None)
+    if ctx is not None:
+        ctx.restplus_json_engine = ctx.restplus_json_output = None
+    engine = get_json_engine(app)
+    get_json_output(app)
+    sample = app.config.get('RESTPLUS_JSON_BENCHMARK')
+    if sample:
+        timings = benchmark_json_engines(None if sample is True else sample, app.config.get('RESTPLUS_JSON', {}))
+        log.info('JSON engines: %s', ', '.join('{0} {1:.1f}us'.format(n, t * 1e6) for n, t in timings))
+        log.info('Fastest JSON engine: %s (using %s)', timings[0][0], engine.name)
+    return engine
+
+
+def output_json_engine(engine, request, data, code, headers=None):
+    '''Makes a response with a JSON body encoded by an engine'''
+    dumped = engine(data)
+    if isinstance(dumped, str):
+        return json_response((dumped + '\n').encode('utf-8'), code, headers)
+    return json_response(dumped + b'\n', code, headers)
+
+
+def get_json_output(app):
+    '''
+    Get the JSON output function of an application: :func:`output_json_pretty` in debug mode,
+    the application engine otherwise (see :func:`get_json_engine`),
+    resolved once and kept in the application context.
+    '''
+    ctx = getattr(app, 'ctx', None)
+    output = getattr(ctx, 'restplus_json_output', None)
+    if output is None:
+        output = output_json_pretty if app.debug else partial(output_json_engine, get_json_engine(app))
+        if ctx is not None:
+            ctx.restplus_json_output = output
+    return output
+
+
+def output_json_fast(request, data, code, headers=None):
+    '''Makes a response with a JSON body encoded by the application output (see :func:`get_json_output`)'''
+    return get_json_output(request.app)(request, data, code, headers)
+
+
+def can_encode_native(request):
+    '''
+    Wether the data encoded for a request can contain native types
+    (``datetime`` and ``date``) left to the encoder (see :func:`encode`).
+    '''
+    current_app = request.app
+    return not current_app.debug and get_json_engine(current_app).supports_native
+
+
+def encode(request, data, native=False):
+    '''
+    Encode some data as JSON (``bytes`` or ``str`` depending on the encoder).
+
+    Uses the application engine (see :func:`get_json_engine`) unless in debug mode.
+
+    :param bool native: Wether the data has been marshalled with native types
+                        (only if :func:`can_encode_native`)
+    '''
+    current_app = request.app
+    if current_app.debug and not native:
+        return dumps_fragments(data, **current_app.config.get('RESTPLUS_JSON', {}))
+    return get_json_engine(current_app)(data, native)
+
+
+def encode_with(settings, data, debug=False, native=False):
+    '''
+    Encode some data as JSON given the ``RESTPLUS_JSON`` settings and the debug mode
+    with the fastest engine (see :func:`encode`). It does not need any request.
+    '''
+    if debug and not native:
+        return dumps_fragments(data, **settings)
+    return resolve_json_engine(None, settings)(data, native)
+
+
+def dumps_items(request, items, native=False):
+    '''Encode a list of items as the comma separated content of a JSON array.'''
+    # Strip the array brackets
+    return encode(request, items, native)[1:-1].strip()
+
+
+class EncodedJSON(object):
+    '''
+    A pre-encoded JSON body, sent as is by :meth:`~sanic_restplus.Api.make_response`
+
+    :param bytes body: the JSON body
+    '''
+    __slots__ = ('body', )
+
+    def __init__(self, body):
+        self.body = body
+
+    @classmethod
+    def encode(cls, request, data, native=False):
+        '''Encode some data into a JSON body (see :func:`encode`)'''
+        return cls.from_dumped(encode(request, data, native))
+
+    @classmethod
+    def from_fragment(cls, fragment):
+        '''Wrap a :class:`JSONFragment` returned by a handler into a JSON body'''
+        return cls(fragment.as_bytes() + b'\n')
+
+    @classmethod
+    def from_dumped(cls, dumped):
+        '''Wrap the output of :func:`encode` (or :func:`encode_with`) into a JSON body'''
+        if isinstance(dumped, str):
+            return cls((dumped + '\n').encode('utf-8'))
+        return cls(dumped + b'\n')
+
+    def decode(self):
+        '''Get the decoded data back (for non-JSON representations)'''
+        return loads(self.body)
+
+    def __repr__(self):
+        return 'EncodedJSON({0!r})'.format(self.body)
+
+
+def output_json_encoded(request, data, code, headers=None):
+    '''Makes a response from a pre-encoded :class:`EncodedJSON` body'''
+    return json_response(data.body, code, headers)
+
+
+def output_json_stream(request, data, code, headers=None):
+    '''
+    Makes a streaming response writing a :class:`~sanic_restplus.marshalling.MarshalledStream`
+    as a JSON array, one chunk per marshalled batch
+    '''
+    flush_size = request.app.config.get('RESTPLUS_STREAM_FLUSH_SIZE', 100)
+    native = data.native is not None and can_encode_native(request)
+
+    async def streaming_fn(response):
+        if data.envelope:
+            await response.write('{{{0}:['.format(dumps(data.envelope)))
         else:
-            resp = HTTPResponse(dumped, code, headers, content_type='application/json')
-        return resp
-    output_json_fast = output_json_fast_orjson
-else:
-    output_json_fast = output_json_pretty
+            await response.write('[')
+        separator = ''
+        async for batch in data.batches(flush_size, native):
+            await response.write(separator)
+            await response.write(dumps_items(request, batch, native))
+            separator = ','
+        await response.write(']}\n' if data.envelope else ']\n')
+
+    return stream(streaming_fn, code, headers, content_type='application/json')
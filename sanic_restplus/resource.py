@@ -6,6 +6,7 @@ from sanic.views import HTTPMethodView
 from sanic.response import BaseHTTPResponse
 from sanic.constants import HTTP_METHODS
 
+from .binary import load_payload
 from .model import ModelBase
 
 from .utils import unpack, best_match_accept_mimetype
@@ -136,8 +137,7 @@ class Resource(MethodViewExt, metaclass=ResourceMeta):
         :param bool collection: False if a single object of a resource is
         expected, True if a collection of objects of a resource is expected.
         '''
-        # TODO: proper content negotiation
-        data = request.json
+        data = load_payload(request)
         if collection:
             data = data if isinstance(data, list) else [data]
             for obj in data:
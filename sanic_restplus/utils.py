@@ -2,7 +2,10 @@
 #
 import sys
 import re
+import collections
+import weakref
 from copy import deepcopy
+from functools import lru_cache
 from ._http import HTTPStatus
 
 py_36 = (3, 6)
@@ -26,7 +29,79 @@ ALL_CAP_RE = re.compile('([a-z0-9])([A-Z])')
 
 
 __all__ = ('merge', 'camel_to_dash', 'default_id', 'not_none', 'not_none_sorted', 'unpack',
-           'cur_py_version', 'ordered_dict_version', 'OrderedDict')
+           'cur_py_version', 'ordered_dict_version', 'OrderedDict', 'CacheInfo', 'WeakLRUCache',
+           'negotiate_mimetype')
+
+#: Maximum number of distinct ``Accept`` headers kept parsed and negotiated
+NEGOTIATION_CACHE_SIZE = 1024
+
+CacheInfo = collections.namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class WeakLRUCache(object):
+    '''
+    A bounded LRU cache of values computed from objects.
+
+    Objects are weakly referenced (they can be unhashable like models)
+    so entries are dropped as soon as their object is garbage collected.
+
+    :param int maxsize: the maximum number of entries kept
+    '''
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def get(self, obj, factory, stamp=None):
+        '''
+        Get the value cached for an object, computing it with ``factory(obj)`` if missing.
+
+        :param stamp: an optional value the entry is only valid for
+            (ie. a revision number)
+        '''
+        key = id(obj)
+        entries = self._entries
+        entry = entries.get(key)
+        # Ensure the id has not been reused by another object
+        if entry is not None and entry[0]() is obj and entry[1] == stamp:
+            self.hits += 1
+            entries.move_to_end(key)
+            return entry[2]
+        self.misses += 1
+        value = factory(obj)
+        entries[key] = (weakref.ref(obj, self._remover(key)), stamp, value)
+        entries.move_to_end(key)
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+        return value
+
+    def _remover(self, key):
+        selfref = weakref.ref(self)
+
+        def remove(ref):
+            cache = selfref()
+            if cache is not None:
+                entry = cache._entries.get(key)
+                if entry is not None and entry[0] is ref:
+                    del cache._entries[key]
+        return remove
+
+    def invalidate(self, obj):
+        '''Drop the entry of a given object'''
+        entry = self._entries.get(id(obj))
+        if entry is not None and entry[0]() is obj:
+            del self._entries[id(obj)]
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
 
 
 def merge(first, second, _recurse=0):
@@ -171,29 +246,70 @@ def parse_accept_header(value):
         result.append((match.group(1), quality))
     return result
 
+
+@lru_cache(maxsize=NEGOTIATION_CACHE_SIZE)
+def _parse_accept(value):
+    return tuple(OrderedDict.fromkeys(parse_accept_header(value)))
+
+
 def get_accept_mimetypes(request):
     accept_types = request.headers.get('accept', None)
     if accept_types is None:
         return {}
     # keep the order they appear!
-    return OrderedDict([((s, q), s) for s, q in parse_accept_header(accept_types)])
+    return OrderedDict([((s, q), s) for s, q in _parse_accept(accept_types)])
 
 def best_match_accept_mimetype(request, representations, default=None):
+    '''
+    Negotiate the response mediatype among some representations.
+
+    The result is computed once per request and representations
+    (it is stored in ``request.ctx.restplus_mediatypes``)
+    and cached by ``Accept`` header (see :func:`negotiate_mimetype`).
+    '''
     if representations is None or len(representations) < 1:
         return default
+    key = (frozenset(representations), default)
+    ctx = getattr(request, 'ctx', None)
+    negotiated = getattr(ctx, 'restplus_mediatypes', None)
+    if negotiated is None:
+        negotiated = {}
+        if ctx is not None:
+            ctx.restplus_mediatypes = negotiated
+    elif key in negotiated:
+        return negotiated[key]
+    try:
+        accept = request.headers.get('accept', None)
+    except AttributeError:
+        accept = None
+    mediatype = default if accept is None else negotiate_mimetype(accept, key[0], default)
+    negotiated[key] = mediatype
+    return mediatype
+
+
+@lru_cache(maxsize=NEGOTIATION_CACHE_SIZE)
+def negotiate_mimetype(accept, mediatypes, default=None):
+    '''
+    Find the best mediatype for an ``Accept`` header value (cached).
+
+    :param str accept: the ``Accept`` header value
+    :param frozenset mediatypes: the available mediatypes
+    :param default: the mediatype returned for wildcards or if none matches
+    :returns: the best mediatype, ``default`` or ``None`` if refused (ie. ``q=0``)
+    '''
     try:
-        accept_mimetypes = get_accept_mimetypes(request)
-        if accept_mimetypes is None or len(accept_mimetypes) < 1:
+        accept_mimetypes = _parse_accept(accept)
+        if len(accept_mimetypes) < 1:
             return default
         # find exact matches, in the order they appear in the `Accept:` header
         found = []
         for accept_type, qual in accept_mimetypes:
-            if accept_type in representations:
+            if accept_type in mediatypes:
                 found.append((qual, accept_type))
         # match special types, like "application/json;charset=utf8" where the first half matches.
         for accept_type, qual in accept_mimetypes:
             type_part = str(accept_type).split(';', 1)[0]
-            if type_part in representations:
+            if type_part in mediatypes:
                 t = (qual, type_part)
                 if t not in found:
                     found.append(t)
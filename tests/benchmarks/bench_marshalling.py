@@ -2,7 +2,7 @@ import pytest
 
 from faker import Faker
 
-from sanic_restplus import marshal, fields
+from sanic_restplus import marshal, fields, Model
 
 fake = Faker()
 
@@ -17,6 +17,14 @@ family_fields = {
     'children': fields.List(fields.Nested(person_fields))
 }
 
+person_model = Model('Person', person_fields)
+
+family_model = Model('Family', {
+    'father': fields.Nested(person_model),
+    'mother': fields.Nested(person_model),
+    'children': fields.List(fields.Nested(person_model))
+})
+
 
 def person():
     return {
@@ -33,6 +41,56 @@ def family():
     }
 
 
+measure_model = Model('Measure', {
+    'count': fields.Integer,
+    'value': fields.Float,
+    'rounded': fields.Fixed(2, attribute='value'),
+    'total': fields.Arbitrary(attribute='count'),
+})
+
+
+def measure():
+    return {
+        'count': fake.pyint(),
+        'value': fake.pyfloat(),
+    }
+
+
+tagged_model = Model('Tagged', {
+    'tags': fields.List(fields.String),
+    'scores': fields.List(fields.Integer),
+    'ratios': fields.List(fields.Float),
+    'flags': fields.List(fields.Boolean),
+    'raw': fields.List(fields.Raw, attribute='scores'),
+})
+
+
+def tagged():
+    return {
+        'tags': [fake.word() for _ in range(10000)],
+        'scores': [fake.pyint() for _ in range(10000)],
+        'ratios': [fake.pyfloat() for _ in range(10000)],
+        'flags': [fake.pybool() for _ in range(10000)],
+    }
+
+
+persons = [person() for _ in range(1000)]
+families = [family() for _ in range(200)]
+measures = [measure() for _ in range(5000)]
+tagged_item = tagged()
+
+
+def interpreted_marshal(data, model):
+    '''The pre-compilation marshalling loop, used as reference'''
+    model = getattr(model, 'resolved', model)
+    if isinstance(data, (list, tuple)):
+        return [interpreted_marshal(d, model) for d in data]
+    return dict(
+        (key, (field() if isinstance(field, type) else field).output(key, data))
+        for key, field in model.items()
+    )
+
+
 def marshal_simple():
     return marshal(person(), person_fields)
 
@@ -41,14 +99,45 @@ def marshal_nested():
     return marshal(family(), family_fields)
 
 
-def marshal_simple_with_mask(app):
-    with app.test_request_context('/', headers={'X-Fields': 'name'}):
-        return marshal(person(), person_fields)
+def marshal_simple_with_mask():
+    return marshal(person(), person_fields, mask='name')
+
+
+def marshal_nested_with_mask():
+    return marshal(family(), family_fields, mask='father,children{name}')
+
+
+def marshal_list_compiled():
+    return marshal(persons, person_model)
 
 
-def marshal_nested_with_mask(app):
-    with app.test_request_context('/', headers={'X-Fields': 'father,children{name}'}):
-        return marshal(family(), family_fields)
+def marshal_list_interpreted():
+    return interpreted_marshal(persons, person_model)
+
+
+def marshal_nested_list_compiled():
+    return marshal(families, family_model)
+
+
+def marshal_nested_list_interpreted():
+    return interpreted_marshal(families, family_model)
+
+
+def marshal_numeric_columns():
+    return marshal(measures, measure_model)
+
+
+def marshal_primitive_lists():
+    return marshal(tagged_item, tagged_model)
+
+
+def marshal_primitive_lists_per_element():
+    return dict(
+        (key, [field.container.output(idx, values) for idx in range(len(values))])
+        for key, field, values in (
+            (key, field, tagged_item[field.attribute or key]) for key, field in tagged_model.resolved.items()
+        )
+    )
 
 
 @pytest.mark.benchmark(group='marshalling')
@@ -59,8 +148,44 @@ class MarshallingBenchmark(object):
     def bench_marshal_nested(self, benchmark):
         benchmark(marshal_nested)
 
-    def bench_marshal_simple_with_mask(self, app, benchmark):
-        benchmark(marshal_simple_with_mask, app)
+    def bench_marshal_simple_with_mask(self, benchmark):
+        benchmark(marshal_simple_with_mask)
+
+    def bench_marshal_nested_with_mask(self, benchmark):
+        benchmark(marshal_nested_with_mask)
+
+
+@pytest.mark.benchmark(group='compiled-marshalling')
+class CompiledMarshallingBenchmark(object):
+    def bench_marshal_list_compiled(self, benchmark):
+        benchmark(marshal_list_compiled)
+
+    def bench_marshal_list_interpreted(self, benchmark):
+        benchmark(marshal_list_interpreted)
+
+    def bench_marshal_nested_list_compiled(self, benchmark):
+        benchmark(marshal_nested_list_compiled)
+
+    def bench_marshal_nested_list_interpreted(self, benchmark):
+        benchmark(marshal_nested_list_interpreted)
+
+
+@pytest.mark.benchmark(group='numeric-columns')
+class NumericColumnsBenchmark(object):
+    def bench_marshal_numeric_columns_vectorized(self, benchmark):
+        if not fields.has_numpy:
+            pytest.skip('Vectorized formatting requires NumPy')
+        benchmark(marshal_numeric_columns)
+
+    def bench_marshal_numeric_columns_per_value(self, benchmark, monkeypatch):
+        monkeypatch.setattr(fields, 'numpy', None)
+        benchmark(marshal_numeric_columns)
+
+
+@pytest.mark.benchmark(group='primitive-lists')
+class PrimitiveListsBenchmark(object):
+    def bench_marshal_primitive_lists(self, benchmark):
+        benchmark(marshal_primitive_lists)
 
-    def bench_marshal_nested_with_mask(self, app, benchmark):
-        benchmark(marshal_nested_with_mask, app)
+    def bench_marshal_primitive_lists_per_element(self, benchmark):
+        benchmark(marshal_primitive_lists_per_element)
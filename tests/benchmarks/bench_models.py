@@ -0,0 +1,56 @@
+import gc
+import tracemalloc
+
+import pytest
+
+from sanic_restplus import marshal, fields, Model
+from sanic_restplus.fields import SCHEMA_CACHE
+from sanic_restplus.model import RESOLVED_CACHE
+
+# More than the caches size, so dropped models must be evicted
+MODELS = 5000
+
+base_model = Model('Base', {
+    'id': fields.Integer,
+    'name': fields.String,
+})
+
+data = {'id': 1, 'name': 'name', 'tenant': 'tenant'}
+
+
+def create_and_drop_models(count=MODELS):
+    '''Create, use and drop per-tenant models'''
+    for i in range(count):
+        model = base_model.inherit('Tenant{0}'.format(i), {
+            'tenant': fields.String(),
+        })
+        model.__schema__
+        marshal(data, model)
+
+
+def measure_memory(count=MODELS):
+    '''Memory (in bytes) still allocated after creating and dropping models'''
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        create_and_drop_models(count)
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.benchmark(group='models')
+class ModelsBenchmark(object):
+    def bench_create_and_drop_models(self, benchmark):
+        benchmark.pedantic(create_and_drop_models, rounds=1, iterations=1)
+        gc.collect()
+        assert len(RESOLVED_CACHE) <= RESOLVED_CACHE.maxsize
+        assert len(SCHEMA_CACHE) <= SCHEMA_CACHE.maxsize
+
+    def bench_models_memory(self, benchmark):
+        retained = benchmark.pedantic(measure_memory, rounds=1, iterations=1)
+        benchmark.extra_info['retained_bytes'] = retained
+        # Dropped models must not be retained by the caches
+        assert retained < 1024 * 1024
@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+from types import SimpleNamespace
+
+import pytest
+
+from sanic_restplus import marshal_with, fields, Model
+from sanic_restplus.offload import shutdown
+
+# Enough rows to block the event loop when marshalled inline
+EXPORT_ROWS = 20000
+LARGE_CHUNK_SIZE = 10000
+TICK = 0.001
+
+row_model = Model('Row', {
+    'id': fields.Integer,
+    'name': fields.String,
+    'score': fields.Float,
+    'tags': fields.List(fields.String),
+})
+
+resource = SimpleNamespace(api=SimpleNamespace(encode=True))
+
+
+async def small_requests(done, latencies):
+    '''Measure how late the event loop serves small requests'''
+    while not done.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        latencies.append(time.perf_counter() - start - TICK)
+
+
+@pytest.fixture(scope='module')
+def rows():
+    return [{'id': i, 'name': 'row {0}'.format(i), 'score': i / 3, 'tags': ['a', 'b']} for i in range(EXPORT_ROWS)]
+
+
+@pytest.fixture(scope='module')
+def large_rows():
+    '''Large rows pickled by large chunks before being sent to the pool'''
+    return [
+        {'id': i, 'name': 'row {0} '.format(i) * 20, 'score': i / 3, 'tags': ['tag {0}'.format(t) for t in range(20)]}
+        for i in range(EXPORT_ROWS)
+    ]
+
+
+async def export_in_flight(request, offload, data):
+    @marshal_with(row_model, encode=True, offload=offload)
+    async def export(resource, request):
+        return data
+
+    # Warm up the pool and the compiled marshallers
+    await export(resource, request)
+    done, latencies = asyncio.Event(), []
+    ticker = asyncio.ensure_future(small_requests(done, latencies))
+    await asyncio.sleep(TICK)
+    await export(resource, request)
+    done.set()
+    await ticker
+    return max(latencies)
+
+
+def max_latency(request, offload, data):
+    return asyncio.run(export_in_flight(request, offload, data))
+
+
+@pytest.mark.benchmark(group='offload')
+class OffloadBenchmark(object):
+    '''The maximum event loop latency (in seconds) is reported in the benchmarks extra info'''
+    def bench_event_loop_latency_inline(self, benchmark, make_request, rows):
+        latency = benchmark.pedantic(max_latency, args=(make_request(), False, rows), rounds=1, iterations=1)
+        benchmark.extra_info['max_latency'] = latency
+
+    def bench_event_loop_latency_offloaded(self, benchmark, make_request, rows):
+        try:
+            latency = benchmark.pedantic(max_latency, args=(make_request(), True, rows), rounds=1, iterations=1)
+        finally:
+            shutdown()
+        benchmark.extra_info['max_latency'] = latency
+
+    def bench_event_loop_latency_offloaded_large(self, benchmark, make_request, large_rows):
+        request = make_request(RESTPLUS_OFFLOAD_CHUNK_SIZE=LARGE_CHUNK_SIZE)
+        try:
+            latency = benchmark.pedantic(max_latency, args=(request, True, large_rows), rounds=1, iterations=1)
+        finally:
+            shutdown()
+        benchmark.extra_info['max_latency'] = latency
@@ -2,6 +2,7 @@
 import pytest
 import pytest_asyncio
 from sanic import Sanic, Blueprint
+from types import SimpleNamespace
 from uuid import uuid4
 from sanic_plugin_toolkit import SanicPluginRealm
 import sanic_restplus
@@ -54,6 +55,19 @@ def api(request, app):
     app.register_blueprint(blueprint)
     yield api
 
+
+def fake_request(headers=None, method='GET', body=b'', debug=False, **config):
+    '''A lightweight request (and application) for the tests not needing a Sanic app'''
+    app = SimpleNamespace(debug=debug, config=config, ctx=SimpleNamespace())
+    return SimpleNamespace(app=app, headers=headers or {}, method=method, body=body, json=None,
+                           ctx=SimpleNamespace())
+
+
+@pytest.fixture
+def make_request():
+    return fake_request
+
+
 @pytest.fixture
 def client(app):
     return app.test_client
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+'''Helpers shared by the test modules'''
+from __future__ import unicode_literals
+
+from sanic_restplus import fields
+
+
+#: The values formatted by :class:`Counted` fields (models fields are copied on resolution)
+FORMATTED = []
+
+
+class Counted(fields.Raw):
+    '''A field recording the values it formats in :data:`FORMATTED`'''
+    def format(self, value):
+        FORMATTED.append(value)
+        return value
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import uuid
+
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from sanic.exceptions import InvalidUsage, SanicException
+
+from sanic_restplus import Api, Namespace, Resource, fields
+from sanic_restplus.binary import (
+    CBOR_MIMETYPE, MSGPACK_MIMETYPE, load_payload, output_cbor, output_msgpack, pack_default
+)
+from sanic_restplus.representations import EncodedJSON, JSONFragment
+
+msgpack = pytest.importorskip('msgpack')
+cbor2 = pytest.importorskip('cbor2')
+
+DATA = OrderedDict([
+    ('id', 1),
+    ('name', 'name'),
+    ('tags', ['a', 'b']),
+    ('raw', b'\x00\x01'),
+])
+
+
+class PackDefaultTest(object):
+    @pytest.mark.parametrize('value,expected', [
+        (OrderedDict([('a', 1)]), {'a': 1}),
+        (datetime(2020, 1, 2, 3, 4, 5), '2020-01-02T03:04:05Z'),
+        (datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone(timedelta(hours=2))), '2020-01-02T03:04:05+02:00'),
+        (date(2020, 1, 2), '2020-01-02'),
+        (uuid.UUID(int=1), '00000000-0000-0000-0000-000000000001'),
+        (JSONFragment(b'{"a": [1]}'), {'a': [1]}),
+    ])
+    def test_converted(self, value, expected):
+        assert pack_default(value) == expected
+
+    def test_unsupported(self):
+        with pytest.raises(TypeError):
+            pack_default(object())
+
+
+class OutputTest(object):
+    def test_msgpack(self, make_request):
+        response = output_msgpack(make_request(), DATA, 201, {'X-Test': '1'})
+        assert response.status == 201
+        assert response.content_type == MSGPACK_MIMETYPE
+        assert msgpack.unpackb(response.body, raw=False) == dict(DATA)
+        assert response.headers['X-Test'] == '1'
+
+    def test_cbor(self, make_request):
+        response = output_cbor(make_request(), DATA, 200)
+        assert response.content_type == CBOR_MIMETYPE
+        assert cbor2.loads(response.body) == dict(DATA)
+
+    def test_datetimes(self, make_request):
+        value = datetime(2020, 1, 2, 3, 4, 5)
+        assert msgpack.unpackb(output_msgpack(make_request(), {'at': value}, 200).body) == {
+            'at': '2020-01-02T03:04:05Z'
+        }
+        assert cbor2.loads(output_cbor(make_request(), {'at': value}, 200).body) == {
+            'at': value.replace(tzinfo=timezone.utc)
+        }
+
+    def test_encoder_reuse(self, make_request):
+        first = output_cbor(make_request(), [1, 2, 3], 200).body
+        second = output_cbor(make_request(), {'a': 'b'}, 200).body
+        assert cbor2.loads(first) == [1, 2, 3]
+        assert cbor2.loads(second) == {'a': 'b'}
+
+    @pytest.mark.parametrize('mimetype,unpack', [
+        (MSGPACK_MIMETYPE, lambda body: msgpack.unpackb(body, raw=False)),
+        (CBOR_MIMETYPE, lambda body: cbor2.loads(body)),
+    ])
+    def test_api_representation(self, mimetype, unpack, make_request):
+        api = Api()
+        api.representation(MSGPACK_MIMETYPE)(output_msgpack)
+        api.representation(CBOR_MIMETYPE)(output_cbor)
+        request = make_request({'accept': mimetype})
+        response = api.make_response(request, {'fragment': JSONFragment('[1]')}, 200)
+        assert response.headers['Content-Type'] == mimetype
+        assert unpack(response.body) == {'fragment': [1]}
+        response = api.make_response(make_request({'accept': mimetype}), EncodedJSON(b'{"a": 1}'), 200)
+        assert unpack(response.body) == {'a': 1}
+
+
+class LoadPayloadTest(object):
+    @pytest.mark.parametrize('content_type,pack', [
+        (MSGPACK_MIMETYPE, msgpack.packb),
+        ('application/x-msgpack', msgpack.packb),
+        (CBOR_MIMETYPE + '; charset=binary', cbor2.dumps),
+    ])
+    def test_decoded(self, content_type, pack, make_request):
+        request = make_request({'content-type': content_type}, body=pack({'name': 'test'}))
+        payload = load_payload(request)
+        assert payload == {'name': 'test'}
+        assert load_payload(request) is payload
+        assert Api().payload(request) is payload
+        assert Namespace('test').payload(request) is payload
+
+    def test_json(self, make_request):
+        request = make_request({'content-type': 'application/json'})
+        request.json = {'name': 'test'}
+        assert load_payload(request) == {'name': 'test'}
+
+    def test_empty(self, make_request):
+        assert load_payload(make_request({'content-type': MSGPACK_MIMETYPE})) is None
+
+    def test_invalid(self, make_request):
+        with pytest.raises(InvalidUsage):
+            load_payload(make_request({'content-type': CBOR_MIMETYPE}, body=b'\x82\x01'))
+
+    def test_expect_validation(self, make_request):
+        api = Api(validate=True)
+        model = api.model('Person', {'name': fields.String(required=True)})
+
+        @api.expect(model)
+        def post(request):
+            pass
+
+        resource = Resource(api)
+        request = make_request({'content-type': MSGPACK_MIMETYPE}, body=msgpack.packb({'name': 'test'}))
+        resource.validate_payload(request, post)
+        request = make_request({'content-type': MSGPACK_MIMETYPE}, body=msgpack.packb({'age': 42}))
+        with pytest.raises(SanicException):
+            resource.validate_payload(request, post)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import asyncio
+import json
+import pickle
+
+from sanic_restplus import fields, marshal, marshal_with, Model
+from sanic_restplus.cache import ResultCache, sizeof
+from sanic_restplus.compiler import get_marshaller
+from sanic_restplus.representations import EncodedJSON
+
+from .helpers import FORMATTED, Counted
+
+
+product = Model('Product', {
+    'id': fields.Integer,
+    'name': fields.String,
+})
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class ResultCacheTest(object):
+    def test_hit_and_miss(self):
+        cache = ResultCache('id', 'version')
+        marshaller = cache.wrap(get_marshaller(product))
+        obj = {'id': 1, 'name': 'first', 'version': 1}
+        assert marshaller(obj) == {'id': 1, 'name': 'first'}
+        obj['name'] = 'changed'
+        assert marshaller(obj) == {'id': 1, 'name': 'first'}
+        assert cache.cache_info()[:2] == (1, 1)
+
+    def test_new_version(self):
+        cache = ResultCache('id', 'version')
+        marshaller = cache.wrap(get_marshaller(product))
+        marshaller({'id': 1, 'name': 'first', 'version': 1})
+        assert marshaller({'id': 1, 'name': 'second', 'version': 2}) == {'id': 1, 'name': 'second'}
+
+    def test_mask_and_model_revision(self):
+        cache = ResultCache('id')
+        model = product.clone('Cloned')
+        obj = {'id': 1, 'name': 'first', 'price': 3}
+        assert cache.wrap(get_marshaller(model))(obj) == {'id': 1, 'name': 'first'}
+        assert cache.wrap(get_marshaller(model, mask='id'))(obj) == {'id': 1}
+        model['price'] = fields.Integer
+        assert cache.wrap(get_marshaller(model))(obj) == {'id': 1, 'name': 'first', 'price': 3}
+
+    def test_without_key(self):
+        cache = ResultCache('id')
+        marshaller = cache.wrap(get_marshaller(product))
+        assert marshaller({'name': 'anonymous'}) == {'id': None, 'name': 'anonymous'}
+        assert len(cache) == 0
+
+    def test_lru(self):
+        cache = ResultCache('id', maxsize=2)
+        marshaller = cache.wrap(get_marshaller(product))
+        for i in (1, 2, 1, 3):
+            marshaller({'id': i})
+        assert set(key for _, key, _ in cache._entries) == {1, 3}
+
+    def test_ttl(self):
+        clock = Clock()
+        cache = ResultCache('id', ttl=10, timer=clock)
+        marshaller = cache.wrap(get_marshaller(product))
+        marshaller({'id': 1, 'name': 'first'})
+        clock.now = 5
+        assert marshaller({'id': 1, 'name': 'second'})['name'] == 'first'
+        clock.now = 10
+        assert marshaller({'id': 1, 'name': 'second'})['name'] == 'second'
+
+    def test_memory_budget(self):
+        value = {'id': 1, 'name': 'x' * 100}
+        cache = ResultCache('id', max_bytes=sizeof(value) * 2)
+        marshaller = cache.wrap(get_marshaller(product))
+        for i in range(5):
+            marshaller({'id': i, 'name': 'x' * 100})
+        assert len(cache) == 2
+        assert cache.currbytes <= cache.max_bytes
+        marshaller({'id': 9, 'name': 'x' * 10000})
+        assert 9 not in cache._keys
+
+    def test_invalidate(self):
+        cache = ResultCache('id')
+        marshaller = cache.wrap(get_marshaller(product))
+        masked = cache.wrap(get_marshaller(product, mask='name'))
+        marshaller({'id': 1, 'name': 'first'})
+        masked({'id': 1, 'name': 'first'})
+        marshaller({'id': 2, 'name': 'other'})
+        cache.invalidate(1)
+        assert len(cache) == 1
+        assert marshaller({'id': 1, 'name': 'second'})['name'] == 'second'
+
+    def test_collection(self):
+        cache = ResultCache('id')
+        marshaller = cache.wrap(get_marshaller(product, envelope='data'))
+        marshaller([{'id': 1, 'name': 'first'}])
+        data = [{'id': 1, 'name': 'changed'}, {'id': 2, 'name': 'second'}, {'name': 'anonymous'}]
+        assert marshaller(data) == {'data': [
+            {'id': 1, 'name': 'first'},
+            {'id': 2, 'name': 'second'},
+            {'id': None, 'name': 'anonymous'},
+        ]}
+        assert len(cache) == 2
+
+
+class CachedNestedTest(object):
+    def test_nested(self):
+        del FORMATTED[:]
+        cache = ResultCache('id')
+        model = Model('Order', {
+            'ref': fields.String,
+            'product': fields.Nested({'id': fields.Integer, 'name': Counted}, cache=cache),
+            'products': fields.List(fields.Nested({'id': fields.Integer, 'name': Counted}, cache=cache)),
+        })
+        item = {'id': 1, 'name': 'first'}
+        orders = [{'ref': str(i), 'product': item, 'products': [item, item]} for i in range(10)]
+        result = marshal(orders, model)
+        assert result[9] == {'ref': '9', 'product': item, 'products': [item, item]}
+        # Once per nested fields set (the marshallers differ)
+        assert len(FORMATTED) == 2
+
+    def test_pickled_nested(self):
+        field = fields.Nested(product, cache=ResultCache(lambda o: o['id']))
+        assert pickle.loads(pickle.dumps(field)).cache is None
+
+
+class CachedMarshalWithTest(object):
+    def test_encoded(self, make_request):
+        cache = ResultCache('id', 'version')
+        calls = []
+
+        @marshal_with(product, encode=True, cache=cache)
+        def get(request):
+            calls.append(1)
+            return {'id': 1, 'name': 'first', 'version': 1}
+
+        first = asyncio.run(get(make_request()))
+        second = asyncio.run(get(make_request()))
+        assert isinstance(second, EncodedJSON)
+        assert second is first
+        assert json.loads(second.body) == {'id': 1, 'name': 'first'}
+        assert cache.cache_info().hits == 1
+
+    def test_not_encoded(self, make_request):
+        cache = ResultCache('id')
+
+        @marshal_with(product, cache=cache)
+        def get(request):
+            return [{'id': 1, 'name': 'first'}], 200, {'X-Test': 'yes'}
+
+        asyncio.run(get(make_request()))
+        assert asyncio.run(get(make_request())) == ([{'id': 1, 'name': 'first'}], 200, {'X-Test': 'yes'})
+        assert cache.cache_info().hits == 1
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import asyncio
+
+from collections import OrderedDict
+from datetime import datetime
+
+import pytest
+
+from sanic_restplus import fields, marshal, marshal_with, Model
+from sanic_restplus.cache import ResultCache
+from sanic_restplus.columnar import DataFrameColumns, columnar, is_columnar
+from sanic_restplus.compiler import Marshaller
+
+
+person = Model('Person', {
+    'id': fields.Integer,
+    'name': fields.String,
+    'score': fields.Fixed(2),
+    'city': fields.String(attribute='address.city'),
+})
+
+
+class DataFrameTest(object):
+    @pytest.fixture
+    def pd(self):
+        return pytest.importorskip('pandas')
+
+    @pytest.fixture
+    def frame(self, pd):
+        return pd.DataFrame({
+            'id': [1, 2, 3],
+            'name': ['John', None, 'Jane'],
+            'score': [1.5, float('nan'), 2.25],
+            'address': [{'city': 'Paris'}, None, {'city': 'Lyon'}],
+            'ignored': ['a', 'b', 'c'],
+        })
+
+    def test_marshal(self, frame):
+        assert marshal(frame, person) == [
+            {'id': 1, 'name': 'John', 'score': '1.50', 'city': 'Paris'},
+            {'id': 2, 'name': None, 'score': None, 'city': None},
+            {'id': 3, 'name': 'Jane', 'score': '2.25', 'city': 'Lyon'},
+        ]
+
+    def test_same_output_as_records(self, frame):
+        records = frame.astype(object).where(frame.notna(), None).to_dict('records')
+        for options in ({}, {'skip_none': True}, {'envelope': 'data'}, {'mask': 'id,city'}, {'ordered': True}):
+            assert marshal(frame, person, **options) == marshal(records, person, **options)
+
+    def test_masked_columns_are_not_read(self, frame, monkeypatch):
+        read = []
+        column = DataFrameColumns.column
+
+        def spy(self, name):
+            read.append(name)
+            return column(self, name)
+
+        monkeypatch.setattr(DataFrameColumns, 'column', spy)
+        assert marshal(frame, person, mask='name') == [{'name': 'John'}, {'name': None}, {'name': 'Jane'}]
+        assert read == ['name']
+
+    def test_missing_column(self, pd):
+        frame = pd.DataFrame({'id': [1]})
+        assert marshal(frame, person) == [{'id': 1, 'name': None, 'score': None, 'city': None}]
+
+    def test_datetimes(self, pd):
+        frame = pd.DataFrame({'when': pd.to_datetime(['2020-01-02 03:04:05', None])})
+        assert marshal(frame, {'when': fields.DateTime}) == [{'when': '2020-01-02T03:04:05'}, {'when': None}]
+
+    def test_rows_fallback(self, frame):
+        model = {'id': fields.Integer, 'upper': fields.String(attribute=lambda row: row['name'] or '')}
+        assert Marshaller(model).columnar_plan is None
+        assert marshal(frame, model)[0] == {'id': 1, 'upper': 'John'}
+        assert marshal(frame[['id', 'ignored']], {'id': fields.Integer, '*': fields.Wildcard(fields.String)}) == [
+            {'id': 1, 'ignored': 'a'},
+            {'id': 2, 'ignored': 'b'},
+            {'id': 3, 'ignored': 'c'},
+        ]
+
+    def test_empty(self, pd):
+        assert marshal(pd.DataFrame({'id': []}), person) == []
+        assert marshal(pd.DataFrame({'id': [1, 2]}), {}) == [{}, {}]
+
+    def test_marshal_with(self, frame, make_request):
+        @marshal_with(person, envelope='data', encode=True, cache=ResultCache('id'))
+        def get(request):
+            return frame
+
+        encoded = asyncio.run(get(make_request()))
+        assert encoded.decode()['data'][2] == {'id': 3, 'name': 'Jane', 'score': '2.25', 'city': 'Lyon'}
+
+
+class RecordArrayTest(object):
+    @pytest.fixture
+    def np(self):
+        return pytest.importorskip('numpy')
+
+    def test_marshal(self, np):
+        data = np.array([(1, 'John', 1.5, '2020-01-02T03:04:05')], dtype=[
+            ('id', 'i8'), ('name', 'U10'), ('score', 'f8'), ('when', 'M8[ns]'),
+        ])
+        model = {'id': fields.Integer, 'name': fields.String, 'when': fields.DateTime}
+        assert marshal(data, model) == [{'id': 1, 'name': 'John', 'when': '2020-01-02T03:04:05'}]
+        assert marshal(data.view(np.recarray), model, ordered=True) == [
+            OrderedDict([('id', 1), ('name', 'John'), ('when', '2020-01-02T03:04:05')]),
+        ]
+
+    def test_not_columnar(self, np):
+        assert not is_columnar(np.arange(3))
+        assert not is_columnar([{'id': 1}])
+        assert columnar({'id': 1}) is None
+
+
+class ArrowTest(object):
+    @pytest.fixture
+    def pa(self):
+        return pytest.importorskip('pyarrow')
+
+    def test_table(self, pa):
+        table = pa.table({
+            'id': [1, None],
+            'name': ['John', 'Jane'],
+            'score': [1.5, 2.0],
+            'address': [{'city': 'Paris'}, None],
+        })
+        expected = [
+            {'id': 1, 'name': 'John', 'score': '1.50', 'city': 'Paris'},
+            {'id': None, 'name': 'Jane', 'score': '2.00', 'city': None},
+        ]
+        assert marshal(table, person) == expected
+        assert marshal(table.to_batches()[0], person) == expected
+
+    def test_timestamps(self, pa):
+        table = pa.table({'when': pa.array([datetime(2020, 1, 2, 3, 4, 5), None], pa.timestamp('us'))})
+        assert marshal(table, {'when': fields.DateTime}) == [{'when': '2020-01-02T03:04:05'}, {'when': None}]
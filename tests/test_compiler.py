@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+from datetime import date
+
+import pytest
+
+from sanic_restplus import fields, marshal, Mask, Model
+from sanic_restplus.compiler import (
+    CACHE_SIZE, Marshaller, MarshallerCache, get_marshaller, mask_key, share_prefixes
+)
+
+
+class MarshallerTest(object):
+    def test_same_output_as_marshal(self):
+        model = Model('Person', {
+            'name': fields.String,
+            'age': fields.Integer(default=0),
+            'city': fields.String(attribute='address.city'),
+        })
+        data = [
+            {'name': 'John', 'age': '42', 'address': {'city': 'Paris'}},
+            {'name': 'Jane', 'address': None},
+        ]
+        expected = [
+            {'name': 'John', 'age': 42, 'city': 'Paris'},
+            {'name': 'Jane', 'age': 0, 'city': None},
+        ]
+        assert Marshaller(model)(data) == expected
+        assert marshal(data, model) == expected
+
+    def test_envelope_and_skip_none(self):
+        model = OrderedDict([('foo', fields.Raw), ('bar', fields.Raw)])
+        marshaller = Marshaller(model, envelope='data', skip_none=True)
+        assert marshaller({'foo': 'bar'}) == {'data': {'foo': 'bar'}}
+        assert marshaller([{'foo': 'bar'}]) == {'data': [{'foo': 'bar'}]}
+
+    def test_with_mask(self):
+        model = Model('Person', {
+            'name': fields.String,
+            'age': fields.Integer,
+        })
+        marshaller = Marshaller(model, mask='name')
+        assert list(marshaller.fields.keys()) == ['name']
+        assert marshaller({'name': 'John', 'age': 42}) == {'name': 'John'}
+
+    def test_nested_lists(self):
+        model = {'foo': fields.Raw}
+        assert Marshaller(model)([[{'foo': 1}], {'foo': 2}]) == [[{'foo': 1}], {'foo': 2}]
+
+    def test_recursive_model(self):
+        node = Model('Node', {'name': fields.String})
+        node['children'] = fields.List(fields.Nested(node, skip_none=True), default=[])
+        data = {'name': 'root', 'children': [{'name': 'leaf'}]}
+
+        assert marshal(data, node) == {
+            'name': 'root',
+            'children': [{'name': 'leaf', 'children': []}],
+        }
+
+    def test_custom_output_field(self):
+        class Constant(fields.Raw):
+            def output(self, key, obj, **kwargs):
+                return 'constant'
+
+        assert Marshaller({'foo': Constant})({}) == {'foo': 'constant'}
+
+    def test_object_and_dict_rows(self):
+        class Person(object):
+            def __init__(self, name):
+                self.name = name
+
+        model = {'name': fields.String, 'first': fields.String(attribute='names.0')}
+        data = [Person('John'), {'name': 'Jane', 'names': ['J']}]
+        assert Marshaller(model)(data) == [
+            {'name': 'John', 'first': None},
+            {'name': 'Jane', 'first': 'J'},
+        ]
+
+    def test_shared_prefixes_resolved_once(self):
+        calls = []
+
+        class Owner(object):
+            @property
+            def address(self):
+                calls.append(1)
+                return {'city': 'Paris', 'zip': '75000'}
+
+        model = Model('Owner', {
+            'city': fields.String(attribute='owner.address.city'),
+            'zip': fields.String(attribute='owner.address.zip'),
+            'name': fields.String(attribute='owner.name'),
+        })
+        data = {'owner': Owner()}
+        assert Marshaller(model)(data) == {'city': 'Paris', 'zip': '75000', 'name': None}
+        assert len(calls) == 1
+
+    def test_share_prefixes(self):
+        entries = [(key, fields.make_accessor(key), None) for key in ('a.b.c', 'a.b.d', 'a.e', 'f')]
+        prefixes, compiled = share_prefixes(entries)
+        assert [(accessor.key, source) for accessor, source in prefixes] == [('a', 0), ('b', 1)]
+        assert [(accessor.key, source) for _, accessor, _, source in compiled] == [
+            ('c', 2), ('d', 2), ('e', 1), ('f', 0),
+        ]
+
+    def test_marshal_many_by_columns(self):
+        class Person(object):
+            def __init__(self, name):
+                self.name = name
+
+        model = Model('Person', {
+            'name': fields.String,
+            'city': fields.String(attribute='address.city'),
+            'zip': fields.String(attribute='address.zip'),
+        })
+        marshaller = Marshaller(model)
+        dicts = [{'name': 'John', 'address': {'city': 'Paris', 'zip': '75000'}}, {'name': 'Jane'}]
+        objects = [Person('John'), Person('Jane')]
+        mixed = [objects[0], dicts[1]]
+        assert marshaller.plan_for(dicts) is marshaller.plans[0]
+        assert marshaller.plan_for(objects) is marshaller.plans[1]
+        assert marshaller.plan_for(mixed) is marshaller.plans[2]
+        assert marshaller.plan_for([dicts]) is None
+
+        assert marshaller(dicts) == [
+            {'name': 'John', 'city': 'Paris', 'zip': '75000'},
+            {'name': 'Jane', 'city': None, 'zip': None},
+        ]
+        assert marshaller(objects) == [
+            {'name': 'John', 'city': None, 'zip': None},
+            {'name': 'Jane', 'city': None, 'zip': None},
+        ]
+        assert marshaller(mixed) == [marshaller(row) for row in mixed]
+        assert Marshaller(model, skip_none=True)(dicts) == [
+            {'name': 'John', 'city': 'Paris', 'zip': '75000'},
+            {'name': 'Jane'},
+        ]
+        assert Marshaller({})(dicts) == [{}, {}]
+
+    def test_marshal_many_with_wildcard(self):
+        model = {'name': fields.String, '*': fields.Wildcard(fields.Integer)}
+        marshaller = Marshaller(model)
+        assert marshaller.plan_for([{}]) is None
+        assert marshaller([{'name': 'John', 'age': 42}]) == [{'name': 'John', 'age': 42}]
+
+    def test_list_of_nested(self):
+        model = Model('Person', {'name': fields.String})
+        field = fields.List(fields.Nested(model))
+        data = {'people': [{'name': 'John'}, {'name': 'Jane'}]}
+        assert field.output('people', data) == [{'name': 'John'}, {'name': 'Jane'}]
+        data = {'people': [{'name': 'John'}, None]}
+        assert field.output('people', data) == [{'name': 'John'}, {'name': None}]
+
+    def test_marshal_many_vectorized(self, monkeypatch):
+        model = Model('Measure', {
+            'count': fields.Integer,
+            'value': fields.Float,
+            'rounded': fields.Fixed(2, attribute='value'),
+            'label': fields.String,
+        })
+        rows = [{'count': i * 1.5, 'value': i / 3, 'label': i} for i in range(200)]
+        rows.append({'count': None, 'value': 0.5, 'label': None})
+        marshaller = Marshaller(model)
+        assert sorted(marshaller.columns) == ['count', 'rounded', 'value']
+        expected = [marshaller(row) for row in rows]
+        assert marshaller(rows) == expected
+        monkeypatch.setattr(fields, 'numpy', None)
+        assert marshaller(rows) == expected
+
+    def test_marshalling_error(self):
+        model = {'foo': fields.Fixed}
+        with pytest.raises(fields.MarshallingError):
+            Marshaller(model)({'foo': 'inf'})
+
+
+class ProjectionTest(object):
+    def test_projection(self):
+        owner = Model('Owner', {'name': fields.String, 'email': fields.String})
+        model = Model('Pet', {
+            'id': fields.Integer,
+            'owner': fields.Nested(owner),
+            'owners': fields.List(fields.Nested(owner)),
+            'tags': fields.List(fields.String),
+            'meta': {'created': fields.DateTime},
+        })
+        assert Marshaller(model).projection == {
+            'id', 'owner', 'owner.name', 'owner.email', 'owners', 'owners.name', 'owners.email',
+            'tags', 'meta', 'meta.created',
+        }
+        assert Marshaller(model, mask='id,owner{name}').projection == {'id', 'owner', 'owner.name'}
+
+    def test_recursive_model(self):
+        node = Model('Node', {'name': fields.String})
+        node['children'] = fields.List(fields.Nested(node))
+        assert Marshaller(node).projection == {'name', 'children', 'children.name', 'children.children'}
+
+
+class GetMarshallerTest(object):
+    def test_cached_on_model(self):
+        model = Model('Person', {'name': fields.String})
+        marshaller = get_marshaller(model)
+        assert get_marshaller(model) is marshaller
+        assert get_marshaller(model, mask='name') is get_marshaller(model, mask='name')
+        assert get_marshaller(model, skip_none=True) is not marshaller
+        assert get_marshaller(model, envelope='data') is not marshaller
+
+    def test_cached_by_native(self):
+        model = Model('Person', {'name': fields.String, 'born': fields.Date})
+        marshaller = get_marshaller(model, native=True)
+        assert marshaller.native
+        assert get_marshaller(model, native=True) is marshaller
+        assert get_marshaller(model) is not marshaller
+        assert not get_marshaller(model).native
+
+    def test_native_nested(self):
+        born = date(1984, 6, 7)
+        model = Model('Person', {
+            'born': fields.Date,
+            'parent': fields.Nested({'born': fields.Date}),
+            'inline': {'born': fields.Date},
+        })
+        data = {'born': born, 'parent': {'born': born}}
+        assert get_marshaller(model, native=True)(data) == {
+            'born': born, 'parent': {'born': born}, 'inline': {'born': born},
+        }
+        assert get_marshaller(model)(data) == {
+            'born': '1984-06-07', 'parent': {'born': '1984-06-07'}, 'inline': {'born': '1984-06-07'},
+        }
+
+    def test_not_cached_for_dict(self):
+        model = {'name': fields.String}
+        assert get_marshaller(model) is not get_marshaller(model)
+
+    def test_cached_in_provided_cache(self):
+        model = {'name': fields.String}
+        cache = MarshallerCache()
+        marshaller = get_marshaller(model, cache=cache)
+        assert get_marshaller(model, cache=cache) is marshaller
+        assert len(cache) == 1
+        assert cache.cache_info() == (1, 1, CACHE_SIZE, 1)
+
+    def test_cached_by_mask(self):
+        model = Model('Person', {'name': fields.String, 'age': fields.Integer})
+        marshaller = get_marshaller(model, mask='name')
+        assert get_marshaller(model, mask='name') is marshaller
+        assert get_marshaller(model, mask='{name}') is not marshaller
+        assert get_marshaller(model, mask=Mask('name', skip=True)) is not marshaller
+        info = model.__marshallers__.cache_info()
+        assert info.hits == 1
+        assert info.misses == 3
+
+    def test_lru_eviction(self):
+        cache = MarshallerCache(maxsize=2)
+        model = {'a': fields.Raw, 'b': fields.Raw, 'c': fields.Raw}
+        a = get_marshaller(model, mask='a', cache=cache)
+        get_marshaller(model, mask='b', cache=cache)
+        assert get_marshaller(model, mask='a', cache=cache) is a
+        get_marshaller(model, mask='c', cache=cache)
+        assert 'a' in [key[3] for key in cache._marshallers]
+        assert 'b' not in [key[3] for key in cache._marshallers]
+        assert len(cache) == 2
+
+    def test_nested_marshaller_is_reused(self):
+        model = Model('Person', {'name': fields.String})
+        field = fields.Nested(model)
+        assert field.marshaller() is field.marshaller()
+        assert field.marshaller() is get_marshaller(model)
+
+    def test_clone_does_not_share_cache(self):
+        field = fields.Nested({'name': fields.String})
+        field.marshaller()
+        clone = field.clone()
+        assert '_marshallers' not in clone.__dict__
+
+    def test_mask_key(self):
+        assert mask_key(None) is None
+        assert mask_key('') is None
+        assert mask_key('a,b') == 'a,b'
+        assert mask_key(Mask('a,b', skip=True)) == ('{a,b}', True)
+        with pytest.raises(TypeError):
+            mask_key({'a': True})
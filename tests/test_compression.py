@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from sanic.response import HTTPResponse
+
+from sanic_restplus import Api
+from sanic_restplus.compression import (
+    PrecompressedJSON, add_vary, compress_response, has_brotli, has_zstd, negotiate_encoding
+)
+
+BODY = json.dumps([{'id': i, 'name': 'item{0}'.format(i)} for i in range(200)]).encode('utf-8')
+
+
+def accepting(encodings):
+    return {'accept-encoding': encodings}
+
+
+def compress(request, body=BODY, precompressed=None, **kwargs):
+    kwargs.setdefault('content_type', 'application/json')
+    return asyncio.run(compress_response(request, HTTPResponse(body, **kwargs), precompressed))
+
+
+class NegotiateEncodingTest(object):
+    @pytest.mark.parametrize('accept_encoding,encodings,expected', [
+        ('gzip, deflate', ('zstd', 'br', 'gzip'), 'gzip'),
+        ('gzip, br, zstd', ('zstd', 'br', 'gzip'), 'zstd'),
+        ('gzip, br, zstd', ('br', 'gzip'), 'br'),
+        ('gzip;q=1.0, br;q=0.5', ('br', 'gzip'), 'gzip'),
+        ('GZIP', ('gzip',), 'gzip'),
+        ('*', ('br', 'gzip'), 'br'),
+        ('*;q=0, gzip', ('br', 'gzip'), 'gzip'),
+        ('gzip;q=0', ('gzip',), None),
+        ('identity', ('br', 'gzip'), None),
+        ('deflate', ('gzip',), None),
+    ])
+    def test_negotiate(self, accept_encoding, encodings, expected):
+        assert negotiate_encoding(accept_encoding, encodings) == expected
+
+
+class VaryTest(object):
+    @pytest.mark.parametrize('vary,expected', [
+        (None, 'Accept-Encoding'),
+        ('Accept', 'Accept, Accept-Encoding'),
+        ('accept-encoding', 'accept-encoding'),
+        ('*', '*'),
+    ])
+    def test_add_vary(self, vary, expected):
+        headers = {} if vary is None else {'vary': vary}
+        add_vary(headers)
+        assert headers['vary'] == expected
+
+
+class CompressResponseTest(object):
+    def test_gzip(self, make_request):
+        response = compress(make_request(accepting('gzip')), headers={'content-length': str(len(BODY))})
+        assert response.headers['content-encoding'] == 'gzip'
+        assert response.headers['vary'] == 'Accept-Encoding'
+        assert 'content-length' not in response.headers
+        assert gzip.decompress(response.body) == BODY
+        assert len(response.body) < len(BODY)
+
+    @pytest.mark.skipif(not has_brotli, reason='brotli is not installed')
+    def test_brotli(self, make_request):
+        import brotli
+        response = compress(make_request(accepting('gzip, br'), RESTPLUS_COMPRESS_LEVELS={'br': 1}))
+        assert response.headers['content-encoding'] == 'br'
+        assert brotli.decompress(response.body) == BODY
+
+    @pytest.mark.skipif(not has_zstd, reason='zstandard is not installed')
+    def test_zstd(self, make_request):
+        import zstandard
+        response = compress(make_request(accepting('gzip, br, zstd')))
+        assert response.headers['content-encoding'] == 'zstd'
+        assert zstandard.ZstdDecompressor().decompress(response.body) == BODY
+
+    def test_restricted_encodings(self, make_request):
+        response = compress(make_request(accepting('gzip, br, zstd'), RESTPLUS_COMPRESS_ENCODINGS=('gzip', 'deflate')))
+        assert response.headers['content-encoding'] == 'gzip'
+
+    def test_not_accepted(self, make_request):
+        response = compress(make_request())
+        assert response.body == BODY
+        assert 'content-encoding' not in response.headers
+        assert response.headers['vary'] == 'Accept-Encoding'
+
+    @pytest.mark.parametrize('kwargs', [
+        {'body': b'{}'},
+        {'content_type': 'image/png'},
+        {'status': 204},
+        {'headers': {'content-encoding': 'br'}},
+    ])
+    def test_not_compressible(self, kwargs, make_request):
+        response = compress(make_request(accepting('gzip')), **kwargs)
+        assert 'vary' not in response.headers
+        assert response.headers.get('content-encoding') == kwargs.get('headers', {}).get('content-encoding')
+
+    def test_suffixed_mediatype(self, make_request):
+        response = compress(make_request(accepting('gzip')), content_type='application/problem+json')
+        assert response.headers['content-encoding'] == 'gzip'
+
+    def test_min_size(self, make_request):
+        response = compress(make_request(accepting('gzip'), RESTPLUS_COMPRESS_MIN_SIZE=0), body=b'{}')
+        assert gzip.decompress(response.body) == b'{}'
+
+    def test_threaded(self, mocker, make_request):
+        gzip_compress = mocker.spy(gzip, 'compress')
+        response = compress(make_request(accepting('gzip'), RESTPLUS_COMPRESS_THREAD_THRESHOLD=0))
+        assert gzip.decompress(response.body) == BODY
+        assert gzip_compress.call_count == 1
+
+    def test_precompressed(self, mocker, make_request):
+        data = PrecompressedJSON(BODY)
+        spy = mocker.spy(PrecompressedJSON, 'compress')
+        first = compress(make_request(accepting('gzip')), data.body, data)
+        second = compress(make_request(accepting('gzip'), RESTPLUS_COMPRESS_THREAD_THRESHOLD=0), data.body, data)
+        assert first.body is second.body is data.compressed['gzip']
+        assert gzip.decompress(first.body) == BODY
+        assert spy.call_count == 2
+        assert list(data.compressed) == ['gzip']
+
+
+class ApiCompressTest(object):
+    def test_output(self, make_request):
+        api = Api(compress=True)
+        data = [{'id': i} for i in range(500)]
+        response = asyncio.run(api.output(lambda request: (data, 200))(make_request(accepting('gzip'))))
+        assert response.headers['content-encoding'] == 'gzip'
+        assert json.loads(gzip.decompress(response.body)) == data
+
+    def test_disabled(self, make_request):
+        api = Api()
+        data = [{'id': i} for i in range(500)]
+        response = asyncio.run(api.output(lambda request: (data, 200))(make_request(accepting('gzip'))))
+        assert 'content-encoding' not in response.headers
+
+    def test_schema_body(self, mocker, make_request):
+        api = Api(compress=True)
+        mocker.patch.object(Api, '__schema__', new_callable=mocker.PropertyMock,
+                            return_value={'swagger': '2.0', 'paths': {}})
+        request = make_request(accepting('gzip'))
+        body = api.schema_body(request)
+        assert isinstance(body, PrecompressedJSON)
+        assert api.schema_body(request) is body
+        assert json.loads(body.body) == {'swagger': '2.0', 'paths': {}}
+        assert api.schema_body(make_request(accepting('gzip'), debug=True)) == {'swagger': '2.0', 'paths': {}}
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import asyncio
+import gzip
+
+import pytest
+
+from sanic.response import HTTPResponse
+
+from sanic_restplus import Api, Namespace, Resource, fields, marshal_with
+from sanic_restplus.compression import compress_response
+from sanic_restplus.etag import etag, etag_matches, make_etag, not_modified, tag_response
+
+
+todo = {'id': fields.Integer, 'task': fields.String}
+
+
+class Counter(object):
+    def __init__(self):
+        self.calls = 0
+
+
+class ETagTest(object):
+    def test_make_etag(self):
+        tag = make_etag(b'{"a": 1}')
+        assert tag.startswith('"') and tag.endswith('"')
+        assert make_etag(b'{"a": 1}') == tag
+        assert make_etag(b'{"a": 2}') != tag
+        assert make_etag(b'{"a": 1}', weak=True) == 'W/' + tag
+
+    @pytest.mark.parametrize('if_none_match,etag,expected', [
+        ('"abc"', '"abc"', True),
+        ('"abc"', 'W/"abc"', True),
+        ('W/"abc"', '"abc"', True),
+        ('"xyz", W/"abc"', '"abc"', True),
+        ('*', '"abc"', True),
+        ('"xyz"', '"abc"', False),
+        ('', '"abc"', False),
+        (None, '"abc"', False),
+    ])
+    def test_etag_matches(self, if_none_match, etag, expected):
+        assert etag_matches(if_none_match, etag) is expected
+
+    def test_not_modified(self):
+        response = not_modified('"abc"', {'Cache-Control': 'max-age=60', 'Content-Type': 'application/json'})
+        assert response.status == 304
+        assert not response.body
+        assert response.headers['ETag'] == '"abc"'
+        assert response.headers['Cache-Control'] == 'max-age=60'
+        assert 'Content-Type' not in response.headers
+
+
+class TagResponseTest(object):
+    def test_tagged(self, make_request):
+        response = tag_response(make_request(), HTTPResponse(b'{"a": 1}'))
+        assert response.status == 200
+        assert response.headers['ETag'] == make_etag(b'{"a": 1}')
+
+    def test_not_modified(self, make_request):
+        request = make_request({'if-none-match': make_etag(b'{"a": 1}')})
+        response = tag_response(request, HTTPResponse(b'{"a": 1}', headers={'Cache-Control': 'no-cache'}))
+        assert response.status == 304
+        assert not response.body
+        assert response.headers['Cache-Control'] == 'no-cache'
+
+    def test_existing_tag(self, make_request):
+        request = make_request({'if-none-match': '"v1"'})
+        assert tag_response(request, HTTPResponse(b'{}', headers={'ETag': '"v1"'})).status == 304
+
+    @pytest.mark.parametrize('method,status', [('POST', 200), ('GET', 201), ('GET', 404)])
+    def test_not_tagged(self, method, status, make_request):
+        response = tag_response(make_request(method=method), HTTPResponse(b'{}', status=status))
+        assert 'ETag' not in response.headers
+
+    def test_api_make_response(self, make_request):
+        api = Api(auto_etag='weak')
+        response = api.make_response(make_request(), {'a': 1}, 200)
+        tag = response.headers['ETag']
+        assert tag.startswith('W/"')
+        response = api.make_response(make_request({'if-none-match': tag}), {'a': 1}, 200)
+        assert response.status == 304
+        assert 'ETag' not in Api().make_response(make_request(), {'a': 1}, 200).headers
+
+    def test_weakened_by_compression(self, make_request):
+        body = b'[' + b','.join(b'{"id": %d}' % i for i in range(500)) + b']'
+        request = make_request({'accept-encoding': 'gzip'})
+        response = tag_response(request, HTTPResponse(body, content_type='application/json'))
+        tag = response.headers['ETag']
+        response = asyncio.run(compress_response(request, response))
+        assert gzip.decompress(response.body) == body
+        assert response.headers['ETag'] == 'W/' + tag
+
+
+class VersionETagTest(object):
+    def make_resource(self, counter, version=1, weak=False):
+        def todo_version(self, request, todo_id):
+            return version
+
+        class Todo(Resource):
+            @etag(todo_version, weak)
+            @marshal_with(todo)
+            async def get(self, request, todo_id):
+                counter.calls += 1
+                return {'id': todo_id, 'task': 'test'}
+
+            @etag(todo_version)
+            def put(self, request, todo_id):
+                counter.calls += 1
+                return {'id': todo_id}, 201
+
+        return Todo()
+
+    def test_tagged(self, make_request):
+        counter = Counter()
+        resource = self.make_resource(counter)
+        data, code, headers = asyncio.run(resource.get(make_request(), 1))
+        assert data == {'id': 1, 'task': 'test'}
+        assert code == 200
+        assert headers['ETag'].startswith('"')
+        assert counter.calls == 1
+
+    def test_not_modified_skips_handler(self, make_request):
+        counter = Counter()
+        resource = self.make_resource(counter)
+        _, _, headers = asyncio.run(resource.get(make_request(), 1))
+        response = asyncio.run(resource.get(make_request({'if-none-match': headers['ETag']}), 1))
+        assert response.status == 304
+        assert response.headers['ETag'] == headers['ETag']
+        assert counter.calls == 1
+
+    def test_new_version(self, make_request):
+        counter = Counter()
+        _, _, headers = asyncio.run(self.make_resource(counter, 1).get(make_request(), 1))
+        result = asyncio.run(self.make_resource(counter, 2).get(make_request({'if-none-match': headers['ETag']}), 1))
+        assert result[0] == {'id': 1, 'task': 'test'}
+        assert result[2]['ETag'] != headers['ETag']
+        assert counter.calls == 2
+
+    def test_depends_on_representation(self, make_request):
+        resource = self.make_resource(Counter())
+        tags = {
+            asyncio.run(resource.get(make_request(dict(headers)), 1))[2]['ETag']
+            for headers in ({}, {'X-Fields': 'id'}, {'accept': 'application/xml'})
+        }
+        assert len(tags) == 3
+
+    def test_async_version_and_weak(self, make_request):
+        async def version(request):
+            return 'v1'
+
+        @etag(version, weak=True)
+        def get(request):
+            return {'a': 1}
+
+        _, _, headers = asyncio.run(get(make_request()))
+        assert headers['ETag'].startswith('W/"')
+        assert asyncio.run(get(make_request({'if-none-match': headers['ETag']}))).status == 304
+
+    def test_skipped(self, make_request):
+        counter = Counter()
+        resource = self.make_resource(counter, version=None)
+        assert asyncio.run(resource.get(make_request({'if-none-match': '*'}), 1)) == {'id': 1, 'task': 'test'}
+        resource = self.make_resource(counter)
+        assert asyncio.run(resource.put(make_request({'if-none-match': '*'}, 'PUT'), 1)) == ({'id': 1}, 201)
+        assert counter.calls == 2
+
+    def test_namespace_documented(self):
+        ns = Namespace('todos')
+
+        @ns.etag(lambda request: 1)
+        def get(request):
+            return {}
+
+        assert get.__apidoc__['responses'] == {'304': ('Not Modified', None)}
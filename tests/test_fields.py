@@ -1,17 +1,32 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
-from collections import OrderedDict
+import asyncio
+import json
+
+from collections import OrderedDict, namedtuple
+from dataclasses import dataclass
 from datetime import date, datetime, timezone, timedelta
 from decimal import Decimal
 from functools import partial
+from types import SimpleNamespace
 
 import pytest
 from sanic_plugin_toolkit import SanicPluginRealm
 from sanic import Blueprint
-from sanic_restplus import fields, Api, restplus
+from sanic_restplus import fields, marshal, Api, Model, restplus
+from sanic_restplus.compiler import get_marshaller
+from sanic_restplus.marshalling import MarshalledStream
+from sanic_restplus.fields import VECTORIZE_MIN_ROWS
+from sanic_restplus.representations import JSONFragment, dumps_fragments, encode, encode_with, has_orjson
 cet = timezone(timedelta(hours=1), 'CET')
 
+
+def column(*values):
+    '''A column large enough to be formatted at once'''
+    return list(values) * (VECTORIZE_MIN_ROWS // len(values) + 1)
+
+
 class FieldTestCase(object):
     field_class = None
 
@@ -31,6 +46,25 @@ class FieldTestCase(object):
         with pytest.raises(fields.MarshallingError):
             field.output('foo', {'foo': value})
 
+    def assert_native_field(self, field, value, expected):
+        '''Native types marshalling must encode into the same JSON'''
+        if not has_orjson:
+            pytest.skip('Native types require orjson')
+        request = SimpleNamespace(app=SimpleNamespace(debug=False, config={}))
+        marshalled = get_marshaller({'foo': field}, native=True)({'foo': value})
+        assert json.loads(encode(request, marshalled, native=True)) == {'foo': expected}
+
+    def assert_many_field(self, field, values, vectorized=True):
+        '''Columns formatted at once must match the per-value formatting (types included)'''
+        if not fields.has_numpy:
+            pytest.skip('Vectorized formatting requires NumPy')
+        formatted = field.format_many(values)
+        if not vectorized:
+            assert formatted is None
+            return
+        assert formatted is not None
+        assert [(type(v), v) for v in formatted] == [(type(v), v) for v in map(field.format, values)]
+
 
 class BaseFieldTestMixin(object):
     def test_description(self):
@@ -282,6 +316,31 @@ class IntegerFieldTest(BaseFieldTestMixin, NumberTestMixin, FieldTestCase):
         field = fields.Integer()
         self.assert_field_raises(field, 'an int')
 
+    def test_many(self):
+        field = fields.Integer()
+        self.assert_many_field(field, column(0, 42, -7, 2 ** 70))
+        self.assert_many_field(field, column(66.6, -66.6, 0.0, 2.0 ** 62))
+
+    @pytest.mark.parametrize('values', [
+        column(1, 2.5),
+        column(1, None),
+        column(1, '2'),
+        column(1.5, float('nan')),
+        column(1.5, 2.0 ** 63),
+        [1, 2],
+    ])
+    def test_many_fallback(self, values):
+        self.assert_many_field(fields.Integer(), values, vectorized=False)
+
+    def test_many_overridden_format(self):
+        class Cents(fields.Integer):
+            def format(self, value):
+                return int(value * 100)
+
+        assert Cents().many_formatter() is None
+        assert fields.Integer(mask='*').many_formatter() is None
+        assert fields.Integer().many_formatter() is not None
+
 
 class BooleanFieldTest(BaseFieldTestMixin, FieldTestCase):
     field_class = fields.Boolean
@@ -335,6 +394,27 @@ class FloatFieldTest(BaseFieldTestMixin, NumberTestMixin, FieldTestCase):
         field = fields.Float()
         self.assert_field_raises(field, 'not a float')
 
+    @pytest.mark.parametrize('value,expected', [
+        ('-3.13', -3.13),
+        (-3.13, -3.13),
+        (3, 3.0),
+    ])
+    def test_native_value(self, value, expected):
+        self.assert_native_field(fields.Float(), value, expected)
+
+    def test_many(self):
+        field = fields.Float()
+        self.assert_many_field(field, column(0.0, 3.1415, -1e300, float('inf'), float('nan')))
+        self.assert_many_field(field, column(0, 42, -7, 2 ** 53 + 1, -2 ** 63))
+
+    @pytest.mark.parametrize('values', [
+        column(1, 2 ** 64),
+        column(1, '2.5'),
+        column(True, 1),
+    ])
+    def test_many_fallback(self, values):
+        self.assert_many_field(fields.Float(), values, vectorized=False)
+
 
 PI_STR = ('3.141592653589793238462643383279502884197169399375105820974944592307816406286208998628034825342117'
           '06798214808651328230664709384460955058223172535940812848111745028410270193852110555964462294895493'
@@ -378,6 +458,53 @@ class FixedFieldTest(BaseFieldTestMixin, NumberTestMixin, FieldTestCase):
         field = fields.Fixed()
         self.assert_field_raises(field, 'NaN')
 
+    @pytest.mark.parametrize('value,expected', [
+        (PI, '3.14159'),
+        (3.141592653589793, '3.14159'),
+        (0.125, '0.12500'),
+        (2.675, '2.67500'),
+        (-0.0, '-0.00000'),
+        (3, '3.00000'),
+        (-42, '-42.00000'),
+        ('03.0', '3.00000'),
+        (10 ** 21, '1000000000000000000000.00000'),
+    ])
+    def test_native_value(self, value, expected):
+        self.assert_native_field(fields.Fixed(), value, expected)
+
+    def test_native_rounding(self):
+        field = fields.Fixed(2)
+        for value in (0.125, 0.375, 2.675, 1.005, -1.005, 123456.785):
+            assert field.format_native(value) == field.format(value)
+
+    def test_native_invalid(self):
+        field = fields.Fixed()
+        with pytest.raises(fields.MarshallingError):
+            field.format_native(float('nan'))
+        with pytest.raises(fields.MarshallingError):
+            field.format_native(float('inf'))
+
+    def test_native_no_decimals(self):
+        field = fields.Fixed(0)
+        assert field.format_native(5) == field.format(5)
+        assert field.format_native(2.5) == field.format(2.5)
+
+    def test_many(self):
+        self.assert_many_field(fields.Fixed(), column(0, 42, -7, 2 ** 63 - 1))
+        self.assert_many_field(fields.Fixed(2), column(0.125, 0.375, 2.675, 1.005, -1.005, 123456.785, -0.0))
+        self.assert_many_field(fields.Fixed(6), column(1e20, -1e-7, 5e-324))
+
+    @pytest.mark.parametrize('field,values', [
+        (fields.Fixed(), column(1.0, float('nan'))),
+        (fields.Fixed(), column(1.0, -float('inf'))),
+        (fields.Fixed(), column(1.0, 1e21)),
+        (fields.Fixed(), column(1, 1.0)),
+        (fields.Fixed(7), column(1.0, 2.0)),
+        (fields.Fixed(0), column(1, 2)),
+    ])
+    def test_many_fallback(self, field, values):
+        self.assert_many_field(field, values, vectorized=False)
+
 
 class ArbitraryFieldTest(BaseFieldTestMixin, NumberTestMixin, FieldTestCase):
     field_class = fields.Arbitrary
@@ -398,6 +525,10 @@ class ArbitraryFieldTest(BaseFieldTestMixin, NumberTestMixin, FieldTestCase):
     def test_value(self, value, expected):
         self.assert_field(fields.Arbitrary(), value, expected)
 
+    def test_many(self):
+        self.assert_many_field(fields.Arbitrary(), column(0, 42, -7, 2 ** 63 - 1))
+        self.assert_many_field(fields.Arbitrary(), column(PI, 1.5), vectorized=False)
+
 
 class DatetimeFieldTest(BaseFieldTestMixin, FieldTestCase):
     field_class = fields.DateTime
@@ -503,6 +634,60 @@ class DatetimeFieldTest(BaseFieldTestMixin, FieldTestCase):
     def test_iso8601_value(self, value, expected):
         self.assert_field(fields.DateTime(dt_format='iso8601'), value, expected)
 
+    @pytest.mark.parametrize('value,expected', [
+        (date(2011, 1, 1), '2011-01-01T00:00:00'),
+        ('2011-01-01T23:59:59', '2011-01-01T23:59:59'),
+        (datetime(2011, 1, 1, 23, 59, 59), '2011-01-01T23:59:59'),
+        (datetime(2011, 1, 1, 23, 59, 59, 1000), '2011-01-01T23:59:59.001000'),
+        (datetime(2011, 1, 1, 23, 59, 59, tzinfo=timezone.utc), '2011-01-01T23:59:59+00:00'),
+        (datetime(2011, 1, 1, 23, 59, 59, tzinfo=cet), '2011-01-01T23:59:59+01:00'),
+        (datetime(2011, 1, 1, tzinfo=timezone(timedelta(seconds=3725))), '2011-01-01T00:00:00+01:02:05'),
+    ])
+    def test_iso8601_native_value(self, value, expected):
+        self.assert_native_field(fields.DateTime(dt_format='iso8601'), value, expected)
+
+    @pytest.mark.parametrize('value,passthrough', [
+        (datetime(2011, 1, 1, 23, 59, 59), False),
+        (datetime(2011, 1, 1, 23, 59, 59, 1000), False),
+        (datetime(2011, 1, 1, 23, 59, 59, tzinfo=timezone.utc), False),
+        (datetime(2011, 1, 1, 23, 59, 59, tzinfo=cet), True),
+        (datetime(2011, 1, 1, tzinfo=timezone(timedelta(hours=-5, minutes=-30))), True),
+        (datetime(2011, 1, 1, tzinfo=timezone(timedelta(seconds=3725))), False),
+    ])
+    def test_iso8601_native_format(self, value, passthrough):
+        field = fields.DateTime()
+        formatted = field.format_native(value)
+        if passthrough:
+            assert formatted is value
+        else:
+            assert formatted == field.format(value)
+
+    def test_native_raw_datetime(self):
+        if not has_orjson:
+            pytest.skip('Native types require orjson')
+        value = datetime(2020, 1, 1, 12)
+        model = {'raw': fields.Raw, 'at': fields.DateTime, 'wild': fields.Wildcard(fields.Raw)}
+        data = {'raw': value, 'at': value, 'wild': {'nested': value}}
+        request = SimpleNamespace(app=SimpleNamespace(debug=False, config={}))
+        native = encode(request, get_marshaller(model, native=True)(data), native=True)
+        assert json.loads(native) == json.loads(encode(request, get_marshaller(model)(data)))
+        assert json.loads(native) == {
+            'raw': '2020-01-01T12:00:00Z',
+            'at': '2020-01-01T12:00:00',
+            'wild': {'nested': '2020-01-01T12:00:00Z'},
+        }
+
+    def test_rfc822_native_value(self):
+        field = fields.DateTime(dt_format='rfc822')
+        self.assert_native_field(field, datetime(2011, 1, 1), 'Sat, 01 Jan 2011 00:00:00 -0000')
+
+    def test_native_with_format_override(self):
+        class Custom(fields.DateTime):
+            def format(self, value):
+                return 'custom'
+
+        self.assert_native_field(Custom(), datetime(2011, 1, 1), 'custom')
+
     def test_unsupported_format(self):
         field = fields.DateTime(dt_format='raw')
         self.assert_field_raises(field, datetime.now())
@@ -595,6 +780,14 @@ class DateFieldTest(BaseFieldTestMixin, FieldTestCase):
     def test_value(self, value, expected):
         self.assert_field(fields.Date(), value, expected)
 
+    @pytest.mark.parametrize('value,expected', [
+        (date(2011, 1, 1), '2011-01-01'),
+        ('2011-01-01', '2011-01-01'),
+        (datetime(2011, 1, 1, 23, 59, 59), '2011-01-01'),
+    ])
+    def test_native_value(self, value, expected):
+        self.assert_native_field(fields.Date(), value, expected)
+
     def test_unsupported_value_format(self):
         self.assert_field_raises(fields.Date(), 'xxx')
 
@@ -902,6 +1095,27 @@ class ListFieldTest(BaseFieldTestMixin, FieldTestCase):
         data = [1, 2, 'a']
         self.assert_field(field, data, data)
 
+    def test_primitive_elements(self):
+        assert fields.List(fields.String).is_primitive
+        assert not fields.List(fields.String(attribute='value')).is_primitive
+        assert not fields.List(fields.Nested({'a': fields.Raw})).is_primitive
+        self.assert_field(fields.List(fields.Integer), ['1', 2, 3.0, None], [1, 2, 3, None])
+        self.assert_field(fields.List(fields.String(default='x')), ['a', None, 1], ['a', 'x', '1'])
+        self.assert_field(fields.List(fields.Boolean), (1, 0, 'true'), [True, False, True])
+        self.assert_field(fields.List(fields.Float), list(range(VECTORIZE_MIN_ROWS)),
+                          [float(i) for i in range(VECTORIZE_MIN_ROWS)])
+
+    def test_raw_elements_are_copied(self):
+        value = [1, {'a': 1}, None]
+        output = fields.List(fields.Raw).output('foo', {'foo': value})
+        assert output == value
+        assert output is not value
+
+    def test_primitive_elements_error(self):
+        with pytest.raises(fields.MarshallingError) as excinfo:
+            fields.List(fields.Integer).output('foo', {'foo': [1, 'x']})
+        assert 'Unable to marshal field "1" value "x"' in str(excinfo.value)
+
 
 class WildcardFieldTest(BaseFieldTestMixin, FieldTestCase):
     field_class = partial(fields.Wildcard, fields.String)
@@ -1037,6 +1251,57 @@ class WildcardFieldTest(BaseFieldTestMixin, FieldTestCase):
         assert expected1 == result1
         assert result2 == result1
 
+    def test_interleaved_expansions(self):
+        field = fields.Wildcard(fields.Integer)
+        first = field.compile('*')({'a': 1, 'b': 2})
+        second = field.compile('*')({'c': 3, 'd': 4}, exclude={'d'})
+        assert next(first) == ('a', 1)
+        assert next(second) == ('c', 3)
+        assert list(first) == [('b', 2)]
+        assert list(second) == []
+
+    def test_object_attributes(self):
+        class Base(object):
+            klass = 'k'
+
+            @property
+            def prop(self):
+                return 'p'
+
+            def method(self):
+                pass
+
+        obj = Base()
+        obj.attr = 'a'
+        obj.callback = lambda: None
+        field = fields.Wildcard(fields.String)
+        assert list(field.compile('*')(obj)) == [('attr', 'a'), ('klass', 'k'), ('prop', 'p')]
+
+    def test_concurrent_marshalling(self):
+        model = Model('Concurrent', OrderedDict([
+            ('id', fields.Integer),
+            ('*', fields.Wildcard(fields.String)),
+        ]))
+
+        async def rows(task):
+            for i in range(20):
+                await asyncio.sleep(0)
+                yield {'id': i, 'task': task, 'value{0}'.format(task): i}
+
+        async def run(task):
+            stream = MarshalledStream(rows(task), get_marshaller(model), flush_size=1)
+            return await stream.collect()
+
+        async def main():
+            return await asyncio.gather(*(run(task) for task in range(50)))
+
+        results = asyncio.run(main())
+        for task, result in enumerate(results):
+            assert result == [
+                {'id': i, 'task': str(task), 'value{0}'.format(task): str(i)}
+                for i in range(20)
+            ]
+
 
 class ClassNameFieldTest(StringTestMixin, BaseFieldTestMixin, FieldTestCase):
     field_class = fields.ClassName
@@ -1078,6 +1343,39 @@ class ClassNameFieldTest(StringTestMixin, BaseFieldTestMixin, FieldTestCase):
         assert data == {'name': 'object'}
 
 
+class RawJSONFieldTest(BaseFieldTestMixin, FieldTestCase):
+    field_class = fields.RawJSON
+
+    @pytest.mark.parametrize('value', [b'{"a": [1, 2]}', bytearray(b'{"a": [1, 2]}'),
+                                       memoryview(b'{"a": [1, 2]}'), '{"a": [1, 2]}'])
+    def test_fragment(self, value):
+        output = fields.RawJSON().output('foo', {'foo': value})
+        assert isinstance(output, JSONFragment)
+        assert output.decode() == {'a': [1, 2]}
+
+    def test_decoded_value(self):
+        self.assert_field(fields.RawJSON(), {'a': 1}, {'a': 1})
+
+    @pytest.mark.parametrize('settings,debug,native', [
+        ({}, False, False),
+        ({}, True, False),
+        ({'indent': 2, 'sort_keys': True}, True, False),
+        ({}, False, True),
+    ])
+    def test_encode(self, settings, debug, native):
+        if native and not has_orjson:
+            pytest.skip('Native types require orjson')
+        marshalled = marshal({'id': 1, 'doc': b'{"a": [1, "]"]}', 'other': memoryview(b'"x"')},
+                             {'id': fields.Integer, 'doc': fields.RawJSON, 'other': fields.RawJSON})
+        encoded = encode_with(settings, [marshalled, {'text': 'plain'}], debug, native)
+        assert b'{"a": [1, "]"]}' in (encoded if isinstance(encoded, bytes) else encoded.encode('utf-8'))
+        assert json.loads(encoded) == [{'id': 1, 'doc': {'a': [1, ']']}, 'other': 'x'}, {'text': 'plain'}]
+
+    def test_dumps_fragments_default(self):
+        data = {'doc': JSONFragment('[1]'), 'date': date(2020, 1, 2)}
+        assert dumps_fragments(data, default=str, sort_keys=True) == '{"date": "2020-01-02", "doc": [1]}'
+
+
 class PolymorphTest(FieldTestCase):
     def test_polymorph_field(self, api):
         parent = api.model('Person', {
@@ -1321,6 +1619,158 @@ class PolymorphTest(FieldTestCase):
             'extra2': 'extra2'
         }}
 
+    def polymorph_models(self):
+        parent = Model('Person', {
+            'name': fields.String,
+        })
+        child1 = Model.inherit('Child1', parent, {
+            'extra1': fields.String,
+        })
+        child2 = Model.inherit('Child2', parent, {
+            'extra2': fields.String,
+        })
+        return parent, child1, child2
+
+    def test_polymorph_dispatch_by_mro(self):
+        parent, child1, child2 = self.polymorph_models()
+
+        class Child1(object):
+            name = 'child1'
+            extra1 = 'extra1'
+
+        class GrandChild1(Child1):
+            name = 'grandchild1'
+
+        class Child2(object):
+            name = 'child2'
+            extra2 = 'extra2'
+
+        field = fields.Polymorph({Child1: child1, Child2: child2})
+
+        assert field.output('owner', {'owner': GrandChild1()}) == {'name': 'grandchild1', 'extra1': 'extra1'}
+        assert field.output('owner', {'owner': Child2()}) == {'name': 'child2', 'extra2': 'extra2'}
+
+    def test_polymorph_dispatch_is_cached_by_class(self):
+        parent, child1, child2 = self.polymorph_models()
+
+        class Child1(object):
+            name = 'child1'
+            extra1 = 'extra1'
+
+        class Child2(object):
+            name = 'child2'
+            extra2 = 'extra2'
+
+        field = fields.Polymorph({Child1: child1, Child2: child2})
+        calls = []
+        resolve_class = field.resolve_class
+
+        def spy(cls):
+            calls.append(cls)
+            return resolve_class(cls)
+
+        field.resolve_class = spy
+        for _ in range(3):
+            field.output('owner', {'owner': Child1()})
+            field.output('owner', {'owner': Child2()})
+
+        assert calls == [Child1, Child2]
+        assert field._marshaller_for(Child1(), False) is get_marshaller(child1)
+
+    def test_polymorph_dispatch_invalidated_on_mutation(self):
+        parent, child1, child2 = self.polymorph_models()
+
+        class Child1(object):
+            name = 'child1'
+            extra1 = 'extra1'
+            extra3 = 'extra3'
+
+        thing = Model('Thing', {'owner': fields.Polymorph({Child1: child1, 'child2': child2})})
+        field = fields.Polymorph({Child1: child1, 'child2': child2})
+        assert field.output('owner', {'owner': Child1()}) == {'name': 'child1', 'extra1': 'extra1'}
+        assert marshal({'owner': Child1()}, thing) == {'owner': {'name': 'child1', 'extra1': 'extra1'}}
+
+        child1['extra3'] = fields.String
+        expected = {'name': 'child1', 'extra1': 'extra1', 'extra3': 'extra3'}
+        assert field.output('owner', {'owner': Child1()}) == expected
+        assert marshal({'owner': Child1()}, thing) == {'owner': expected}
+
+    def test_polymorph_unknown_class_is_not_cached(self):
+        parent, child1, child2 = self.polymorph_models()
+
+        class Child1(object):
+            pass
+
+        field = fields.Polymorph({Child1: child1, dict: child2})
+
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                field.output('owner', {'owner': object()})
+
+    def test_polymorph_dispatch_ambiguous_class(self):
+        parent = Model('Parent', {'name': fields.String})
+        child = Model.inherit('Child', parent, {'extra': fields.String})
+
+        class Parent(object):
+            name = 'parent'
+
+        class Child(Parent):
+            extra = 'extra'
+
+        field = fields.Polymorph({Parent: parent, Child: child})
+
+        assert field.output('owner', {'owner': Parent()}) == {'name': 'parent'}
+        with pytest.raises(ValueError):
+            field.output('owner', {'owner': Child()})
+
+    def test_polymorph_discriminator_key(self):
+        parent, child1, child2 = self.polymorph_models()
+
+        field = fields.Polymorph({'first': child1, 'second': child2}, discriminator_key='kind')
+
+        data = {'owner': {'kind': 'first', 'name': 'one', 'extra1': 'extra', 'extra2': 'other'}}
+        assert field.output('owner', data) == {'name': 'one', 'extra1': 'extra'}
+        data = {'owner': {'kind': 'second', 'name': 'two', 'extra1': 'other', 'extra2': 'extra'}}
+        assert field.output('owner', data) == {'name': 'two', 'extra2': 'extra'}
+
+    def test_polymorph_discriminator_key_model_name(self):
+        parent, child1, child2 = self.polymorph_models()
+
+        class Child2(object):
+            name = 'child2'
+            extra2 = 'extra2'
+
+        field = fields.Polymorph({'first': child1, Child2: child2}, discriminator_key='kind')
+
+        data = {'owner': {'kind': 'Child2', 'name': 'two', 'extra2': 'extra'}}
+        assert field.output('owner', data) == {'name': 'two', 'extra2': 'extra'}
+        # Instances are still dispatched by class
+        assert field.output('owner', {'owner': Child2()}) == {'name': 'child2', 'extra2': 'extra2'}
+
+    def test_polymorph_discriminator_key_unknown_value(self):
+        parent, child1, child2 = self.polymorph_models()
+
+        field = fields.Polymorph({'first': child1, 'second': child2}, discriminator_key='kind')
+
+        with pytest.raises(ValueError):
+            field.output('owner', {'owner': {'kind': 'unknown'}})
+        with pytest.raises(ValueError):
+            field.output('owner', {'owner': {'name': 'missing'}})
+        with pytest.raises(ValueError):
+            field.output('owner', {'owner': {'kind': ['unhashable']}})
+
+    def test_polymorph_with_mask(self):
+        parent, child1, child2 = self.polymorph_models()
+
+        class Child1(object):
+            name = 'child1'
+            extra1 = 'extra1'
+
+        field = fields.Polymorph({Child1: child1, 'second': child2}, mask='name')
+
+        assert field.output('owner', {'owner': Child1()}) == {'name': 'child1'}
+        assert field.clone('extra1').output('owner', {'owner': Child1()}) == {'extra1': 'extra1'}
+
 
 class CustomFieldTest(FieldTestCase):
     def test_custom_field(self):
@@ -1351,6 +1801,58 @@ class FieldsHelpersTest(object):
         expected = {'foo': 42}
         assert fields.to_marshallable_type(Foo()) == expected
 
+    def test_to_dict_namedtuple(self):
+        Foo = namedtuple('Foo', 'foo bar')
+        assert fields.to_marshallable_type(Foo(42, 'bar')) == {'foo': 42, 'bar': 'bar'}
+
+    def test_to_dict_dataclass(self):
+        @dataclass
+        class Foo(object):
+            foo: int
+            bar: str = 'bar'
+
+        assert fields.to_marshallable_type(Foo(42)) == {'foo': 42, 'bar': 'bar'}
+
+    def test_to_dict_slots(self):
+        class Foo(object):
+            __slots__ = ('foo', '__bar', 'unset')
+
+            def __init__(self):
+                self.foo = 42
+                self.__bar = 'bar'
+
+        assert fields.to_marshallable_type(Foo()) == {'foo': 42, '_Foo__bar': 'bar'}
+
+    def test_record_fields(self):
+        @dataclass
+        class Dataclass(object):
+            foo: int
+
+        class Slots(object):
+            __slots__ = 'foo'
+
+        class SlotsWithDict(Slots):
+            pass
+
+        assert fields.record_fields(namedtuple('Foo', 'foo bar')) == ('foo', 'bar')
+        assert fields.record_fields(Dataclass) == ('foo', )
+        assert fields.record_fields(Slots) == ('foo', )
+        assert fields.record_fields(SlotsWithDict) is None
+        assert fields.record_fields(dict) is None
+        assert fields.record_fields(object) is None
+
+    def test_record_fields_attrs(self):
+        attr = pytest.importorskip('attr')
+
+        @attr.s
+        class Foo(object):
+            foo = attr.ib()
+            bar = attr.ib(init=False, default='bar')
+
+        assert fields.record_fields(Foo) == ('foo', 'bar')
+        assert set(fields.record_getters(Foo)) == set(['foo'])
+        assert fields.to_marshallable_type(Foo(42)) == {'foo': 42, 'bar': 'bar'}
+
     def test_get_value(self):
         assert fields.get_value('foo', {'foo': 42}) == 42
 
@@ -1374,3 +1876,28 @@ class FieldsHelpersTest(object):
 
         obj = Test('hi')
         assert fields.get_value('value', obj) == 'hi'
+
+    def test_get_value_dotted_path_with_index(self):
+        data = {'foo': [{'bar': 1}, {'bar': 2}]}
+        assert fields.get_value('foo.1.bar', data) == 2
+        assert fields.get_value('foo.3.bar', data) is None
+
+    def test_accessor_getters(self, mocker):
+        accessor = fields.Accessor('foo.bar', default='default')
+        assert accessor.path == ('foo', 'bar')
+        obj = mocker.Mock(foo=mocker.Mock(bar=42))
+        for get in (accessor.get, accessor.from_object):
+            assert get(obj) == 42
+        for get in (accessor.get, accessor.from_dict):
+            assert get({'foo': {'bar': 42}}) == 42
+            assert get({'foo': {}}) == 'default'
+            assert get({}) == 'default'
+
+    def test_accessor_callable(self):
+        accessor = fields.Accessor(lambda obj: obj['foo'] * 2)
+        assert accessor.path is None
+        assert accessor.get({'foo': 21}) == accessor.from_dict({'foo': 21}) == 42
+
+    def test_make_accessor_is_cached(self):
+        assert fields.make_accessor('foo.bar') is fields.make_accessor('foo.bar')
+        assert fields.make_accessor('foo') is not fields.make_accessor('foo', 'default')
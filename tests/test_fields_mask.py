@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import copy
 import json
 import pytest
 
@@ -125,6 +126,60 @@ class MaskWrappedTest(MaskMixin):
         return Mask('{' + value + '}')
 
 
+class CachedMaskTest(MaskMixin):
+    def parse(self, value):
+        return mask.parse(value)
+
+
+class FrozenMaskTest(object):
+    def test_parse_is_cached(self):
+        mask.parse.cache_clear()
+        parsed = mask.parse('foo,bar{baz}', True)
+        assert mask.parse('foo,bar{baz}', True) is parsed
+        assert mask.parse('foo,bar{baz}') is not parsed
+        assert mask.parse.cache_info().hits == 1
+        assert parsed.skip
+
+    def test_frozen_mask_is_immutable(self):
+        parsed = mask.parse('foo,bar{baz}')
+        assert parsed.frozen
+        assert parsed['bar'].frozen
+        for mutate in (
+            lambda: parsed.__setitem__('other', True),
+            lambda: parsed.__delitem__('foo'),
+            lambda: parsed['bar'].update({'other': True}),
+            lambda: parsed.pop('foo'),
+            lambda: parsed.clear(),
+            lambda: setattr(parsed, 'skip', True),
+        ):
+            with pytest.raises(mask.MaskError):
+                mutate()
+        assert parsed == {'foo': True, 'bar': {'baz': True}}
+
+    def test_copy(self):
+        parsed = mask.parse('foo,bar{baz}')
+        assert copy.deepcopy(parsed) is parsed
+        unfrozen = Mask(parsed)
+        unfrozen['other'] = True
+        assert 'other' not in parsed
+
+    def test_deepcopy_unfrozen(self):
+        original = Mask('foo,bar{baz}')
+        copied = copy.deepcopy(original)
+        assert copied == original
+        assert copied['bar'] is not original['bar']
+        copied['bar']['other'] = True
+        original['bar']['baz'] = False
+        assert original['bar'] == {'baz': False}
+        assert copied['bar'] == {'baz': True, 'other': True}
+        assert copy.deepcopy(Mask({'frozen': mask.parse('a')}))['frozen'].frozen
+
+    def test_apply_on_data(self):
+        data = {'foo': 1, 'bar': {'baz': 2, 'qux': 3}, 'other': 4}
+        assert mask.apply(data, 'foo,bar{baz}') == {'foo': 1, 'bar': {'baz': 2}}
+        assert mask.apply(data, 'foo,bar{baz}') == {'foo': 1, 'bar': {'baz': 2}}
+
+
 class DObject(object):
     '''A dead simple object built from a dictionnary (no recursion)'''
     def __init__(self, data):
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import asyncio
+import copy
+import pickle
+
+import pytest
+
+from sanic_restplus import fields, marshal, marshal_async, marshal_with, Model
+from sanic_restplus.fields import MarshallingError
+from sanic_restplus.loaders import BatchLoader, LoaderContext, has_loaders, loader_context
+
+
+class Store(object):
+    '''Batch loaders recording their calls'''
+    def __init__(self):
+        self.calls = []
+
+    async def users(self, ids):
+        self.calls.append(('users', ids))
+        await asyncio.sleep(0)
+        return {i: {'id': i, 'name': 'user{0}'.format(i), 'team_id': i % 2} for i in ids if i < 10}
+
+    def teams(self, ids):
+        self.calls.append(('teams', ids))
+        return [{'id': i, 'name': 'team{0}'.format(i)} for i in ids]
+
+    def tags(self, ids):
+        self.calls.append(('tags', ids))
+        return [['tag{0}'.format(i)] for i in ids]
+
+
+def make_models(store):
+    team = Model('Team', {'id': fields.Integer, 'name': fields.String})
+    user = Model('User', {
+        'id': fields.Integer,
+        'name': fields.String,
+        'team': fields.Nested(team, attribute='team_id', loader=store.teams),
+    })
+    return Model('Post', {
+        'id': fields.Integer,
+        'author': fields.Nested(user, attribute='author_id', loader=store.users, allow_null=True),
+        'reviewers': fields.List(fields.Nested(user, loader=store.users), attribute='reviewer_ids'),
+        'tags': fields.List(fields.String, attribute='id', loader=store.tags),
+    })
+
+
+def make_posts(count):
+    return [{'id': i, 'author_id': i % 3, 'reviewer_ids': [3, 4]} for i in range(count)]
+
+
+class BatchLoaderTest(object):
+    def test_mapping_and_list(self):
+        store = Store()
+        assert asyncio.run(BatchLoader(store.users)([1, 42])) == [
+            {'id': 1, 'name': 'user1', 'team_id': 1}, None
+        ]
+        assert asyncio.run(BatchLoader(store.teams)([0])) == [{'id': 0, 'name': 'team0'}]
+
+    def test_length_mismatch(self):
+        with pytest.raises(ValueError):
+            asyncio.run(BatchLoader(lambda keys: [])([1]))
+
+    def test_shared_by_copies(self):
+        store = Store()
+        field = fields.Nested({'id': fields.Integer}, loader=store.users)
+        assert copy.deepcopy(field).loader is field.loader
+        assert field.clone().loader is field.loader
+        assert pickle.loads(pickle.dumps(fields.Raw(loader=len))).loader.fn is len
+
+
+class LoaderContextTest(object):
+    def test_dedupe_and_memoize(self):
+        store = Store()
+        loader = BatchLoader(store.teams)
+        context = LoaderContext()
+
+        async def load():
+            first = await context.load_many(loader, [1, None, 1, 2])
+            second = await context.load_many(loader, [2, 3])
+            return first, second
+
+        first, second = asyncio.run(load())
+        assert first == [{'id': 1, 'name': 'team1'}, None, {'id': 1, 'name': 'team1'}, {'id': 2, 'name': 'team2'}]
+        assert second[1] == {'id': 3, 'name': 'team3'}
+        assert store.calls == [('teams', [1, 2]), ('teams', [3])]
+
+    def test_concurrent_loads(self):
+        store = Store()
+        loader = BatchLoader(store.users)
+        context = LoaderContext()
+
+        async def load():
+            return await asyncio.gather(context.load_many(loader, [1, 2]), context.load_many(loader, [2, 3]))
+
+        first, second = asyncio.run(load())
+        assert first[1] is second[0]
+        assert store.calls == [('users', [1, 2]), ('users', [3])]
+
+    def test_failure(self):
+        async def fail(keys):
+            raise RuntimeError('unavailable')
+
+        loader = BatchLoader(fail)
+        context = LoaderContext()
+
+        async def load():
+            return await asyncio.gather(context.load_many(loader, [1]), context.load_many(loader, [1]),
+                                        return_exceptions=True)
+
+        assert [type(e) for e in asyncio.run(load())] == [RuntimeError, RuntimeError]
+        assert context.values[fail] == {}
+
+
+class MarshalAsyncTest(object):
+    def test_batched_by_level(self):
+        store = Store()
+        post = make_models(store)
+        result = asyncio.run(marshal_async(make_posts(6), post))
+        assert result[4] == {
+            'id': 4,
+            'author': {'id': 1, 'name': 'user1', 'team': {'id': 1, 'name': 'team1'}},
+            'reviewers': [
+                {'id': 3, 'name': 'user3', 'team': {'id': 1, 'name': 'team1'}},
+                {'id': 4, 'name': 'user4', 'team': {'id': 0, 'name': 'team0'}},
+            ],
+            'tags': ['tag4'],
+        }
+        assert sorted(store.calls) == [
+            ('tags', [0, 1, 2, 3, 4, 5]),
+            ('teams', [0, 1]),
+            ('users', [0, 1, 2]),
+            ('users', [3, 4]),
+        ]
+
+    def test_masked_fields_are_not_loaded(self):
+        store = Store()
+        post = make_models(store)
+        result = asyncio.run(marshal_async(make_posts(2), post, mask='id,author{name}'))
+        assert result == [{'id': 0, 'author': {'name': 'user0'}}, {'id': 1, 'author': {'name': 'user1'}}]
+        assert store.calls == [('users', [0, 1])]
+
+    def test_missing_values(self):
+        store = Store()
+        post = make_models(store)
+        result = asyncio.run(marshal_async({'id': 1, 'author_id': 42, 'reviewer_ids': None}, post))
+        assert result['author'] is None
+        assert result['reviewers'] is None
+
+    def test_without_loaders(self):
+        model = {'id': fields.Integer}
+        assert not has_loaders(model)
+        assert asyncio.run(marshal_async([{'id': 1}], model)) == [{'id': 1}]
+
+    def test_not_loaded(self):
+        post = make_models(Store())
+        with pytest.raises(MarshallingError):
+            marshal(make_posts(1), post)
+
+
+class MarshalWithLoadersTest(object):
+    def test_request_memo(self, make_request):
+        store = Store()
+        post = make_models(store)
+
+        @marshal_with(post, envelope='data', encode=True)
+        def get(request):
+            return make_posts(3)
+
+        request = make_request()
+        encoded = asyncio.run(get(request))
+        assert encoded.decode()['data'][2]['author']['name'] == 'user2'
+        calls = len(store.calls)
+        asyncio.run(get(request))
+        assert len(store.calls) == calls
+        assert loader_context(request).values[store.users][0]['name'] == 'user0'
+
+    def test_stream(self, make_request):
+        store = Store()
+        post = make_models(store)
+
+        @marshal_with(post, flush_size=2)
+        async def get(request):
+            for item in make_posts(5):
+                yield item
+
+        async def collect():
+            stream = await get(make_request())
+            return await stream.collect()
+
+        result = asyncio.run(collect())
+        assert [item['author']['name'] for item in result] == ['user0', 'user1', 'user2', 'user0', 'user1']
+        assert [keys for name, keys in store.calls if name == 'tags'] == [[0, 1], [2, 3], [4]]
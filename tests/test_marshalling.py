@@ -1,13 +1,24 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import asyncio
+
 import pytest
 
 from sanic_restplus import (
     marshal, marshal_with, marshal_with_field, fields, Api, Resource
 )
 
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
+from dataclasses import dataclass, field as dataclass_field
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from sanic.response import HTTPResponse
+
+from sanic_restplus.compiler import get_marshaller
+from sanic_restplus.marshalling import MarshalledStream, requested_fields
+from sanic_restplus.representations import EncodedJSON, JSONFragment, can_encode_native
 
 
 # Add a dummy Resource to verify that the app is properly set.
@@ -427,3 +438,309 @@ class MarshallingTest(object):
         resp = await client.get('/api')
         assert resp.status_code == 200
         assert resp.data.decode('utf-8') == '{"foo": 3.0}\n'
+
+
+Person = namedtuple('Person', 'name age')
+
+
+@dataclass
+class PersonData(object):
+    name: str
+    age: int
+    city: str = dataclass_field(init=False, default='Paris')
+
+    @property
+    def upper(self):
+        return self.name.upper()
+
+
+class PersonSlots(object):
+    __slots__ = ('name', 'age')
+
+    def __init__(self, name, age):
+        self.name = name
+        self.age = age
+
+
+class RecordMarshallingTest(object):
+    model = {'name': fields.String, 'age': fields.Integer}
+
+    def test_namedtuple(self):
+        assert marshal(Person('John', '42'), self.model) == {'name': 'John', 'age': 42}
+
+    def test_namedtuple_list(self):
+        data = [Person('John', '42'), Person('Jane', 41)]
+        expected = [{'name': 'John', 'age': 42}, {'name': 'Jane', 'age': 41}]
+        assert marshal(data, self.model) == expected
+        assert marshal(tuple(data), self.model) == expected
+
+    def test_namedtuple_index(self):
+        assert marshal(Person('John', 42), {'first': fields.String(attribute='0')}) == {'first': 'John'}
+
+    def test_nested_namedtuple(self):
+        model = {'owner': fields.Nested(self.model), 'people': fields.List(fields.Nested(self.model))}
+        data = {'owner': Person('John', 42), 'people': [Person('Jane', 41)]}
+        assert marshal(data, model) == {
+            'owner': {'name': 'John', 'age': 42},
+            'people': [{'name': 'Jane', 'age': 41}],
+        }
+
+    def test_dataclass(self):
+        model = dict(self.model, city=fields.String, upper=fields.String, missing=fields.String)
+        expected = {'name': 'John', 'age': 42, 'city': 'Paris', 'upper': 'JOHN', 'missing': None}
+        assert marshal(PersonData('John', 42), model) == expected
+        assert marshal([PersonData('John', 42)], model) == [expected]
+
+    def test_dotted_paths(self):
+        Team = namedtuple('Team', 'leader')
+        model = {
+            'leader': fields.String(attribute='leader.name'),
+            'age': fields.Integer(attribute='leader.age'),
+        }
+        expected = {'leader': 'John', 'age': 42}
+        assert marshal(Team(PersonData('John', 42)), model) == expected
+        assert marshal([Team(Person('John', 42))], model) == [expected]
+
+    def test_attrs(self):
+        attr = pytest.importorskip('attr')
+
+        @attr.s(slots=True)
+        class Foo(object):
+            name = attr.ib()
+            age = attr.ib()
+
+        assert marshal([Foo('John', '42')], self.model) == [{'name': 'John', 'age': 42}]
+
+    def test_slots(self):
+        person = PersonSlots('John', 42)
+        del person.age
+        assert marshal([PersonSlots('Jane', 41), person], self.model) == [
+            {'name': 'Jane', 'age': 41},
+            {'name': 'John', 'age': None},
+        ]
+
+    def test_mixed_records(self):
+        data = [Person('John', 42), PersonData('Jane', 41), {'name': 'Jim', 'age': 40}]
+        assert marshal(data, self.model) == [
+            {'name': 'John', 'age': 42},
+            {'name': 'Jane', 'age': 41},
+            {'name': 'Jim', 'age': 40},
+        ]
+
+    def test_marshallable(self):
+        class Foo(object):
+            def __init__(self, name):
+                self.name = name
+
+            def __marshallable__(self):
+                return {'name': self.name.upper(), 'age': 42}
+
+        assert marshal(Foo('john'), self.model) == {'name': 'JOHN', 'age': 42}
+        assert marshal([Foo('john'), Foo('jane')], self.model) == [
+            {'name': 'JOHN', 'age': 42},
+            {'name': 'JANE', 'age': 42},
+        ]
+        assert marshal(Foo('john'), dict(self.model, extra=fields.Wildcard(fields.String))) == {
+            'name': 'JOHN', 'age': 42, 'extra': None
+        }
+        assert marshal(Foo('john'), self.model, skip_none=True, ordered=True) == OrderedDict([
+            ('name', 'JOHN'), ('age', 42)
+        ])
+
+    def test_plan_cached_by_class(self):
+        marshaller = get_marshaller(self.model)
+        marshaller([Person('John', 42), Person('Jane', 41)])
+        marshaller(Person('Jim', 40))
+        assert list(marshaller._class_plans) == [Person]
+
+
+class RequestedFieldsTest(object):
+    model = {'id': fields.Integer, 'name': fields.String, 'owner': fields.Nested({'name': fields.String})}
+
+    def request(self, app, **headers):
+        return SimpleNamespace(app=app, headers=headers, ctx=SimpleNamespace())
+
+    def test_requested_fields(self, app):
+        request = self.request(app, **{'X-Fields': 'id,owner{name}'})
+        seen = []
+
+        @marshal_with(self.model)
+        async def get(request):
+            seen.append(requested_fields(request))
+            return {'id': 1, 'name': 'John', 'owner': {'name': 'Jane'}}
+
+        assert asyncio.run(get(request)) == {'id': 1, 'owner': {'name': 'Jane'}}
+        assert seen == [{'id', 'owner', 'owner.name'}]
+
+    def test_requested_fields_without_mask(self, app):
+        request = self.request(app)
+        seen = []
+
+        @marshal_with(self.model)
+        async def get(request):
+            seen.append(requested_fields(request))
+            return {}
+
+        asyncio.run(get(request))
+        assert seen == [{'id', 'name', 'owner', 'owner.name'}]
+
+    def test_requested_fields_not_marshalled(self, app):
+        assert requested_fields(self.request(app)) is None
+
+
+class MarshalledStreamTest(object):
+    model = {'name': fields.String, 'age': fields.Integer}
+
+    def rows(self, count):
+        for i in range(count):
+            yield {'name': 'n{0}'.format(i), 'age': str(i), 'secret': 'x'}
+
+    async def test_stream_async_generator(self, app, client):
+        api = Api(app)
+        rows = self.rows
+
+        @api.route('/stream')
+        class Stream(Resource):
+            @api.marshal_list_with(self.model, flush_size=2)
+            async def get(self, request):
+                async def items():
+                    for row in rows(5):
+                        yield row
+                return items()
+
+        resp = await client.get('/stream')
+        assert resp.status_code == 200
+        assert resp.content_type == 'application/json'
+        assert resp.json == [{'name': 'n{0}'.format(i), 'age': i} for i in range(5)]
+
+    async def test_stream_generator_with_envelope_and_mask(self, app, client):
+        api = Api(app)
+        rows = self.rows
+
+        @api.route('/stream')
+        class Stream(Resource):
+            @api.marshal_list_with(self.model, envelope='data')
+            async def get(self, request):
+                return rows(3)
+
+        resp = await client.get('/stream', headers={'X-Fields': 'name'})
+        assert resp.status_code == 200
+        assert resp.json == {'data': [{'name': 'n0'}, {'name': 'n1'}, {'name': 'n2'}]}
+
+    async def test_stream_empty(self, app, client):
+        api = Api(app)
+
+        @api.route('/stream')
+        class Stream(Resource):
+            @api.marshal_list_with(self.model, envelope='data')
+            async def get(self, request):
+                return iter([])
+
+        resp = await client.get('/stream')
+        assert resp.json == {'data': []}
+
+    async def test_stream_collected_for_custom_representation(self, app, client):
+        api = Api(app)
+        rows = self.rows
+
+        @api.representation('application/json')
+        def custom(request, data, code, headers=None):
+            return HTTPResponse(str(len(data)), code, headers)
+
+        @api.route('/stream')
+        class Stream(Resource):
+            @api.marshal_list_with(self.model)
+            async def get(self, request):
+                return rows(3)
+
+        resp = await client.get('/stream')
+        assert resp.text == '3'
+
+    async def test_collect(self):
+        marshaller = marshal_with(self.model, envelope='data')
+        stream = marshaller.marshal(self.rows(3), None)
+        assert isinstance(stream, MarshalledStream)
+        assert await stream.collect() == {'data': [{'name': 'n{0}'.format(i), 'age': i} for i in range(3)]}
+
+
+class EncodedJSONTest(object):
+    model = {'name': fields.String, 'age': fields.Integer}
+
+    def test_fragment_response(self):
+        request = SimpleNamespace(app=SimpleNamespace(debug=False, config={}), headers={})
+        response = Api().make_response(request, JSONFragment(memoryview(b'{"stored": true}')), 201)
+        assert response.status == 201
+        assert response.body == b'{"stored": true}\n'
+        assert response.headers['Content-Type'] == 'application/json'
+
+    def test_encode(self, app):
+        request = SimpleNamespace(app=app)
+        encoded = EncodedJSON.encode(request, {'foo': 'bar'})
+        assert isinstance(encoded.body, bytes)
+        assert encoded.body.endswith(b'\n')
+        assert encoded.decode() == {'foo': 'bar'}
+
+    def test_marshal_with_encode(self, app):
+        request = SimpleNamespace(app=app)
+        decorator = marshal_with(self.model, envelope='data', encode=True)
+        encoded = decorator.marshal([{'name': 'John', 'age': '42'}], None, request)
+        assert isinstance(encoded, EncodedJSON)
+        assert encoded.decode() == {'data': [{'name': 'John', 'age': 42}]}
+
+    def test_should_encode(self, app):
+        request = SimpleNamespace(app=app)
+        resource = SimpleNamespace(api=SimpleNamespace(encode=True))
+        assert marshal_with(self.model).should_encode(request, resource)
+        assert not marshal_with(self.model).should_encode(request, object())
+        assert not marshal_with(self.model, encode=False).should_encode(request, resource)
+        app.debug = True
+        assert not marshal_with(self.model, encode=True).should_encode(request, resource)
+
+    def test_marshal_with_native_types(self, app):
+        if not can_encode_native(SimpleNamespace(app=app)):
+            pytest.skip('Native types require orjson')
+        request = SimpleNamespace(app=app)
+        model = {'born': fields.Date, 'seen': fields.DateTime, 'price': fields.Fixed(2)}
+        data = [{'born': date(1984, 6, 7), 'seen': datetime(2020, 1, 2, 3, 4, 5, 6), 'price': 2.675}]
+        decorator = marshal_with(model, encode=True, native_types=True)
+        encoded = decorator.marshal(data, None, request, native=True)
+        assert encoded.decode() == decorator.marshal(data, None)
+        assert encoded.decode() == [{'born': '1984-06-07', 'seen': '2020-01-02T03:04:05.000006', 'price': '2.67'}]
+
+    def test_should_use_native_types(self, app):
+        request = SimpleNamespace(app=app)
+        resource = SimpleNamespace(api=SimpleNamespace(native_types=True))
+        native = can_encode_native(request)
+        assert marshal_with(self.model).should_use_native_types(request, resource) == native
+        assert not marshal_with(self.model).should_use_native_types(request, object())
+        assert not marshal_with(self.model, native_types=False).should_use_native_types(request, resource)
+        app.debug = True
+        assert not marshal_with(self.model, native_types=True).should_use_native_types(request, resource)
+
+    def test_native_stream(self):
+        model = {'born': fields.Date}
+        decorator = marshal_with(model)
+        stream = decorator.marshal(iter([]), None, native=True)
+        # Replayable data
+        stream.data = [{'born': date(1984, 6, 7)}]
+
+        async def batches(native):
+            return [batch async for batch in stream.batches(native=native)]
+
+        assert asyncio.run(batches(True)) == [[{'born': date(1984, 6, 7)}]]
+        assert asyncio.run(batches(False)) == [[{'born': '1984-06-07'}]]
+        assert asyncio.run(stream.collect()) == [{'born': '1984-06-07'}]
+
+    async def test_encoded_response(self, app, client):
+        api = Api(app, encode=True)
+
+        @api.route('/encoded')
+        class Encoded(Resource):
+            @api.marshal_with(self.model, envelope='data')
+            async def get(self, request):
+                return {'name': 'John', 'age': '42'}, 201
+
+        resp = await client.get('/encoded')
+        assert resp.status_code == 201
+        assert resp.content_type == 'application/json'
+        assert resp.json == {'data': {'name': 'John', 'age': 42}}
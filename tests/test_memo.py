@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import asyncio
+
+import pytest
+
+from sanic_restplus import fields, marshal, marshal_with, Model
+from sanic_restplus.cache import ResultCache
+from sanic_restplus.compiler import get_marshaller
+from sanic_restplus.fields import MarshallingError
+from sanic_restplus.memo import MarshalMemo, copy_marshalled, memoizing
+
+from .helpers import FORMATTED, Counted
+
+
+customer = Model('Customer', {
+    'id': fields.Integer,
+    'name': Counted,
+})
+
+order = Model('Order', {
+    'ref': fields.String,
+    'customer': fields.Nested(customer),
+    'contacts': fields.List(fields.Nested(customer)),
+})
+
+
+def make_orders(count):
+    customers = [{'id': i, 'name': 'customer{0}'.format(i)} for i in range(3)]
+    return [
+        {'ref': str(i), 'customer': customers[i % 3], 'contacts': [customers[0], customers[1], customers[0]]}
+        for i in range(count)
+    ]
+
+
+class MemoizeTest(object):
+    def test_shared_objects_marshalled_once(self):
+        orders = make_orders(50)
+        del FORMATTED[:]
+        expected = marshal(orders, order)
+        assert len(FORMATTED) == 200
+        del FORMATTED[:]
+        result = marshal(orders, order, memoize=True)
+        assert result == expected
+        assert len(FORMATTED) == 3
+        assert result[0]['customer'] is result[3]['customer']
+        assert result[0]['contacts'][0] is result[0]['contacts'][2] is result[0]['customer']
+
+    def test_copy(self):
+        orders = make_orders(4)
+        result = marshal(orders, order, memoize='copy')
+        assert result == marshal(orders, order)
+        assert result[0]['customer'] is not result[3]['customer']
+
+    def test_distinct_masks(self):
+        orders = make_orders(2)
+        assert marshal(orders, order, mask='customer{id},contacts', memoize=True)[1] == {
+            'customer': {'id': 1},
+            'contacts': [
+                {'id': 0, 'name': 'customer0'},
+                {'id': 1, 'name': 'customer1'},
+                {'id': 0, 'name': 'customer0'},
+            ],
+        }
+
+    def test_per_call(self):
+        orders = make_orders(3)
+        first = marshal(orders, order, memoize=True)
+        second = marshal(orders, order, memoize=True)
+        assert first[0]['customer'] is not second[0]['customer']
+
+    def test_cycle(self):
+        node = Model('Node', {'name': fields.String})
+        node['parent'] = fields.Nested(node, allow_null=True)
+        first = {'name': 'first'}
+        second = {'name': 'second', 'parent': first}
+        first['parent'] = second
+        with pytest.raises(MarshallingError):
+            marshal(first, node, memoize=True)
+        # Cycles are only detected when memoizing
+        with pytest.raises(RecursionError):
+            marshal(first, node)
+        assert marshal({'name': 'child', 'parent': {'name': 'root', 'parent': None}}, node, memoize=True) == {
+            'name': 'child',
+            'parent': {'name': 'root', 'parent': None},
+        }
+
+    def test_with_results_cache(self):
+        cached = Model('CachedOrder', {
+            'customer': fields.Nested(customer, cache=ResultCache('id')),
+        })
+        orders = make_orders(6)
+        memo = MarshalMemo()
+        with memoizing(memo):
+            result = get_marshaller(cached)(orders)
+        assert result[0]['customer'] is result[3]['customer']
+        assert memo.hits == 3
+        assert len(memo) == 3
+
+
+class MarshalMemoTest(object):
+    def test_marshal_many_duplicates(self):
+        marshaller = get_marshaller(customer)
+        first, second = {'id': 1, 'name': 'first'}, {'id': 2, 'name': 'second'}
+        memo = MarshalMemo()
+        result = memo.marshal_many(marshaller, [first, second, first])
+        assert result == [{'id': 1, 'name': 'first'}, {'id': 2, 'name': 'second'}, {'id': 1, 'name': 'first'}]
+        assert result[0] is result[2]
+        assert memo.marshal(marshaller, second) is result[1]
+        assert memo.hits == 2
+
+    def test_copy_marshalled(self):
+        value = {'a': [{'b': 1}], 'c': 'd'}
+        copied = copy_marshalled(value)
+        assert copied == value
+        assert copied['a'][0] is not value['a'][0]
+
+
+class MemoizedMarshalWithTest(object):
+    def test_memoize(self, make_request):
+        @marshal_with(order, envelope='data', memoize=True)
+        def get(request):
+            return make_orders(6)
+
+        result = asyncio.run(get(make_request()))
+        assert result['data'][0]['customer'] is result['data'][3]['customer']
@@ -2,11 +2,14 @@
 from __future__ import unicode_literals
 
 import copy
+import gc
+import pickle
 import pytest
+import weakref
 
 from collections import OrderedDict
 
-from sanic_restplus import fields, Model, OrderedModel, SchemaModel
+from sanic_restplus import fields, marshal, Model, OrderedModel, SchemaModel
 
 
 class ModelTest(object):
@@ -708,3 +711,90 @@ class ModelDeprecattionsTest(object):
             },
             'type': 'object'
         }
+
+
+class ModelCacheTest(object):
+    def test_resolved_is_cached(self):
+        model = Model('Person', {'name': fields.String})
+        assert model.resolved is model.resolved
+
+    def test_resolved_invalidated_on_mutation(self):
+        model = Model('Person', {'name': fields.String})
+        resolved = model.resolved
+        model['age'] = fields.Integer
+        assert model.resolved is not resolved
+        assert set(model.resolved) == {'name', 'age'}
+
+        model.update({'email': fields.String})
+        assert set(model.resolved) == {'name', 'age', 'email'}
+
+        del model['email']
+        model.pop('age')
+        assert set(model.resolved) == {'name'}
+
+    def test_resolved_invalidated_on_parent_mutation(self):
+        parent = Model('Person', {'name': fields.String})
+        child = parent.inherit('Child', {'extra': fields.String})
+        assert set(child.resolved) == {'name', 'extra'}
+        parent['age'] = fields.Integer
+        assert set(child.resolved) == {'name', 'extra', 'age'}
+
+    def test_marshallers_invalidated_on_mutation(self):
+        model = Model('Person', {'name': fields.String})
+        assert marshal({'name': 'John', 'age': 42}, model) == {'name': 'John'}
+        model['age'] = fields.Integer
+        assert marshal({'name': 'John', 'age': 42}, model) == {'name': 'John', 'age': 42}
+
+    def test_nested_marshallers_invalidated_on_mutation(self):
+        child = Model('Child', {'a': fields.String})
+        parent = Model('Parent', {'child': fields.Nested(child), 'children': fields.List(fields.Nested(child))})
+        data = {'child': {'a': 'a', 'b': 'b'}, 'children': [{'a': 'a', 'b': 'b'}]}
+        assert marshal(data, parent) == {'child': {'a': 'a'}, 'children': [{'a': 'a'}]}
+        child['b'] = fields.String
+        assert marshal(data, parent) == {'child': {'a': 'a', 'b': 'b'}, 'children': [{'a': 'a', 'b': 'b'}]}
+
+    def test_resolved_cache_does_not_keep_models(self):
+        model = Model('Person', {'name': fields.String})
+        model.resolved
+        ref = weakref.ref(model)
+        del model
+        gc.collect()
+        assert ref() is None
+
+    def test_field_schema_cache_does_not_keep_fields(self):
+        field = fields.String()
+        assert field.__schema__ is field.__schema__
+        ref = weakref.ref(field)
+        del field
+        gc.collect()
+        assert ref() is None
+
+
+class ModelPickleTest(object):
+    def test_pickle(self):
+        parent = Model('Parent', {'name': fields.String}, mask='name')
+        child = parent.inherit('Child', {'age': fields.Integer})
+        marshal({'name': 'John', 'age': 42}, child)
+
+        copied = pickle.loads(pickle.dumps(child))
+        assert copied.name == 'Child'
+        assert copied.__parents__[0].name == 'Parent'
+        assert copied.__parents__[0].__mask__ == parent.__mask__
+        assert copied.__schema__ == child.__schema__
+        assert marshal({'name': 'John', 'age': 42}, copied) == {'name': 'John', 'age': 42}
+        assert copied.inherit('Other', {}).__parents__[0] is copied
+
+    def test_pickle_recursive(self):
+        model = Model('Node', {'name': fields.String})
+        model['children'] = fields.List(fields.Nested(model))
+        data = {'name': 'root', 'children': [{'name': 'leaf', 'children': []}]}
+        marshal(data, model)
+
+        copied = pickle.loads(pickle.dumps(model))
+        assert copied['children'].container.model is copied
+        assert marshal(data, copied) == marshal(data, model)
+
+    def test_pickle_schema_model(self):
+        model = SchemaModel('Schema', {'type': 'object'})
+        copied = pickle.loads(pickle.dumps(model))
+        assert copied.__schema__ == model.__schema__
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import asyncio
+import pickle
+
+from types import SimpleNamespace
+
+import pytest
+
+from sanic_restplus import fields, marshal, marshal_with, Model
+from sanic_restplus.compiler import get_marshaller
+from sanic_restplus.offload import describe, marshal_offloaded, should_offload, shutdown
+from sanic_restplus.representations import EncodedJSON
+
+
+person = Model('Person', {
+    'name': fields.String,
+    'age': fields.Integer,
+})
+
+
+def rows(count):
+    return [{'name': 'n{0}'.format(i), 'age': str(i)} for i in range(count)]
+
+
+@pytest.fixture
+def pool():
+    yield
+    shutdown()
+
+
+class DescribeTest(object):
+    def test_describe(self):
+        marshaller = get_marshaller(person, envelope='data', mask='name')
+        description = describe(marshaller)
+        assert describe(marshaller) is description
+        fields_, envelope, skip_none, mask, ordered, native = pickle.loads(description)
+        assert list(fields_) == ['name']
+        assert envelope == 'data'
+
+    def test_describe_nested_recursive_model(self):
+        model = Model('Node', {'name': fields.String})
+        model['children'] = fields.List(fields.Nested(model))
+        marshaller = get_marshaller(model)
+        data = {'name': 'root', 'children': [{'name': 'leaf', 'children': []}]}
+        fields_ = pickle.loads(describe(marshaller))[0]
+        assert marshal(data, fields_) == marshaller(data)
+
+    def test_describe_unpicklable(self):
+        marshaller = get_marshaller({'name': fields.String(attribute=lambda o: o['name'])})
+        assert describe(marshaller) is None
+
+
+class ShouldOffloadTest(object):
+    def test_threshold(self, make_request):
+        request = make_request(RESTPLUS_OFFLOAD_THRESHOLD=2)
+        assert should_offload(request, rows(3))
+        assert should_offload(request, tuple(rows(3)))
+        assert not should_offload(request, rows(2))
+        assert not should_offload(request, {'name': 'n', 'age': 1})
+
+    def test_default_threshold(self, make_request):
+        assert not should_offload(make_request(), rows(10))
+
+    def test_marshal_with_option(self, make_request):
+        request = make_request(RESTPLUS_OFFLOAD_THRESHOLD=2)
+        resource = SimpleNamespace(api=SimpleNamespace(offload=True))
+        assert marshal_with(person).should_offload(request, resource, rows(3))
+        assert not marshal_with(person).should_offload(request, object(), rows(3))
+        assert not marshal_with(person, offload=False).should_offload(request, resource, rows(3))
+        assert marshal_with(person, offload=True).should_offload(request, object(), rows(3))
+
+
+class MarshalOffloadedTest(object):
+    def test_marshal_offloaded(self, pool, make_request):
+        request = make_request(RESTPLUS_OFFLOAD_WORKERS=1)
+        marshaller = get_marshaller(person)
+        data = rows(50)
+        encoded = asyncio.run(marshal_offloaded(request, marshaller, data))
+        assert isinstance(encoded, EncodedJSON)
+        assert encoded.body.endswith(b'\n')
+        assert encoded.decode() == marshaller(data)
+
+    @pytest.mark.parametrize('count', [0, 1, 7, 9])
+    def test_marshal_offloaded_by_chunks(self, pool, count, make_request):
+        request = make_request(RESTPLUS_OFFLOAD_WORKERS=2, RESTPLUS_OFFLOAD_CHUNK_SIZE=3)
+        marshaller = get_marshaller(person)
+        encoded = asyncio.run(marshal_offloaded(request, marshaller, rows(count), envelope='data'))
+        assert encoded.decode() == {'data': marshaller(rows(count))}
+
+    def test_bounded_queue(self, pool, make_request):
+        request = make_request(RESTPLUS_OFFLOAD_WORKERS=1, RESTPLUS_OFFLOAD_QUEUE_SIZE=1)
+        marshaller = get_marshaller(person)
+
+        async def jobs():
+            return await asyncio.gather(*(
+                marshal_offloaded(request, marshaller, rows(i)) for i in range(1, 5)
+            ))
+
+        assert [encoded.decode() for encoded in asyncio.run(jobs())] == [
+            marshaller(rows(i)) for i in range(1, 5)
+        ]
+
+    def test_unpicklable_data(self, make_request):
+        class Row(object):
+            name = 'n'
+            age = 1
+
+        marshaller = get_marshaller(person)
+        assert asyncio.run(marshal_offloaded(make_request(), marshaller, [Row()])) is None
+
+    def test_marshal_with_fallback(self, make_request):
+        class Row(object):
+            def __init__(self, i):
+                self.name = 'n{0}'.format(i)
+                self.age = i
+
+        request = make_request()
+        decorator = marshal_with(person, envelope='data', offload=True)
+        data = [Row(i) for i in range(3)]
+        encoded = asyncio.run(decorator.marshal_offloaded(data, None, request))
+        assert encoded.decode() == marshal(data, person, envelope='data')
+
+    def test_marshal_with_offloaded(self, pool, make_request):
+        request = make_request(RESTPLUS_OFFLOAD_THRESHOLD=10, RESTPLUS_OFFLOAD_WORKERS=1)
+        resource = SimpleNamespace(api=SimpleNamespace(encode=True, offload=True))
+
+        @marshal_with(person, envelope='data')
+        async def get(resource, request):
+            return rows(20), 201
+
+        encoded, code, headers = asyncio.run(get(resource, request))
+        assert isinstance(encoded, EncodedJSON)
+        assert code == 201
+        assert encoded.decode() == marshal(rows(20), person, envelope='data')
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+import logging
+import pickle
+
+from collections import OrderedDict
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from sanic_restplus import representations
+from sanic_restplus.representations import (
+    JSON_ENGINES, CallableEngine, JSONEngine, JSONFragment, benchmark_json_engines, can_encode_native, encode,
+    get_json_engine, get_json_output, has_orjson, has_ujson, output_json_fast, output_json_pretty,
+    resolve_json_engine, setup_json_engine
+)
+
+
+def make_app(debug=False, **config):
+    return SimpleNamespace(debug=debug, config=config, ctx=SimpleNamespace())
+
+
+def dumps(data):
+    return json.dumps(data, separators=(',', ':'))
+
+
+class ResolveJSONEngineTest(object):
+    def test_default(self):
+        engine = resolve_json_engine()
+        assert engine.name == next(iter(JSON_ENGINES))
+        if has_orjson:
+            assert engine.name == 'orjson'
+            assert engine.supports_native
+
+    @pytest.mark.parametrize('name', list(JSON_ENGINES))
+    def test_by_name(self, name):
+        engine = resolve_json_engine(name)
+        assert engine.name == name
+        assert json.loads(engine(OrderedDict([('a', [1, 'b']), ('c', None)]))) == {'a': [1, 'b'], 'c': None}
+
+    def test_settings(self):
+        engine = resolve_json_engine('json', {'sort_keys': True})
+        assert engine({'b': 1, 'a': 2}) == '{"a": 2, "b": 1}'
+        assert engine({'doc': JSONFragment('[1]')}) == '{"doc": [1]}'
+
+    def test_unsupported_settings_fallback(self):
+        engine = resolve_json_engine(None, {'indent': 4, 'sort_keys': True})
+        assert engine.name != 'orjson'
+        encoded = engine({'b': 1, 'a': [2]})
+        assert encoded == json.dumps({'b': 1, 'a': [2]}, indent=4, sort_keys=True)
+
+    @pytest.mark.skipif(not has_orjson, reason='orjson is not installed')
+    @pytest.mark.parametrize('fragment', [True, False])
+    def test_orjson_settings(self, monkeypatch, fragment):
+        if not fragment:
+            monkeypatch.setattr(representations, 'Fragment', None)
+        engine = resolve_json_engine(None, {'indent': 2, 'sort_keys': True, 'ensure_ascii': False})
+        assert engine.name == 'orjson'
+        assert engine({'b': 1, 'a': 'é'}) == '{\n  "a": "é",\n  "b": 1\n}'.encode('utf-8')
+
+    @pytest.mark.skipif(not has_orjson, reason='orjson is not installed')
+    @pytest.mark.parametrize('settings', [{'indent': 4}, {'ensure_ascii': True}, {'separators': (',', ':')}])
+    def test_orjson_unsupported_settings(self, settings):
+        with pytest.raises(ValueError):
+            resolve_json_engine('orjson', settings)
+
+    @pytest.mark.skipif(not has_ujson, reason='ujson is not installed')
+    def test_ujson_unsupported_settings(self):
+        with pytest.raises(ValueError):
+            resolve_json_engine('ujson', {'cls': json.JSONEncoder})
+        assert resolve_json_engine(None, {'cls': json.JSONEncoder}).name == 'json'
+
+    def test_callable(self):
+        engine = resolve_json_engine(dumps)
+        assert isinstance(engine, CallableEngine)
+        assert engine({'a': 1}) == '{"a":1}'
+        assert not engine.supports_native
+
+    def test_instance_and_class(self):
+        engine = JSONEngine()
+        assert resolve_json_engine(engine) is engine
+        assert isinstance(resolve_json_engine(JSONEngine, {'indent': 2}), JSONEngine)
+
+    @pytest.mark.parametrize('engine', ['unknown', 42])
+    def test_invalid(self, engine):
+        with pytest.raises(ValueError):
+            resolve_json_engine(engine)
+
+    @pytest.mark.skipif(has_ujson, reason='ujson is installed')
+    def test_not_installed(self):
+        with pytest.raises(ValueError):
+            resolve_json_engine('ujson')
+
+    @pytest.mark.skipif(not has_orjson, reason='orjson is not installed')
+    def test_orjson_without_fragment(self, monkeypatch):
+        # orjson < 3.9
+        monkeypatch.setattr(representations, 'Fragment', None)
+        engine = resolve_json_engine('orjson')
+        data = {'doc': JSONFragment(b'{"a": [1, "]"]}'), 'other': JSONFragment(memoryview(b'"x"')), 'text': 'plain'}
+        encoded = engine(data)
+        assert b'{"a": [1, "]"]}' in encoded
+        assert json.loads(encoded) == {'doc': {'a': [1, ']']}, 'other': 'x', 'text': 'plain'}
+        assert engine({'at': datetime(2020, 1, 2)}, native=True) == b'{"at":"2020-01-02T00:00:00Z"}'
+
+    @pytest.mark.parametrize('engine', list(JSON_ENGINES) + [dumps])
+    def test_picklable(self, engine):
+        engine = resolve_json_engine(engine, {})
+        assert pickle.loads(pickle.dumps(engine))({'a': 1}) == engine({'a': 1})
+
+
+class GetJSONEngineTest(object):
+    def test_resolved_once(self):
+        app = make_app(RESTPLUS_JSON_ENGINE='json', RESTPLUS_JSON={'sort_keys': True})
+        engine = get_json_engine(app)
+        assert engine.name == 'json'
+        assert get_json_engine(app) is engine
+        assert app.ctx.restplus_json_engine is engine
+
+    def test_output(self, make_request):
+        request = make_request(RESTPLUS_JSON_ENGINE=dumps)
+        response = output_json_fast(request, {'a': [1, 2]}, 201)
+        assert response.body == b'{"a":[1,2]}\n'
+        assert response.status == 201
+        assert response.content_type == 'application/json'
+
+    def test_debug(self, make_request):
+        request = make_request(debug=True, RESTPLUS_JSON_ENGINE=dumps)
+        assert output_json_fast(request, {'a': 1}, 200).body == b'{\n    "a": 1\n}\n'
+        assert encode(request, {'a': 1}) == '{"a": 1}'
+
+    def test_output_resolved_once(self, make_request):
+        request = make_request(RESTPLUS_JSON_ENGINE=dumps)
+        output = get_json_output(request.app)
+        assert request.app.ctx.restplus_json_output is output
+        request.app.debug = True
+        assert get_json_output(request.app) is output
+        assert output_json_fast(request, {'a': 1}, 200).body == b'{"a":1}\n'
+
+    def test_output_debug(self):
+        assert get_json_output(make_app(debug=True)) is output_json_pretty
+
+    def test_output_settings(self, make_request):
+        request = make_request(RESTPLUS_JSON={'indent': 4, 'sort_keys': True})
+        expected = json.dumps({'b': 1, 'a': 2}, indent=4, sort_keys=True) + '\n'
+        assert output_json_fast(request, {'b': 1, 'a': 2}, 200).body == expected.encode('utf-8')
+
+    def test_native(self, make_request):
+        assert not can_encode_native(make_request(RESTPLUS_JSON_ENGINE='json'))
+        if has_orjson:
+            request = make_request(RESTPLUS_JSON_ENGINE='orjson')
+            assert can_encode_native(request)
+            assert encode(request, {'at': datetime(2020, 1, 2)}, native=True) == b'{"at":"2020-01-02T00:00:00Z"}'
+            assert not can_encode_native(make_request(debug=True, RESTPLUS_JSON_ENGINE='orjson'))
+
+
+class SetupJSONEngineTest(object):
+    def test_resolved(self):
+        app = make_app(RESTPLUS_JSON_ENGINE='json')
+        app.ctx.restplus_json_engine = resolve_json_engine(dumps)
+        assert setup_json_engine(app).name == 'json'
+        assert get_json_engine(app).name == 'json'
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            setup_json_engine(make_app(RESTPLUS_JSON_ENGINE='unknown'))
+
+    def test_output_reset(self):
+        app = make_app(RESTPLUS_JSON_ENGINE='json')
+        app.ctx.restplus_json_output = output_json_pretty
+        setup_json_engine(app)
+        assert app.ctx.restplus_json_output is not output_json_pretty
+
+    @pytest.mark.skipif(not has_orjson, reason='orjson is not installed')
+    def test_unsupported_settings(self):
+        with pytest.raises(ValueError):
+            setup_json_engine(make_app(RESTPLUS_JSON_ENGINE='orjson', RESTPLUS_JSON={'indent': 4}))
+
+    def test_benchmark(self, caplog):
+        app = make_app(RESTPLUS_JSON_BENCHMARK=[{'id': 1, 'name': 'test'}])
+        with caplog.at_level(logging.INFO, logger='sanic_restplus.representations'):
+            setup_json_engine(app)
+        assert 'Fastest JSON engine' in caplog.text
+        for name in JSON_ENGINES:
+            assert name in caplog.text
+
+    @pytest.mark.skipif(not has_orjson, reason='orjson is not installed')
+    def test_benchmark_unsupported_settings(self):
+        timings = benchmark_json_engines(settings={'indent': 4}, rounds=1)
+        assert 'orjson' not in [name for name, _ in timings]
+
+    def test_benchmark_timings(self):
+        timings = benchmark_json_engines(rounds=2)
+        assert sorted(name for name, _ in timings) == sorted(JSON_ENGINES)
+        assert [t for _, t in timings] == sorted(t for _, t in timings)
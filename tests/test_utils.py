@@ -1,9 +1,19 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import asyncio
+import gc
+
+from types import SimpleNamespace
+
 import pytest
 
-from sanic_restplus import utils
+from sanic.exceptions import InvalidUsage
+from sanic.response import text
+
+from sanic_restplus import api as api_module, fields, utils
+from sanic_restplus.compiler import get_marshaller
+from sanic_restplus.marshalling import MarshalledStream
 
 
 class MergeTestCase(object):
@@ -121,3 +131,111 @@ class UnpackTest(object):
     def test_too_many_values(self):
         with pytest.raises(ValueError):
             utils.unpack((None, None, None, None))
+
+
+class WeakLRUCacheTest(object):
+    class Obj(object):
+        pass
+
+    def test_cached(self):
+        cache = utils.WeakLRUCache()
+        obj = self.Obj()
+        value = cache.get(obj, lambda o: [])
+        assert cache.get(obj, lambda o: []) is value
+        assert cache.cache_info() == (1, 1, 1024, 1)
+
+    def test_stamp(self):
+        cache = utils.WeakLRUCache()
+        obj = self.Obj()
+        value = cache.get(obj, lambda o: [], stamp=1)
+        assert cache.get(obj, lambda o: [], stamp=2) is not value
+
+    def test_bounded(self):
+        cache = utils.WeakLRUCache(maxsize=2)
+        objs = [self.Obj() for _ in range(3)]
+        first = cache.get(objs[0], lambda o: [])
+        cache.get(objs[1], lambda o: [])
+        cache.get(objs[0], lambda o: [])
+        cache.get(objs[2], lambda o: [])
+        assert len(cache) == 2
+        assert cache.get(objs[0], lambda o: []) is first
+
+    def test_weak(self):
+        cache = utils.WeakLRUCache()
+        obj = self.Obj()
+        cache.get(obj, lambda o: [])
+        del obj
+        gc.collect()
+        assert len(cache) == 0
+
+    def test_invalidate(self):
+        cache = utils.WeakLRUCache()
+        obj = self.Obj()
+        value = cache.get(obj, lambda o: [])
+        cache.invalidate(obj)
+        assert cache.get(obj, lambda o: []) is not value
+
+
+class NegotiationTest(object):
+    def request(self, accept=None):
+        headers = {} if accept is None else {'accept': accept}
+        return SimpleNamespace(headers=headers, ctx=SimpleNamespace())
+
+    @pytest.mark.parametrize('accept,expected', [
+        (None, 'application/json'),
+        ('', 'application/json'),
+        ('application/xml', 'application/xml'),
+        ('text/html, application/xml;q=0.9', 'application/xml'),
+        ('application/json;charset=utf-8', 'application/json'),
+        ('application/json;q=0.5, application/xml', 'application/xml'),
+        ('*/*', 'application/json'),
+        ('text/html', 'application/json'),
+        ('application/xml;q=0', None),
+    ])
+    def test_best_match(self, accept, expected):
+        representations = {'application/json': None, 'application/xml': None}
+        request = self.request(accept)
+        assert utils.best_match_accept_mimetype(request, representations, 'application/json') == expected
+
+    def test_once_per_request(self, mocker):
+        negotiate = mocker.spy(utils, 'negotiate_mimetype')
+        representations = {'application/json': None, 'application/xml': None}
+        request = self.request('application/xml')
+        for _ in range(3):
+            assert utils.best_match_accept_mimetype(request, representations, 'application/json') == 'application/xml'
+        assert utils.best_match_accept_mimetype(request, {'text/csv': None}, 'text/csv') == 'text/csv'
+        assert negotiate.call_count == 2
+        assert len(request.ctx.restplus_mediatypes) == 2
+
+    def test_cached_by_accept_header(self):
+        utils.negotiate_mimetype.cache_clear()
+        mediatypes = frozenset(['application/json'])
+        for _ in range(3):
+            request = self.request('application/json, text/html;q=0.9')
+            utils.best_match_accept_mimetype(request, {'application/json': None}, None)
+        assert utils.negotiate_mimetype.cache_info().hits == 2
+        assert utils.negotiate_mimetype('application/json', mediatypes, None) == 'application/json'
+
+    def test_stream_fallback_negotiated_once(self, mocker):
+        api = api_module.Api()
+        api.representations['text/csv'] = lambda request, data, code, headers=None: text(repr(data), code, headers)
+        request = self.request('text/csv')
+        request.app = SimpleNamespace(debug=False, config={})
+        negotiate = mocker.spy(api_module, 'best_match_accept_mimetype')
+        stream = MarshalledStream([{'id': 1}], get_marshaller({'id': fields.Integer}))
+        response = asyncio.run(api.make_stream_response(request, stream, 200))
+        assert response.headers['Content-Type'] == 'text/csv'
+        assert response.body == b"[{'id': 1}]"
+        assert negotiate.call_count == 1
+
+    def test_error_path_negotiated_once(self, mocker, make_request):
+        api = api_module.Api()
+        request = make_request({'accept': 'application/json;q=0.9, text/html'})
+        context = SimpleNamespace(app=request.app, log=lambda *args, **kwargs: None)
+        mocker.patch.object(api_module.restplus, 'get_context_from_realm', return_value=context)
+        negotiate = mocker.spy(utils, 'negotiate_mimetype')
+        assert api.make_response(request, {'id': 1}, 200).status == 200
+        response = api.handle_error(request, InvalidUsage('Invalid'))
+        assert response.status == 400
+        assert response.headers['Content-Type'] == 'application/json'
+        assert negotiate.call_count == 1